@@ -1,18 +1,23 @@
 """Scripts to generate and test the voraus Debian ISO."""
 
-from importlib_metadata import PackageNotFoundError as _PackageNotFoundError
-from importlib_metadata import version as _version
-
 __module_name__ = "voraus_debian_iso"
 
 try:  # pragma: no cover
-    __version__ = _version(__module_name__)
-except _PackageNotFoundError as error:  # pragma: no cover
-    raise ModuleNotFoundError(
-        f"Unable to determine version of package '{__module_name__}'. "
-        "If you are on a local development system, use 'pip install -e .[dev]' in order to install the package. "
-        "If you are on a productive system, this shouldn't happen. Please report a bug."
-    ) from error
+    # Written by setuptools_scm on installation. Importing it is much faster than importing importlib_metadata, which
+    # matters for the startup of the CLI.
+    from voraus_debian_iso._version import __version__
+except ImportError:  # pragma: no cover
+    from importlib_metadata import PackageNotFoundError as _PackageNotFoundError
+    from importlib_metadata import version as _version
+
+    try:
+        __version__ = _version(__module_name__)
+    except _PackageNotFoundError as error:
+        raise ModuleNotFoundError(
+            f"Unable to determine version of package '{__module_name__}'. "
+            "If you are on a local development system, use 'pip install -e .[dev]' in order to install the package. "
+            "If you are on a productive system, this shouldn't happen. Please report a bug."
+        ) from error
 
 
 def get_app_name() -> str:
@@ -0,0 +1,47 @@
+"""This module defines the typer benchmark method."""
+
+import logging
+from pathlib import Path
+from typing import Annotated, Optional
+
+import typer
+
+from voraus_debian_iso.methods.cli.cli_benchmark_methods import BENCHMARK_DIR, BenchmarkPipeline, benchmark_impl
+from voraus_debian_iso.methods.cli.cli_common_methods import try_call_impl
+
+_logger = logging.getLogger(__name__)
+
+
+def _cli_benchmark(  # pylint: disable=too-many-positional-arguments
+    pipeline: Annotated[
+        Optional[list[BenchmarkPipeline]],
+        typer.Option(help="A pipeline to benchmark (default: all). Can be repeated.", show_default=False),
+    ] = None,
+    iterations: Annotated[int, typer.Option(help="The number of iterations of every pipeline.")] = 3,
+    iso_file: Annotated[
+        Optional[Path],
+        typer.Option(help="The ISO to install. Required if the install pipeline runs without the build pipeline."),
+    ] = None,
+    disk_file: Annotated[
+        Path, typer.Option(help="The golden image the install pipeline writes and the boot pipeline starts from.")
+    ] = BENCHMARK_DIR
+    / "golden.img",
+    history_file: Annotated[
+        Path,
+        typer.Option(help="The history the results are appended to, as CSV if it ends with .csv, else JSON lines."),
+    ] = BENCHMARK_DIR
+    / "history.jsonl",
+    threshold: Annotated[
+        float,
+        typer.Option(help="The relative increase of the median duration of a phase above which it regresses."),
+    ] = 0.2,
+) -> None:  # noqa: disable=D103
+    try_call_impl(
+        function=benchmark_impl,
+        pipelines=pipeline or list(BenchmarkPipeline),
+        iterations=iterations,
+        iso_file=iso_file,
+        disk_file=disk_file,
+        history_file=history_file,
+        threshold=threshold,
+    )
@@ -2,31 +2,88 @@
 
 import logging
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, Optional
 
 import typer
 
 from voraus_debian_iso.constants import DEFAULT_ARCHITECTURE, DEFAULT_DEBIAN_VERSION
-from voraus_debian_iso.methods.cli.cli_build_methods import build_impl
+from voraus_debian_iso.methods.cli.cli_build_methods import BuildMode, build_impl, build_matrix_impl
 from voraus_debian_iso.methods.cli.cli_common_methods import try_call_impl
 
 _logger = logging.getLogger(__name__)
 
 
-def _cli_build(
+def _cli_build(  # pylint: disable=too-many-positional-arguments
     debian_version: Annotated[
-        str,
-        typer.Option(help="The debian base version to use."),
-    ] = DEFAULT_DEBIAN_VERSION,
+        Optional[list[str]],
+        typer.Option(
+            help=f"The debian base version to use (default: {DEFAULT_DEBIAN_VERSION}). "
+            "Can be repeated together with --matrix.",
+            show_default=False,
+        ),
+    ] = None,
     architecture: Annotated[
-        str,
-        typer.Option(help="The architecture to use."),
-    ] = DEFAULT_ARCHITECTURE,
+        Optional[list[str]],
+        typer.Option(
+            help=f"The architecture to use (default: {DEFAULT_ARCHITECTURE}). Can be repeated together with --matrix.",
+            show_default=False,
+        ),
+    ] = None,
     output_directory: Annotated[Path, typer.Option(help="The output directory")] = Path("./output/"),
+    mode: Annotated[
+        BuildMode,
+        typer.Option(
+            help="Patch the upstream ISO in place (only the changed files are written) "
+            "or extract and re-pack it completely."
+        ),
+    ] = BuildMode.IN_PLACE,
+    explain: Annotated[
+        bool,
+        typer.Option(help="Explain which build phases are up to date and why the others have to run."),
+    ] = False,
+    matrix: Annotated[
+        bool,
+        typer.Option(
+            help="Build all --debian-version/--architecture pairs concurrently. A single architecture is used for "
+            "all debian versions, otherwise they are paired in the given order."
+        ),
+    ] = False,
+    jobs: Annotated[
+        Optional[int],
+        typer.Option(help="The maximum number of concurrent builds in --matrix mode. Defaults to the number of pairs."),
+    ] = None,
+    package: Annotated[
+        Optional[list[Path]],
+        typer.Option(
+            help="A .deb file or a directory of .deb files to embed into the APT repository of the ISO, so the "
+            "installer reads them from the cdrom. Can be repeated.",
+            show_default=False,
+        ),
+    ] = None,
 ) -> None:  # noqa: disable=D103
+    debian_version = debian_version or [DEFAULT_DEBIAN_VERSION]
+    architecture = architecture or [DEFAULT_ARCHITECTURE]
+    if matrix:
+        try_call_impl(
+            function=build_matrix_impl,
+            debian_versions=debian_version,
+            architectures=architecture,
+            output_directory=output_directory,
+            mode=mode,
+            explain=explain,
+            jobs=jobs,
+            packages=package,
+        )
+        return
+
+    if len(debian_version) > 1 or len(architecture) > 1:
+        raise typer.BadParameter("Building several debian versions or architectures requires --matrix.")
     try_call_impl(
         function=build_impl,
-        debian_version=debian_version,
-        architecture=architecture,
+        debian_version=debian_version[0],
+        architecture=architecture[0],
         output_directory=output_directory,
+        mode=mode,
+        explain=explain,
+        packages=package,
     )
@@ -0,0 +1,50 @@
+"""This module defines the typer build-fleet method."""
+
+import logging
+from pathlib import Path
+from typing import Annotated, Optional
+
+import typer
+
+from voraus_debian_iso.constants import DEFAULT_ARCHITECTURE, DEFAULT_DEBIAN_VERSION
+from voraus_debian_iso.methods.cli.cli_build_fleet_methods import build_fleet_impl
+from voraus_debian_iso.methods.cli.cli_common_methods import try_call_impl
+
+_logger = logging.getLogger(__name__)
+
+
+def _cli_build_fleet(  # pylint: disable=too-many-positional-arguments
+    inventory_file: Annotated[
+        Path,
+        typer.Option(
+            "--inventory",
+            help="A CSV (with header row) or JSON file with one entry per unit. Every unit needs a 'name'.",
+        ),
+    ],
+    template_file: Annotated[
+        Path,
+        typer.Option("--template", help="The preseed template with '{{ key }}' placeholders for the unit values."),
+    ],
+    debian_version: Annotated[
+        str,
+        typer.Option(help="The debian base version to use."),
+    ] = DEFAULT_DEBIAN_VERSION,
+    architecture: Annotated[
+        str,
+        typer.Option(help="The architecture to use."),
+    ] = DEFAULT_ARCHITECTURE,
+    output_directory: Annotated[Path, typer.Option(help="The output directory")] = Path("./output/"),
+    jobs: Annotated[
+        Optional[int],
+        typer.Option(help="The maximum number of unit ISOs written concurrently. Defaults to the number of CPUs."),
+    ] = None,
+) -> None:  # noqa: disable=D103
+    try_call_impl(
+        function=build_fleet_impl,
+        inventory_file=inventory_file,
+        template_file=template_file,
+        debian_version=debian_version,
+        architecture=architecture,
+        output_directory=output_directory,
+        jobs=jobs,
+    )
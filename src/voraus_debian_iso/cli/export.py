@@ -0,0 +1,47 @@
+"""This module defines the typer export method."""
+
+import logging
+from pathlib import Path
+from typing import Annotated, Optional
+
+import typer
+
+from voraus_debian_iso.constants import DEFAULT_QEMU_DISK_FILE
+from voraus_debian_iso.methods.cli.cli_common_methods import try_call_impl
+from voraus_debian_iso.methods.cli.cli_export_methods import export_impl
+from voraus_debian_iso.methods.raw_images import Compression
+
+_logger = logging.getLogger(__name__)
+
+
+def _cli_export(
+    disk_file: Annotated[Path, typer.Option(help="The installed qcow2 disk file.")] = DEFAULT_QEMU_DISK_FILE,
+    output_file: Annotated[
+        Optional[Path],
+        typer.Option(
+            help="The compressed image to write (default: ./output/<disk file name>.img.zst or .img.xz). The block "
+            "map is written next to it.",
+            show_default=False,
+        ),
+    ] = None,
+    compression: Annotated[Compression, typer.Option(help="The compression of the image.")] = Compression.ZSTD,
+    level: Annotated[
+        Optional[int],
+        typer.Option(help="The compression level (default: the default level of the compressor).", show_default=False),
+    ] = None,
+    trim: Annotated[
+        bool,
+        typer.Option(
+            help="Boot the disk once to clean the package caches and trim its file systems, so their unused blocks "
+            "are neither compressed nor written."
+        ),
+    ] = True,
+) -> None:  # noqa: disable=D103
+    try_call_impl(
+        function=export_impl,
+        disk_file=disk_file,
+        output_file=output_file,
+        compression=compression,
+        level=level,
+        trim=trim,
+    )
@@ -0,0 +1,30 @@
+"""This module defines the typer flash method."""
+
+import logging
+from pathlib import Path
+from typing import Annotated
+
+import typer
+
+from voraus_debian_iso.methods.cli.cli_common_methods import try_call_impl
+from voraus_debian_iso.methods.cli.cli_flash_methods import flash_impl
+
+_logger = logging.getLogger(__name__)
+
+
+def _cli_flash(
+    source: Annotated[Path, typer.Argument(help="The ISO, raw image or image created with 'export'.")],
+    targets: Annotated[list[Path], typer.Argument(help="The block devices or files to write.")],
+    block_size: Annotated[int, typer.Option(help="The size of the blocks that are read and written in MiB.")] = 4,
+    direct: Annotated[
+        bool,
+        typer.Option(help="Bypass the page cache of the host with O_DIRECT."),
+    ] = False,
+    verify: Annotated[
+        bool,
+        typer.Option(help="Read every target back and compare it with the source."),
+    ] = True,
+) -> None:  # noqa: disable=D103
+    try_call_impl(
+        function=flash_impl, source=source, targets=targets, block_size=block_size, direct=direct, verify=verify
+    )
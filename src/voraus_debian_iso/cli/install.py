@@ -2,25 +2,82 @@
 
 import logging
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, Optional
 
 import typer
 
-from voraus_debian_iso.constants import DEFAULT_QEMU_DISK_FILE
+from voraus_debian_iso.constants import DEFAULT_GOLDEN_DISK_FILE, DEFAULT_QEMU_DISK_FILE
 from voraus_debian_iso.methods.cli.cli_common_methods import try_call_impl
 from voraus_debian_iso.methods.cli.cli_install_methods import install_impl
+from voraus_debian_iso.methods.vm_profiles import VMProfile
 
 _logger = logging.getLogger(__name__)
 
 
-def _cli_install(
+def _cli_install(  # pylint: disable=too-many-positional-arguments
     iso_file: Annotated[
         Path,
         typer.Option(help="The ISO file to install."),
     ],
     disk_file: Annotated[
-        Path,
-        typer.Option(help="The QEMU disk file to create/use."),
-    ] = DEFAULT_QEMU_DISK_FILE,
+        Optional[Path],
+        typer.Option(
+            help=f"The QEMU disk file to create/use (default: {DEFAULT_QEMU_DISK_FILE}, or {DEFAULT_GOLDEN_DISK_FILE} "
+            "with --golden).",
+            show_default=False,
+        ),
+    ] = None,
+    direct_kernel_boot: Annotated[
+        bool,
+        typer.Option(
+            help="Boot the installer kernel of the ISO directly, skipping the firmware, the GRUB menu and its timeout."
+        ),
+    ] = False,
+    timeline_file: Annotated[
+        Optional[Path],
+        typer.Option(
+            help="The JSON file to write the installer stage timeline to. Defaults to a file next to the disk."
+        ),
+    ] = None,
+    golden: Annotated[
+        bool,
+        typer.Option(
+            help="Seal the installed disk as a read-only golden image. "
+            "'start --base-file' and 'reset' create thin overlays of it."
+        ),
+    ] = False,
+    profile: Annotated[
+        VMProfile,
+        typer.Option(help="The performance profile of the VM (virtual devices, vCPUs and disk cache modes)."),
+    ] = VMProfile.DEFAULT,
+    hugepages: Annotated[
+        bool,
+        typer.Option(help="Back the VM memory with preallocated huge pages from /dev/hugepages."),
+    ] = False,
+    apt_cache: Annotated[
+        bool,
+        typer.Option(
+            help="Download the packages through a local caching proxy, so re-installs don't download them again. "
+            "Requires --direct-kernel-boot."
+        ),
+    ] = False,
+    compact: Annotated[
+        bool,
+        typer.Option(
+            help="Boot the installed system once to clean the package caches and trim its file systems, then rewrite "
+            "the disk as a compressed qcow2."
+        ),
+    ] = False,
 ) -> None:  # noqa: disable=D103
-    try_call_impl(function=install_impl, iso_file=iso_file, disk_file=disk_file)
+    try_call_impl(
+        function=install_impl,
+        iso_file=iso_file,
+        disk_file=disk_file,
+        direct_kernel_boot=direct_kernel_boot,
+        timeline_file=timeline_file,
+        golden=golden,
+        profile=profile,
+        hugepages=hugepages,
+        apt_cache=apt_cache,
+        compact=compact,
+    )
@@ -0,0 +1,12 @@
+"""This module defines the typer list method."""
+
+import logging
+
+from voraus_debian_iso.methods.cli.cli_common_methods import try_call_impl
+from voraus_debian_iso.methods.cli.cli_list_methods import list_impl
+
+_logger = logging.getLogger(__name__)
+
+
+def _cli_list() -> None:  # noqa: disable=D103
+    try_call_impl(function=list_impl)
@@ -1,25 +1,81 @@
 """Contains the main CLI entry point."""
 
+import importlib
 import logging
+import sys
 from enum import Enum
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 
 import typer
-from rich.logging import RichHandler
+from typer.core import TyperGroup
 
 from voraus_debian_iso import get_app_name, get_app_version
-from voraus_debian_iso.cli.build import _cli_build
-from voraus_debian_iso.cli.install import _cli_install
-from voraus_debian_iso.cli.start import _cli_start
-from voraus_debian_iso.cli.stop import _cli_stop
+
+if TYPE_CHECKING:
+    # Typer ships its own copy of click, whose types the methods of the group use
+    from typer import _click as click
 
 _logger = logging.getLogger(__name__)
 
+# The module in voraus_debian_iso.cli, the typer function and the help of every command. The modules are only imported
+# when their command runs, so commands like --version, stop or status don't load fabric, pexpect & co.
+_COMMANDS: dict[str, tuple[str, str, str]] = {
+    "benchmark": ("benchmark", "_cli_benchmark", "Benchmarks the phases of the build, install and boot pipelines"),
+    "build": ("build", "_cli_build", "Builds the voraus debian ISO"),
+    "build-fleet": ("build_fleet", "_cli_build_fleet", "Builds one voraus debian ISO per unit of an inventory"),
+    "export": ("export", "_cli_export", "Exports an installed disk as a compressed sparse raw image"),
+    "flash": ("flash", "_cli_flash", "Writes an ISO or image to several block devices at once"),
+    "install": ("install", "_cli_install", "Installs a voraus debian ISO in a QEMU VM"),
+    "list": ("list", "_cli_list", "Lists all QEMU VMs"),
+    "reset": ("reset", "_cli_reset", "Resets the disk of a QEMU VM to a fresh overlay of the golden image"),
+    "restore": ("restore", "_cli_restore", "Writes an exported image to a block device or file"),
+    "snapshot": ("snapshot", "_cli_snapshot", "Saves the state of a booted QEMU VM for 'start --from-snapshot'"),
+    "start": ("start", "_cli_start", "Starts a QEMU VM of the installed voraus debian ISO"),
+    "status": ("status", "_cli_status", "Shows the run state, vCPUs and block I/O of QEMU VMs"),
+    "stop": ("stop", "_cli_stop", "Powers down a running QEMU VM"),
+}
+
+
+class LazyCommandGroup(TyperGroup):
+    """Typer group that imports the module of a command only when the command is looked up.
+
+    Running a command imports only its own module. The help of the group looks up and therefore imports all of them.
+    """
+
+    def list_commands(self, ctx: "click.Context") -> list[str]:
+        """Returns the names of all commands.
+
+        Args:
+            ctx: The click context.
+
+        Returns:
+            The sorted command names.
+        """
+        return sorted({*super().list_commands(ctx), *_COMMANDS})
+
+    def get_command(self, ctx: "click.Context", cmd_name: str) -> "click.Command | None":
+        """Returns a command, importing its module on first use.
 
-app = typer.Typer()
-app.command(name="build", help="Builds the voraus debian ISO")(_cli_build)
-app.command(name="install", help="Installs a voraus debian ISO in a QEMU VM")(_cli_install)
-app.command(name="start", help="Starts the installed voraus debian ISO QEMU VM")(_cli_start)
-app.command(name="stop", help="Stops the running voraus debian ISO QEMU VM")(_cli_stop)
+        Args:
+            ctx: The click context.
+            cmd_name: The name of the command.
+
+        Returns:
+            The command or None if there is no such command.
+        """
+        command = super().get_command(ctx, cmd_name)
+        if command is None and cmd_name in _COMMANDS:
+            module_name, function_name, help_text = _COMMANDS[cmd_name]
+            module = importlib.import_module(f"voraus_debian_iso.cli.{module_name}")
+            command_app = typer.Typer(add_completion=False)
+            command_app.command(name=cmd_name, help=help_text)(getattr(module, function_name))
+            command = typer.main.get_command(command_app)
+            self.add_command(command, cmd_name)
+        return command
+
+
+app = typer.Typer(cls=LazyCommandGroup)
 
 
 class LogLevel(str, Enum):
@@ -47,6 +103,7 @@ def print_version(do_print: bool) -> None:
 
 @app.callback()
 def _common(
+    ctx: typer.Context,
     _: bool = typer.Option(
         False,
         "--version",
@@ -55,13 +112,25 @@ def _common(
         help="Print the installed version of the software.",
     ),
     log_level: LogLevel = typer.Option(LogLevel.INFO, help="The log level"),
+    trace: Optional[Path] = typer.Option(
+        None,
+        help="Write the phases and subprocesses of the command with their durations and resource usage to this "
+        "file in the Chrome trace event format.",
+        show_default=False,
+    ),
 ) -> None:
-    rich_handler = RichHandler()
-    rich_handler.setFormatter(logging.Formatter("%(message)s"))
+    # A plain handler, since importing rich's log handler would slow down the startup of every command
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("[%(asctime)s] %(levelname)-8s %(message)s", datefmt="%x %X"))
     logger = logging.getLogger()
-    logger.handlers = [rich_handler]
+    logger.handlers = [handler]
     logger.setLevel(log_level.value)
     _logger.info(f"Using {get_app_name()}@{get_app_version()}")
+    if trace is not None:
+        from voraus_debian_iso.methods.tracing import Tracer  # pylint: disable=import-outside-toplevel
+
+        tracer = ctx.with_resource(Tracer().activate())
+        ctx.call_on_close(lambda: tracer.write(trace))
 
 
 typer_click_object = typer.main.get_command(app)
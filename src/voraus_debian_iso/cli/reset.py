@@ -0,0 +1,30 @@
+"""This module defines the typer reset method."""
+
+import logging
+from pathlib import Path
+from typing import Annotated, Optional
+
+import typer
+
+from voraus_debian_iso.constants import DEFAULT_GOLDEN_DISK_FILE, DEFAULT_VM_NAME
+from voraus_debian_iso.methods.cli.cli_common_methods import try_call_impl
+from voraus_debian_iso.methods.cli.cli_reset_methods import reset_impl
+
+_logger = logging.getLogger(__name__)
+
+
+def _cli_reset(
+    name: Annotated[str, typer.Argument(help="The name of the VM.")] = DEFAULT_VM_NAME,
+    disk_file: Annotated[
+        Optional[Path],
+        typer.Option(
+            help="The overlay disk file to reset (default: the overlay in the state directory of the VM).",
+            show_default=False,
+        ),
+    ] = None,
+    base_file: Annotated[
+        Path,
+        typer.Option(help="The golden image created with 'install --golden'."),
+    ] = DEFAULT_GOLDEN_DISK_FILE,
+) -> None:  # noqa: disable=D103
+    try_call_impl(function=reset_impl, base_file=base_file, name=name, disk_file=disk_file)
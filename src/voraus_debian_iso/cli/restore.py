@@ -0,0 +1,23 @@
+"""This module defines the typer restore method."""
+
+import logging
+from pathlib import Path
+from typing import Annotated, Optional
+
+import typer
+
+from voraus_debian_iso.methods.cli.cli_common_methods import try_call_impl
+from voraus_debian_iso.methods.cli.cli_restore_methods import restore_impl
+
+_logger = logging.getLogger(__name__)
+
+
+def _cli_restore(
+    image_file: Annotated[Path, typer.Argument(help="The compressed image created with 'export'.")],
+    target: Annotated[Path, typer.Argument(help="The block device or file to write.")],
+    block_map_file: Annotated[
+        Optional[Path],
+        typer.Option(help="The block map of the image (default: <image file>.bmap.json).", show_default=False),
+    ] = None,
+) -> None:  # noqa: disable=D103
+    try_call_impl(function=restore_impl, image_file=image_file, target=target, block_map_file=block_map_file)
@@ -0,0 +1,22 @@
+"""This module defines the typer snapshot method."""
+
+import logging
+from typing import Annotated
+
+import typer
+
+from voraus_debian_iso.constants import DEFAULT_VM_NAME
+from voraus_debian_iso.methods.cli.cli_common_methods import try_call_impl
+from voraus_debian_iso.methods.cli.cli_snapshot_methods import snapshot_impl
+
+_logger = logging.getLogger(__name__)
+
+
+def _cli_snapshot(
+    name: Annotated[str, typer.Argument(help="The name of the VM.")] = DEFAULT_VM_NAME,
+    settle_time: Annotated[
+        float,
+        typer.Option(help="Seconds to wait after SSH is reachable, so the saved VM is idle."),
+    ] = 10.0,
+) -> None:  # noqa: disable=D103
+    try_call_impl(function=snapshot_impl, name=name, settle_time=settle_time)
@@ -2,21 +2,53 @@
 
 import logging
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, Optional
 
 import typer
 
-from voraus_debian_iso.constants import DEFAULT_QEMU_DISK_FILE
+from voraus_debian_iso.constants import DEFAULT_QEMU_DISK_FILE, DEFAULT_VM_NAME
 from voraus_debian_iso.methods.cli.cli_common_methods import try_call_impl
 from voraus_debian_iso.methods.cli.cli_start_methods import start_impl
+from voraus_debian_iso.methods.vm_profiles import VMProfile
 
 _logger = logging.getLogger(__name__)
 
 
-def _cli_start(
+def _cli_start(  # pylint: disable=too-many-positional-arguments
+    name: Annotated[str, typer.Argument(help="The name of the VM.")] = DEFAULT_VM_NAME,
     disk_file: Annotated[
-        Path,
-        typer.Option(help="The QEMU disk file to start."),
-    ] = DEFAULT_QEMU_DISK_FILE,
+        Optional[Path],
+        typer.Option(
+            help=f"The QEMU disk file to start (default: {DEFAULT_QEMU_DISK_FILE} for the default VM, or the overlay "
+            "in the state directory of the VM with --base-file). Other VMs need --disk-file or --base-file.",
+            show_default=False,
+        ),
+    ] = None,
+    base_file: Annotated[
+        Optional[Path],
+        typer.Option(help="Start a thin overlay of this golden image. The overlay is the disk file."),
+    ] = None,
+    from_snapshot: Annotated[
+        bool,
+        typer.Option(help="Restore the booted VM saved with 'snapshot' instead of booting it. This reverts the disk."),
+    ] = False,
+    profile: Annotated[
+        VMProfile,
+        typer.Option(
+            help="The performance profile of the VM. Snapshots are restored with the profile they were saved with."
+        ),
+    ] = VMProfile.DEFAULT,
+    hugepages: Annotated[
+        bool,
+        typer.Option(help="Back the VM memory with preallocated huge pages from /dev/hugepages."),
+    ] = False,
 ) -> None:  # noqa: disable=D103
-    try_call_impl(function=start_impl, disk_file=disk_file)
+    try_call_impl(
+        function=start_impl,
+        name=name,
+        disk_file=disk_file,
+        base_file=base_file,
+        from_snapshot=from_snapshot,
+        profile=profile,
+        hugepages=hugepages,
+    )
@@ -0,0 +1,20 @@
+"""This module defines the typer status method."""
+
+import logging
+from typing import Annotated, Optional
+
+import typer
+
+from voraus_debian_iso.methods.cli.cli_common_methods import try_call_impl
+from voraus_debian_iso.methods.cli.cli_status_methods import status_impl
+
+_logger = logging.getLogger(__name__)
+
+
+def _cli_status(
+    name: Annotated[
+        Optional[str],
+        typer.Argument(help="The name of the VM (default: all VMs).", show_default=False),
+    ] = None,
+) -> None:  # noqa: disable=D103
+    try_call_impl(function=status_impl, name=name)
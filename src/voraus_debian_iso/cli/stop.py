@@ -1,12 +1,23 @@
-"""This module defines the typer start method."""
+"""This module defines the typer stop method."""
 
 import logging
+from typing import Annotated
 
+import typer
+
+from voraus_debian_iso.constants import DEFAULT_VM_NAME
 from voraus_debian_iso.methods.cli.cli_common_methods import try_call_impl
 from voraus_debian_iso.methods.cli.cli_stop_methods import stop_impl
 
 _logger = logging.getLogger(__name__)
 
 
-def _cli_stop() -> None:  # noqa: disable=D103
-    try_call_impl(function=stop_impl)
+def _cli_stop(
+    name: Annotated[str, typer.Argument(help="The name of the VM.")] = DEFAULT_VM_NAME,
+    all_instances: Annotated[bool, typer.Option("--all", help="Stop all running VMs concurrently.")] = False,
+    timeout: Annotated[
+        float,
+        typer.Option(help="Seconds the guest gets to power down before QEMU is told to quit."),
+    ] = 30.0,
+) -> None:  # noqa: disable=D103
+    try_call_impl(function=stop_impl, name=name, all_instances=all_instances, timeout=timeout)
@@ -9,13 +9,16 @@ _PATH = Path(__file__).parent.resolve()
 DATA_DIR = _PATH / "data"
 DOCKERFILE_DIR = _PATH / "dockerfiles"
 CACHE_DIR = Path("/tmp") / get_app_name() / "cache"
-EXTRACTED_DIR = CACHE_DIR / "extracted"
+WORKSPACES_DIR = CACHE_DIR / "workspaces"
+BUILD_CACHE_DIR = CACHE_DIR / "build"
+APT_CACHE_DIR = CACHE_DIR / "apt"
 DEFAULT_QEMU_DISK_FILE = CACHE_DIR / "qemu_disk.img"
-QEMU_PID_FILE = CACHE_DIR / "qemu.pid"
+DEFAULT_GOLDEN_DISK_FILE = CACHE_DIR / "qemu_golden.img"
+VMS_DIR = CACHE_DIR / "vms"
+DEFAULT_VM_NAME = "default"
 
 DEFAULT_DEBIAN_VERSION = "13.6.0"
 DEFAULT_ARCHITECTURE = "amd64"
 ISO_FILENAME_TEMPLATE = "debian-{version}-{architecture}-netinst.iso"
-
-
-MBR_FILE = CACHE_DIR / "isohdpfx.bin"
+BUILD_CACHE_MAX_SIZE = 10 * 1024**3
+APT_CACHE_MAX_SIZE = 10 * 1024**3
@@ -0,0 +1,111 @@
+"""Contains the detection of the QEMU accelerator."""
+
+import os
+from dataclasses import dataclass
+from functools import cache
+from logging import getLogger
+from pathlib import Path
+from subprocess import CalledProcessError
+
+from voraus_debian_iso.methods.shell import execute_command
+
+_logger = getLogger(__name__)
+
+_KVM_DEVICE = Path("/dev/kvm")
+_ACCELERATOR_ENVIRONMENT_VARIABLE = "VORAUS_DEBIAN_ISO_ACCELERATOR"
+_MAX_TCG_CPUS = 8
+
+
+@dataclass(frozen=True)
+class Accelerator:
+    """The accelerator QEMU runs the VMs with.
+
+    Attributes:
+        name: The name of the accelerator, ``kvm`` or ``tcg``.
+        reason: Why the accelerator has been chosen.
+        args: The QEMU arguments that select the accelerator and the matching CPU model.
+        cpus: The number of vCPUs to use instead of the one of the profile, or None to use the one of the profile.
+    """
+
+    name: str
+    reason: str
+    args: tuple[str, ...]
+    cpus: int | None = None
+
+
+def get_kvm_accelerator(reason: str) -> Accelerator:
+    """Returns the KVM accelerator, which runs the guest on the host CPU.
+
+    Args:
+        reason: Why KVM has been chosen.
+
+    Returns:
+        The accelerator.
+    """
+    return Accelerator(name="kvm", reason=reason, args=("-accel", "kvm", "-cpu", "host"))
+
+
+def get_tcg_accelerator(reason: str) -> Accelerator:
+    """Returns the TCG accelerator, which emulates the guest CPU.
+
+    Multi-threaded TCG emulates every vCPU on its own host thread, so the VM gets one vCPU per host core.
+
+    Args:
+        reason: Why TCG has been chosen.
+
+    Returns:
+        The accelerator.
+    """
+    cpus = max(1, min(_MAX_TCG_CPUS, len(os.sched_getaffinity(0))))
+    return Accelerator(name="tcg", reason=reason, args=("-accel", "tcg,thread=multi", "-cpu", "max"), cpus=cpus)
+
+
+@cache
+def detect_accelerator(qemu_binary: str = "qemu-system-x86_64") -> Accelerator:
+    """Detects the fastest accelerator QEMU can use on this host.
+
+    The accelerator can be forced with the ``VORAUS_DEBIAN_ISO_ACCELERATOR`` environment variable (``kvm`` or
+    ``tcg``).
+
+    Args:
+        qemu_binary: The QEMU system emulator.
+
+    Returns:
+        The accelerator.
+
+    Raises:
+        ValueError: If the environment variable names an unknown accelerator.
+    """
+    forced = os.environ.get(_ACCELERATOR_ENVIRONMENT_VARIABLE)
+    if forced:
+        if forced not in ("kvm", "tcg"):
+            raise ValueError(f"Unknown accelerator '{forced}' in {_ACCELERATOR_ENVIRONMENT_VARIABLE} (kvm or tcg)")
+        reason = f"forced by {_ACCELERATOR_ENVIRONMENT_VARIABLE}"
+        accelerator = get_kvm_accelerator(reason) if forced == "kvm" else get_tcg_accelerator(reason)
+    elif not _KVM_DEVICE.exists():
+        accelerator = get_tcg_accelerator(f"{_KVM_DEVICE} doesn't exist")
+    elif not os.access(_KVM_DEVICE, os.R_OK | os.W_OK):
+        accelerator = get_tcg_accelerator(f"{_KVM_DEVICE} is not accessible, add the user to its group")
+    elif "kvm" not in _get_supported_accelerators(qemu_binary):
+        accelerator = get_tcg_accelerator(f"{qemu_binary} doesn't support KVM")
+    else:
+        accelerator = get_kvm_accelerator(f"{_KVM_DEVICE} is accessible and supported by {qemu_binary}")
+
+    if accelerator.name == "kvm":
+        _logger.info(f"Using accelerator {accelerator.name}: {accelerator.reason}")
+    else:
+        _logger.warning(
+            f"Using accelerator {accelerator.name} with {accelerator.cpus} threads: {accelerator.reason}. "
+            "This will result in reduced performance."
+        )
+    return accelerator
+
+
+def _get_supported_accelerators(qemu_binary: str) -> list[str]:
+    try:
+        output = execute_command([qemu_binary, "-accel", "help"])
+    except (OSError, CalledProcessError) as error:
+        _logger.debug(f"Failed to query the accelerators of {qemu_binary}: {error}")
+        return []
+    # The output starts with a headline like "Accelerators supported in QEMU binary:"
+    return [line.strip() for line in output.splitlines()[1:] if line.strip()]
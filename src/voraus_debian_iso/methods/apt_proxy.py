@@ -0,0 +1,280 @@
+"""Contains a caching HTTP proxy for the package downloads of the debian-installer."""
+
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import threading
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+from logging import getLogger
+from pathlib import Path
+from types import TracebackType
+from typing import BinaryIO
+
+_logger = getLogger(__name__)
+
+# Everything below a pinned snapshot timestamp never changes, so it can be cached forever.
+DEFAULT_IMMUTABLE_URL_PATTERN = re.compile(r"^http://snapshot\.debian\.org/archive/[^/]+/\d{8}T\d{6}Z/")
+
+_CHUNK_SIZE = 1024 * 1024
+_PASSED_HEADERS = ("Content-Type", "Last-Modified", "ETag")
+
+
+class AptCachingProxy:
+    """An HTTP proxy that keeps immutable responses in an on-disk content store.
+
+    The proxy runs its own event loop in a background thread, so it can serve a QEMU VM while the caller waits for the
+    installation. Responses of URLs that don't match the immutable URL pattern are forwarded without being cached.
+    When the content store exceeds its maximum size, the least recently used responses are evicted.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_size: int,
+        immutable_url_pattern: re.Pattern = DEFAULT_IMMUTABLE_URL_PATTERN,
+        host: str = "127.0.0.1",
+    ) -> None:
+        """Initializes the proxy without starting it.
+
+        Args:
+            cache_dir: The directory of the content store.
+            max_size: The maximum size of the content store in bytes.
+            immutable_url_pattern: The pattern of URLs whose responses never change.
+            host: The address to listen on.
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.immutable_url_pattern = immutable_url_pattern
+        self.host = host
+        self.port = 0
+        self.stats: Counter = Counter()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="apt-proxy", daemon=True)
+        self._server: asyncio.Server | None = None
+        self._store_lock = threading.Lock()
+        self._size: int | None = None
+
+    @property
+    def url(self) -> str:
+        """Returns the URL of the proxy on the host.
+
+        Returns:
+            The URL.
+        """
+        return f"http://{self.host}:{self.port}/"
+
+    def start(self) -> int:
+        """Starts serving in the background thread.
+
+        Returns:
+            The port the proxy listens on.
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._thread.start()
+        self._server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self._handle_client, host=self.host, port=0), self._loop
+        ).result()
+        self.port = self._server.sockets[0].getsockname()[1]
+        _logger.info(f"Caching APT proxy is listening on {self.url}, using content store {self.cache_dir}")
+        return self.port
+
+    def stop(self) -> None:
+        """Stops serving and logs the cache statistics."""
+        if self._server is not None:
+            asyncio.run_coroutine_threadsafe(_close_server(self._server), self._loop).result()
+            self._server = None
+        if self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+        self._loop.close()
+        _logger.info(
+            f"Caching APT proxy served {self.stats['hits']} cached and {self.stats['misses']} downloaded responses "
+            f"({self.stats['hit_bytes'] / 1024**2:.1f} MiB from cache, "
+            f"{self.stats['miss_bytes'] / 1024**2:.1f} MiB downloaded)"
+        )
+
+    def __enter__(self) -> "AptCachingProxy":
+        """Starts the proxy.
+
+        Returns:
+            The running proxy.
+        """
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Stops the proxy.
+
+        Args:
+            exc_type: The type of the exception that has been raised, if any.
+            exc_value: The exception that has been raised, if any.
+            traceback: The traceback of the exception that has been raised, if any.
+        """
+        self.stop()
+
+    def get_cache_path(self, url: str) -> Path:
+        """Returns the path of the cached response of a URL in the content store.
+
+        Args:
+            url: The URL.
+
+        Returns:
+            The path, which doesn't exist if the response is not cached.
+        """
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.cache_dir / key[:2] / key
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:  # apt keeps connections alive and sends several requests over them
+                request_line = (await reader.readline()).decode("latin-1").strip()
+                if not request_line:
+                    break
+                headers = await _read_headers(reader)
+                method, url, _ = request_line.split(" ", 2)
+                await self._handle_request(method=method, url=url, writer=writer)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, ValueError) as error:
+            _logger.debug(f"Closing proxy connection: {error}")
+        finally:
+            writer.close()
+
+    async def _handle_request(self, method: str, url: str, writer: asyncio.StreamWriter) -> None:
+        if method not in ("GET", "HEAD") or not url.startswith("http://"):
+            await _write_response(writer, status="501 Not Implemented", headers={}, body_file=None, send_body=False)
+            return
+
+        cache_path = self.get_cache_path(url)
+        cacheable = bool(self.immutable_url_pattern.match(url))
+        send_body = method == "GET"
+        # The file is opened before it is used, since the eviction of another download may delete it at any time
+        cached_file = _open_cached(cache_path) if cacheable else None
+        if cached_file is not None:
+            with cached_file:
+                os.utime(cached_file.fileno())
+                self.stats["hits"] += 1
+                if send_body:
+                    self.stats["hit_bytes"] += os.fstat(cached_file.fileno()).st_size
+                await _write_response(writer, status="200 OK", headers={}, body_file=cached_file, send_body=send_body)
+            return
+
+        if not send_body:
+            status, headers = await asyncio.to_thread(_download, url, None)
+            self.stats["misses"] += 1
+            await _write_response(writer, status=status, headers=headers, body_file=None, send_body=False)
+            return
+
+        temporary_path = cache_path.with_name(f".{cache_path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            status, headers = await asyncio.to_thread(_download, url, temporary_path)
+            self.stats["misses"] += 1
+            if status != "200 OK":
+                await _write_response(writer, status=status, headers=headers, body_file=None, send_body=False)
+                return
+            with temporary_path.open("rb") as body_file:
+                self.stats["miss_bytes"] += os.fstat(body_file.fileno()).st_size
+                if cacheable:
+                    await asyncio.to_thread(self._store, temporary_path, cache_path)
+                await _write_response(writer, status="200 OK", headers=headers, body_file=body_file, send_body=True)
+        finally:
+            temporary_path.unlink(missing_ok=True)
+
+    def _store(self, temporary_path: Path, cache_path: Path) -> None:
+        size = temporary_path.stat().st_size
+        temporary_path.replace(cache_path)
+        with self._store_lock:
+            if self._size is None:
+                self._size = sum(path.stat().st_size for path in self._get_entries())
+            else:
+                self._size += size
+            if self._size > self.max_size:
+                self._evict(keep=cache_path)
+
+    def _evict(self, keep: Path) -> None:
+        entries = self._get_entries()
+        stats = {path: path.stat() for path in entries}
+        self._size = sum(stat.st_size for stat in stats.values())
+        for path in sorted(entries, key=lambda path: stats[path].st_mtime):
+            if self._size <= self.max_size:
+                break
+            if path == keep:
+                continue
+            _logger.debug(f"Evicting {path.name} ({stats[path].st_size} bytes) from the APT cache")
+            path.unlink(missing_ok=True)
+            self._size -= stats[path].st_size
+
+    def _get_entries(self) -> list[Path]:
+        return [path for path in self.cache_dir.glob("*/*") if not path.name.startswith(".")]
+
+
+async def _close_server(server: asyncio.Server) -> None:
+    server.close()
+    try:
+        await asyncio.wait_for(server.wait_closed(), timeout=5)
+    except asyncio.TimeoutError:
+        _logger.debug("Proxy connections are still open, stopping anyway")
+
+
+async def _read_headers(reader: asyncio.StreamReader) -> dict[str, str]:
+    headers = {}
+    while line := (await reader.readline()).decode("latin-1").strip():
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def _open_cached(cache_path: Path) -> BinaryIO | None:
+    try:
+        return cache_path.open("rb")
+    except FileNotFoundError:
+        return None
+
+
+def _download(url: str, destination: Path | None) -> tuple[str, dict[str, str]]:
+    # Without a destination, only the headers are requested
+    request = urllib.request.Request(url, method="HEAD" if destination is None else "GET")
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            headers = {name: response.headers[name] for name in _PASSED_HEADERS if name in response.headers}
+            if destination is None:
+                if "Content-Length" in response.headers:
+                    headers["Content-Length"] = response.headers["Content-Length"]
+            else:
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                with destination.open("wb") as file:
+                    shutil.copyfileobj(response, file, _CHUNK_SIZE)
+            return f"{response.status} {response.reason}", headers
+    except urllib.error.HTTPError as error:
+        return f"{error.code} {error.reason}", {}
+    except (urllib.error.URLError, OSError) as error:
+        _logger.warning(f"Failed to download {url}: {error}")
+        return "502 Bad Gateway", {}
+
+
+async def _write_response(
+    writer: asyncio.StreamWriter, status: str, headers: dict[str, str], body_file: BinaryIO | None, send_body: bool
+) -> None:
+    headers = dict(headers)
+    headers.setdefault("Content-Type", "application/octet-stream")
+    if body_file is not None:
+        headers["Content-Length"] = str(os.fstat(body_file.fileno()).st_size)
+    headers.setdefault("Content-Length", "0")
+    headers["Connection"] = "keep-alive"
+    head = f"HTTP/1.1 {status}\r\n" + "".join(f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+    writer.write(head.encode("latin-1"))
+    if body_file is not None and send_body:
+        while chunk := body_file.read(_CHUNK_SIZE):
+            writer.write(chunk)
+            await writer.drain()
+    await writer.drain()
@@ -0,0 +1,261 @@
+"""Contains the benchmark history and the detection of performance regressions."""
+
+import csv
+import json
+import os
+import platform
+import statistics
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timezone
+from logging import getLogger
+from pathlib import Path
+
+from voraus_debian_iso import get_app_version
+from voraus_debian_iso.methods.accelerator import detect_accelerator
+
+_logger = getLogger(__name__)
+
+_CPU_INFO_FILE = Path("/proc/cpuinfo")
+_SYS_BLOCK_DEVICES_DIR = Path("/sys/dev/block")
+
+
+@dataclass(frozen=True)
+class HostContext:
+    """The properties of the host that determine the benchmark results.
+
+    Attributes:
+        accelerator: The QEMU accelerator, ``kvm`` or ``tcg``.
+        cpu_count: The number of CPUs the process may run on.
+        cpu_model: The model name of the CPU.
+        disk_type: The type of the disk the cache directory is on, ``ssd``, ``hdd`` or ``unknown``.
+        version: The version of the application.
+    """
+
+    accelerator: str
+    cpu_count: int
+    cpu_model: str
+    disk_type: str
+    version: str
+
+
+@dataclass(frozen=True)
+class BenchmarkRecord:
+    """The result of one phase of a benchmark run.
+
+    Attributes:
+        timestamp: The start of the benchmark run in ISO 8601 format.
+        phase: The name of the phase, for example ``build:repack``.
+        iterations: The number of iterations the phase ran.
+        median: The median duration in seconds.
+        minimum: The shortest duration in seconds.
+        maximum: The longest duration in seconds.
+        accelerator: The QEMU accelerator of the host.
+        cpu_count: The number of CPUs of the host.
+        cpu_model: The CPU model of the host.
+        disk_type: The type of the disk of the cache directory.
+        version: The version of the application.
+    """
+
+    timestamp: str
+    phase: str
+    iterations: int
+    median: float
+    minimum: float
+    maximum: float
+    accelerator: str
+    cpu_count: int
+    cpu_model: str
+    disk_type: str
+    version: str
+
+
+@dataclass(frozen=True)
+class Regression:
+    """A phase that got slower than its baseline.
+
+    Attributes:
+        phase: The name of the phase.
+        baseline: The median duration of the phase in the baseline runs in seconds.
+        median: The median duration of the phase in the current run in seconds.
+    """
+
+    phase: str
+    baseline: float
+    median: float
+
+    @property
+    def increase(self) -> float:
+        """Returns the relative increase of the duration.
+
+        Returns:
+            The increase, for example 0.25 for a phase that takes 25% longer.
+        """
+        return self.median / self.baseline - 1 if self.baseline > 0 else float("inf")
+
+
+def get_host_context(directory: Path) -> HostContext:
+    """Returns the properties of the host that determine the benchmark results.
+
+    Args:
+        directory: The directory the benchmark writes its files to.
+
+    Returns:
+        The host context.
+    """
+    return HostContext(
+        accelerator=detect_accelerator().name,
+        cpu_count=len(os.sched_getaffinity(0)),
+        cpu_model=_get_cpu_model(),
+        disk_type=get_disk_type(directory),
+        version=get_app_version(),
+    )
+
+
+def get_disk_type(directory: Path) -> str:
+    """Returns the type of the disk a directory is on.
+
+    Args:
+        directory: The directory. If it doesn't exist, its nearest existing parent is used.
+
+    Returns:
+        ``ssd`` or ``hdd``, or ``unknown`` if the directory is not on a block device (like tmpfs).
+    """
+    while not directory.exists():
+        directory = directory.parent
+    device = os.stat(directory).st_dev
+    device_dir = _SYS_BLOCK_DEVICES_DIR / f"{os.major(device)}:{os.minor(device)}"
+    if not device_dir.exists():
+        return "unknown"
+    device_dir = device_dir.resolve()
+    # Partitions don't have a queue, the disk they belong to does
+    for candidate in (device_dir, device_dir.parent):
+        rotational_file = candidate / "queue" / "rotational"
+        if rotational_file.is_file():
+            return "hdd" if rotational_file.read_text(encoding="utf-8").strip() == "1" else "ssd"
+    return "unknown"
+
+
+def _get_cpu_model() -> str:
+    if _CPU_INFO_FILE.is_file():
+        for line in _CPU_INFO_FILE.read_text(encoding="utf-8").splitlines():
+            key, _, value = line.partition(":")
+            if key.strip() == "model name":
+                return value.strip()
+    return platform.processor() or platform.machine()
+
+
+def summarize(
+    samples: dict[str, list[float]], host: HostContext, timestamp: datetime | None = None
+) -> list[BenchmarkRecord]:
+    """Summarizes the durations of the iterations of a benchmark run.
+
+    Args:
+        samples: The durations of every iteration in seconds, by phase.
+        host: The host the benchmark ran on.
+        timestamp: The start of the benchmark run. Defaults to now.
+
+    Returns:
+        One record per phase.
+    """
+    timestamp = timestamp or datetime.now(timezone.utc)
+    return [
+        BenchmarkRecord(
+            timestamp=timestamp.isoformat(timespec="seconds"),
+            phase=phase,
+            iterations=len(durations),
+            median=statistics.median(durations),
+            minimum=min(durations),
+            maximum=max(durations),
+            **asdict(host),
+        )
+        for phase, durations in samples.items()
+        if durations
+    ]
+
+
+def append_history(history_file: Path, records: list[BenchmarkRecord]) -> None:
+    """Appends records to a benchmark history.
+
+    Args:
+        history_file: The history. It is written as CSV if it has the suffix ``.csv`` and as JSON lines otherwise.
+        records: The records to append.
+    """
+    history_file.parent.mkdir(parents=True, exist_ok=True)
+    if history_file.suffix == ".csv":
+        write_header = not history_file.is_file() or history_file.stat().st_size == 0
+        with history_file.open("a", encoding="utf-8", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=[field.name for field in fields(BenchmarkRecord)])
+            if write_header:
+                writer.writeheader()
+            writer.writerows(asdict(record) for record in records)
+    else:
+        with history_file.open("a", encoding="utf-8") as file:
+            file.writelines(json.dumps(asdict(record)) + "\n" for record in records)
+    _logger.info(f"Appended {len(records)} benchmark records to {history_file}")
+
+
+def load_history(history_file: Path) -> list[BenchmarkRecord]:
+    """Loads a benchmark history.
+
+    Args:
+        history_file: The history, as CSV if it has the suffix ``.csv`` and as JSON lines otherwise.
+
+    Returns:
+        The records, oldest first, or an empty list if the history doesn't exist.
+    """
+    if not history_file.is_file():
+        return []
+    with history_file.open(encoding="utf-8", newline="") as file:
+        if history_file.suffix == ".csv":
+            rows: list[dict] = list(csv.DictReader(file))
+        else:
+            rows = [json.loads(line) for line in file if line.strip()]
+    return [_to_record(row) for row in rows]
+
+
+def _to_record(row: dict) -> BenchmarkRecord:
+    # CSV provides all values as strings
+    converters = {"iterations": int, "cpu_count": int, "median": float, "minimum": float, "maximum": float}
+    return BenchmarkRecord(
+        **{field.name: converters.get(field.name, str)(row[field.name]) for field in fields(BenchmarkRecord)}
+    )
+
+
+def check_regressions(
+    records: list[BenchmarkRecord],
+    history: list[BenchmarkRecord],
+    threshold: float = 0.2,
+    min_delta: float = 0.5,
+    baseline_runs: int = 5,
+) -> list[Regression]:
+    """Compares the phases of a benchmark run with their baseline.
+
+    The baseline of a phase is the median of the last runs of the phase on comparable hosts, which use the same
+    accelerator and number of CPUs. Phases without a baseline never regress.
+
+    Args:
+        records: The records of the current run.
+        history: The records of the previous runs, oldest first.
+        threshold: The relative increase of the median duration above which a phase regresses.
+        min_delta: The absolute increase in seconds a phase has to exceed as well, so short phases don't regress
+            because of noise.
+        baseline_runs: The number of previous runs the baseline is computed from.
+
+    Returns:
+        The phases that regressed.
+    """
+    regressions = []
+    for record in records:
+        baseline_records = [
+            previous
+            for previous in history
+            if previous.phase == record.phase
+            and previous.accelerator == record.accelerator
+            and previous.cpu_count == record.cpu_count
+        ][-baseline_runs:]
+        if not baseline_records:
+            continue
+        baseline = statistics.median(previous.median for previous in baseline_records)
+        if record.median - baseline > min_delta and record.median > baseline * (1 + threshold):
+            regressions.append(Regression(phase=record.phase, baseline=baseline, median=record.median))
+    return regressions
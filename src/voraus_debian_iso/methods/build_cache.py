@@ -0,0 +1,286 @@
+"""Contains a content-addressed cache for the results of the build phases."""
+
+import hashlib
+import json
+import os
+from logging import DEBUG, INFO, getLogger
+from pathlib import Path
+from shutil import copyfile, rmtree
+from types import TracebackType
+from typing import Callable
+
+from voraus_debian_iso.methods.locking import FileLock
+
+_logger = getLogger(__name__)
+
+_INPUTS_FILE_NAME = "inputs.json"
+
+
+class BuildCache:
+    """A content-addressed cache for build phase results with size-based eviction.
+
+    Every phase result is stored in its own entry directory, which is named after the phase and a hash of the phase
+    inputs. The inputs of the latest entry of every phase and scope are remembered to explain why a phase had to run.
+
+    The cache can be shared by concurrent builds: an entry is produced under an exclusive lock and stays protected by a
+    shared lock from eviction until the cache is released.
+    """
+
+    def __init__(self, root: Path, max_size: int) -> None:
+        """Initializes the cache.
+
+        Args:
+            root: The root directory of the cache.
+            max_size: The maximum size of all entries in bytes before the least recently used ones are evicted.
+        """
+        self.root = root
+        self.max_size = max_size
+        self._held_locks: dict[Path, FileLock] = {}
+
+    @staticmethod
+    def get_key(inputs: dict[str, str]) -> str:
+        """Returns the cache key of a set of phase inputs.
+
+        Args:
+            inputs: The named digests of the phase inputs.
+
+        Returns:
+            The cache key.
+        """
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+    def get_or_create(
+        self,
+        *,
+        phase: str,
+        scope: str,
+        inputs: dict[str, str],
+        producer: Callable[[Path], None],
+        explain: bool = False,
+    ) -> Path:
+        """Returns the entry of a phase, running the phase if its inputs have changed.
+
+        Args:
+            phase: The name of the phase.
+            scope: The scope of the phase, for example the debian version and architecture.
+            inputs: The named digests of the phase inputs.
+            producer: The function that runs the phase and writes its result to the given directory.
+            explain: Whether to log why the phase is up to date or has to run.
+
+        Returns:
+            The entry directory containing the phase result.
+        """
+        entry_dir = self._get_entry_dir(phase, self.get_key(inputs))
+        if entry_dir in self._held_locks:
+            return entry_dir
+        lock = self._get_lock(entry_dir)
+        lock.acquire()
+        self._held_locks[entry_dir] = lock
+        if self.lookup(phase=phase, scope=scope, inputs=inputs, explain=explain) is None:
+            self.store(phase=phase, scope=scope, inputs=inputs, producer=producer)
+        lock.acquire(shared=True)
+        return entry_dir
+
+    def lookup(self, phase: str, scope: str, inputs: dict[str, str], explain: bool = False) -> Path | None:
+        """Looks up the entry of a phase.
+
+        Args:
+            phase: The name of the phase.
+            scope: The scope of the phase, for example the debian version and architecture.
+            inputs: The named digests of the phase inputs.
+            explain: Whether to log why the phase is up to date or has to run.
+
+        Returns:
+            The entry directory or None if the phase has to run.
+        """
+        key = self.get_key(inputs)
+        entry_dir = self._get_entry_dir(phase, key)
+        level = INFO if explain else DEBUG
+        if entry_dir.is_dir():
+            _logger.log(level, f"Phase '{phase}' is up to date ({key[:12]})")
+            os.utime(entry_dir)
+            self._get_last_inputs_file(phase, scope).write_text(json.dumps(inputs))
+            return entry_dir
+        _logger.log(level, f"Phase '{phase}' has to run: {self._explain_miss(phase, scope, inputs)}")
+        return None
+
+    def store(self, phase: str, scope: str, inputs: dict[str, str], producer: Callable[[Path], None]) -> Path:
+        """Runs a phase and stores its result.
+
+        Args:
+            phase: The name of the phase.
+            scope: The scope of the phase, for example the debian version and architecture.
+            inputs: The named digests of the phase inputs.
+            producer: The function that runs the phase and writes its result to the given directory.
+
+        Returns:
+            The entry directory containing the phase result.
+        """
+        key = self.get_key(inputs)
+        entry_dir = self._get_entry_dir(phase, key)
+        temporary_dir = self.root / f".{entry_dir.name}.{os.getpid()}.tmp"
+        if temporary_dir.is_dir():
+            rmtree(temporary_dir)
+        temporary_dir.mkdir(parents=True)
+        try:
+            producer(temporary_dir)
+            (temporary_dir / _INPUTS_FILE_NAME).write_text(json.dumps(inputs, indent=2))
+            if entry_dir.is_dir():
+                rmtree(entry_dir)
+            temporary_dir.rename(entry_dir)
+        finally:
+            if temporary_dir.is_dir():
+                rmtree(temporary_dir)
+        self._get_last_inputs_file(phase, scope).write_text(json.dumps(inputs))
+        return entry_dir
+
+    def evict(self) -> None:
+        """Evicts the least recently used entries until the cache fits into its maximum size.
+
+        Entries that are in use by this or any other build are never evicted.
+        """
+        entries = sorted(
+            (path for path in self.root.glob("*-*") if path.is_dir() and not path.name.startswith(".")),
+            key=lambda path: path.stat().st_mtime,
+        )
+        sizes = {entry: _get_directory_size(entry) for entry in entries}
+        total_size = sum(sizes.values())
+        for entry in entries:
+            if total_size <= self.max_size:
+                break
+            lock = self._get_lock(entry)
+            if not lock.acquire(blocking=False):
+                continue
+            try:
+                _logger.info(f"Evicting build cache entry {entry.name} ({sizes[entry]} bytes)")
+                rmtree(entry)
+                total_size -= sizes[entry]
+            finally:
+                lock.release()
+
+    def release(self) -> None:
+        """Releases all entries used by this build, so they can be evicted by others."""
+        for lock in self._held_locks.values():
+            lock.release()
+        self._held_locks.clear()
+
+    def __enter__(self) -> "BuildCache":
+        """Enters the context of a build.
+
+        Returns:
+            The cache.
+        """
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Releases all entries used by the build.
+
+        Args:
+            exc_type: The type of the exception that has been raised, if any.
+            exc_value: The exception that has been raised, if any.
+            traceback: The traceback of the exception that has been raised, if any.
+        """
+        self.release()
+
+    def _get_lock(self, entry_dir: Path) -> FileLock:
+        return FileLock(self.root / ".locks" / f"{entry_dir.name}.lock")
+
+    def _get_entry_dir(self, phase: str, key: str) -> Path:
+        return self.root / f"{phase}-{key}"
+
+    def _get_last_inputs_file(self, phase: str, scope: str) -> Path:
+        last_dir = self.root / ".last"
+        last_dir.mkdir(parents=True, exist_ok=True)
+        return last_dir / f"{phase}-{scope}.json"
+
+    def _explain_miss(self, phase: str, scope: str, inputs: dict[str, str]) -> str:
+        try:
+            last_inputs = json.loads(self._get_last_inputs_file(phase, scope).read_text())
+        except (OSError, ValueError):
+            return "no previous result"
+        changes = [
+            f"input '{name}' changed ({str(last_inputs.get(name))[:12]} -> {str(inputs.get(name))[:12]})"
+            for name in sorted(set(inputs) | set(last_inputs))
+            if last_inputs.get(name) != inputs.get(name)
+        ]
+        return ", ".join(changes) if changes else "the previous result has been evicted"
+
+
+def get_directory_digest(directory: Path) -> str:
+    """Returns a digest of the relative paths and contents of all files in a directory.
+
+    Args:
+        directory: The directory to hash.
+
+    Returns:
+        The SHA256 hex digest.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(directory.rglob("*")):
+        if path.is_file():
+            digest.update(str(path.relative_to(directory)).encode() + b"\0")
+            digest.update(hashlib.sha256(path.read_bytes()).digest())
+    return digest.hexdigest()
+
+
+def get_file_digest(path: Path) -> str:
+    """Returns a digest of the contents of a file.
+
+    Args:
+        path: The file to hash.
+
+    Returns:
+        The SHA256 hex digest.
+    """
+    digest = hashlib.sha256()
+    with path.open("rb") as file:
+        while chunk := file.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_text_digest(text: str) -> str:
+    """Returns a digest of a text.
+
+    Args:
+        text: The text to hash.
+
+    Returns:
+        The SHA256 hex digest.
+    """
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def link_or_copy(source: Path, destination: Path) -> None:
+    """Hard-links a file to a destination, falling back to a copy if linking is not possible.
+
+    Args:
+        source: The file to link.
+        destination: The destination path, which is replaced if it exists.
+    """
+    if destination.exists() and destination.samefile(source):
+        return
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    destination.unlink(missing_ok=True)
+    try:
+        os.link(source, destination)
+    except OSError:
+        temporary_file = destination.with_name(f".{destination.name}.{os.getpid()}.tmp")
+        copyfile(source, temporary_file)
+        temporary_file.replace(destination)
+
+
+def _get_directory_size(directory: Path) -> int:
+    inodes = set()
+    size = 0
+    for path in directory.rglob("*"):
+        stat = path.lstat()
+        if path.is_file() and stat.st_ino not in inodes:
+            inodes.add(stat.st_ino)
+            size += stat.st_size
+    return size
@@ -0,0 +1,145 @@
+"""Contains all CLI benchmark methods."""
+
+import logging
+from enum import Enum
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rich import print as rich_print
+from rich.table import Table
+
+from voraus_debian_iso.constants import CACHE_DIR, DEFAULT_ARCHITECTURE, DEFAULT_DEBIAN_VERSION, WORKSPACES_DIR
+from voraus_debian_iso.methods.benchmark import (
+    BenchmarkRecord,
+    Regression,
+    append_history,
+    check_regressions,
+    get_host_context,
+    load_history,
+    summarize,
+)
+from voraus_debian_iso.methods.cli.cli_build_methods import build_impl
+from voraus_debian_iso.methods.cli.cli_install_methods import install_impl
+from voraus_debian_iso.methods.cli.cli_reset_methods import reset_impl
+from voraus_debian_iso.methods.cli.cli_start_methods import start_impl
+from voraus_debian_iso.methods.cli.cli_stop_methods import stop_impl
+from voraus_debian_iso.methods.timing import PhaseRecorder, phase
+
+_logger = logging.getLogger(__name__)
+
+BENCHMARK_DIR = CACHE_DIR / "benchmark"
+BENCHMARK_VM_NAME = "benchmark"
+
+
+class BenchmarkPipeline(str, Enum):
+    """Enum for the pipelines that can be benchmarked."""
+
+    BUILD = "build"
+    INSTALL = "install"
+    BOOT = "boot"
+
+
+def benchmark_impl(
+    pipelines: list[BenchmarkPipeline],
+    *,
+    iterations: int = 3,
+    iso_file: Path | None = None,
+    disk_file: Path = BENCHMARK_DIR / "golden.img",
+    history_file: Path = BENCHMARK_DIR / "history.jsonl",
+    threshold: float = 0.2,
+) -> list[BenchmarkRecord]:
+    """CLI benchmark implementation.
+
+    Runs the pipelines for several iterations and records the duration of each of their phases. The summary is
+    appended to the history, and every phase is compared with the previous runs on comparable hosts.
+
+    The build runs with an empty build cache, but takes the upstream ISO from the download cache. The installation
+    downloads its packages through the caching APT proxy, which serves them from its cache after the first run. Once
+    both caches are warm, the benchmark runs offline.
+
+    Args:
+        pipelines: The pipelines to run, in the order build, install, boot.
+        iterations: The number of iterations.
+        iso_file: The ISO to install. Required if the install pipeline runs without the build pipeline.
+        disk_file: The golden image the install pipeline writes and the boot pipeline starts from.
+        history_file: The history, as CSV if it has the suffix ``.csv`` and as JSON lines otherwise.
+        threshold: The relative increase of the median duration of a phase above which it regresses.
+
+    Returns:
+        The records of the run.
+
+    Raises:
+        ValueError: If the install pipeline has no ISO or there are no iterations.
+        RuntimeError: If any of the phases regressed.
+    """
+    if iterations < 1:
+        raise ValueError(f"The number of iterations must be positive, not {iterations}")
+    if BenchmarkPipeline.INSTALL in pipelines and BenchmarkPipeline.BUILD not in pipelines and iso_file is None:
+        raise ValueError("The install pipeline requires an ISO file if it runs without the build pipeline")
+
+    host = get_host_context(BENCHMARK_DIR)
+    _logger.info(
+        f"Benchmarking {', '.join(pipeline.value for pipeline in pipelines)} with {iterations} iterations on "
+        f"{host.cpu_count} CPUs ({host.cpu_model}), accelerator {host.accelerator} and disk type {host.disk_type}"
+    )
+    samples: dict[str, list[float]] = {}
+    for iteration in range(iterations):
+        _logger.info(f"Benchmark iteration {iteration + 1}/{iterations}")
+        recorder = PhaseRecorder()
+        with recorder.activate():
+            iso_file = _run_iteration(pipelines=pipelines, iso_file=iso_file, disk_file=disk_file)
+        for name, duration in recorder.phases.items():
+            samples.setdefault(name, []).append(duration)
+
+    records = summarize(samples, host=host)
+    regressions = check_regressions(records, history=load_history(history_file), threshold=threshold)
+    _print_records(records, regressions)
+    append_history(history_file, records)
+    if regressions:
+        raise RuntimeError(
+            "Phases regressed: "
+            + ", ".join(
+                f"{regression.phase} ({regression.baseline:.1f}s -> {regression.median:.1f}s)"
+                for regression in regressions
+            )
+        )
+    return records
+
+
+def _run_iteration(pipelines: list[BenchmarkPipeline], iso_file: Path | None, disk_file: Path) -> Path | None:
+    if BenchmarkPipeline.BUILD in pipelines:
+        WORKSPACES_DIR.mkdir(parents=True, exist_ok=True)
+        with TemporaryDirectory(prefix="benchmark-", dir=WORKSPACES_DIR) as cache_dir, phase("build"):
+            iso_file = build_impl(
+                debian_version=DEFAULT_DEBIAN_VERSION,
+                architecture=DEFAULT_ARCHITECTURE,
+                output_directory=BENCHMARK_DIR,
+                cache_dir=Path(cache_dir),
+            )
+    if BenchmarkPipeline.INSTALL in pipelines and iso_file is not None:
+        with phase("install"):
+            install_impl(iso_file=iso_file, disk_file=disk_file, direct_kernel_boot=True, golden=True, apt_cache=True)
+    if BenchmarkPipeline.BOOT in pipelines:
+        reset_impl(base_file=disk_file, name=BENCHMARK_VM_NAME)
+        try:
+            with phase("boot"):
+                start_impl(name=BENCHMARK_VM_NAME, base_file=disk_file)
+        finally:
+            with phase("stop"):
+                stop_impl(name=BENCHMARK_VM_NAME)
+    return iso_file
+
+
+def _print_records(records: list[BenchmarkRecord], regressions: list[Regression]) -> None:
+    regressed = {regression.phase: regression for regression in regressions}
+    table = Table("Phase", "Median", "Min", "Max", "Result")
+    for record in records:
+        regression = regressed.get(record.phase)
+        table.add_row(
+            record.phase,
+            f"{record.median:.2f}s",
+            f"{record.minimum:.2f}s",
+            f"{record.maximum:.2f}s",
+            "OK" if regression is None else f"[red]+{regression.increase:.0%}[/red]",
+        )
+    rich_print(table)
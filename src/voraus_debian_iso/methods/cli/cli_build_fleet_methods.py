@@ -0,0 +1,152 @@
+"""Contains all CLI build-fleet methods."""
+
+import csv
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from voraus_debian_iso.constants import WORKSPACES_DIR
+from voraus_debian_iso.methods.cli.cli_build_methods import BuildMode, build_impl, patch_iso_in_place, render_preseed
+from voraus_debian_iso.methods.shell import install_signal_handlers
+
+_logger = getLogger(__name__)
+
+_PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+_UNIT_NAME_PATTERN = re.compile(r"^[A-Za-z0-9._-]+$")
+
+
+def build_fleet_impl(
+    inventory_file: Path,
+    template_file: Path,
+    *,
+    debian_version: str,
+    architecture: str,
+    output_directory: Path,
+    jobs: int | None = None,
+) -> list[Path]:
+    """CLI build-fleet implementation.
+
+    Builds the customized base ISO once (or takes it from the build cache) and derives one ISO per inventory unit from
+    it. Only the rendered preseed file and the boot loader configurations carrying its checksum differ between the
+    unit ISOs.
+
+    Args:
+        inventory_file: A CSV file with a header row or a JSON file with a list of objects, one per unit. Every unit
+            needs a ``name``, which is used for the output file name. All values can be used as placeholders.
+        template_file: The preseed template. ``{{ key }}`` placeholders are replaced with the values of the unit.
+        debian_version: The debian version to use.
+        architecture: The architecture to use.
+        output_directory: The directory where the output ISO files will be saved.
+        jobs: The maximum number of ISOs written concurrently. Defaults to the number of CPUs.
+
+    Returns:
+        The paths of the output ISO files.
+    """
+    units = load_inventory(inventory_file)
+    template = template_file.read_text()
+    preseeds = {unit["name"]: render_template(template, unit) for unit in units}
+    base_iso = build_impl(
+        debian_version=debian_version,
+        architecture=architecture,
+        output_directory=output_directory,
+        mode=BuildMode.IN_PLACE,
+    )
+
+    _logger.info(f"Building {len(units)} unit ISOs from {base_iso}")
+    # The unit ISOs are written by worker threads, which can't install the signal handlers themselves
+    install_signal_handlers()
+    WORKSPACES_DIR.mkdir(parents=True, exist_ok=True)
+    with (
+        TemporaryDirectory(prefix="fleet-", dir=WORKSPACES_DIR) as workspace_dir,
+        ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor,
+    ):
+        futures = [
+            executor.submit(
+                _build_unit_iso,
+                debian_version=debian_version,
+                architecture=architecture,
+                base_iso=base_iso,
+                preseed=preseed,
+                unit_dir=Path(workspace_dir) / name,
+                output_file_path=output_directory / f"{base_iso.stem}-{name}.iso",
+            )
+            for name, preseed in preseeds.items()
+        ]
+        output_files = [future.result() for future in futures]
+    _logger.info(f"{len(output_files)} unit ISOs have been written to {output_directory}")
+    return output_files
+
+
+def load_inventory(inventory_file: Path) -> list[dict[str, str]]:
+    """Loads a fleet inventory.
+
+    Args:
+        inventory_file: A CSV file with a header row or a JSON file with a list of objects, one per unit.
+
+    Returns:
+        The units with their values.
+
+    Raises:
+        ValueError: If a unit has no valid name or names are not unique.
+    """
+    if inventory_file.suffix.lower() == ".json":
+        units = [{key: str(value) for key, value in unit.items()} for unit in json.loads(inventory_file.read_text())]
+    else:
+        with inventory_file.open(newline="") as file:
+            units = list(csv.DictReader(file))
+
+    names = set()
+    for index, unit in enumerate(units):
+        name = unit.get("name", "")
+        if not _UNIT_NAME_PATTERN.match(name):
+            raise ValueError(f"Unit {index} in {inventory_file} has no valid name (letters, digits, '.', '_', '-')")
+        if name in names:
+            raise ValueError(f"Unit name '{name}' is used more than once in {inventory_file}")
+        names.add(name)
+    return units
+
+
+def render_template(template: str, values: dict[str, str]) -> str:
+    """Replaces all ``{{ key }}`` placeholders of a template.
+
+    Args:
+        template: The template.
+        values: The values of the placeholders.
+
+    Returns:
+        The rendered template.
+
+    Raises:
+        ValueError: If the template contains a placeholder without a value.
+
+    Example:
+        >>> render_template("d-i netcfg/hostname string {{ hostname }}", {"hostname": "robot-01"})
+        'd-i netcfg/hostname string robot-01'
+    """
+    missing = sorted({key for key in _PLACEHOLDER_PATTERN.findall(template) if key not in values})
+    if missing:
+        raise ValueError(f"No value for placeholders {', '.join(missing)} of unit '{values.get('name')}'")
+    return _PLACEHOLDER_PATTERN.sub(lambda match: values[match.group(1)], template)
+
+
+def _build_unit_iso(
+    *, debian_version: str, architecture: str, base_iso: Path, preseed: str, unit_dir: Path, output_file_path: Path
+) -> Path:
+    unit_dir.mkdir(parents=True)
+    preseed_file = unit_dir / "preseed.cfg"
+    preseed_file.write_text(preseed)
+    overlay_dir = unit_dir / "overlay"
+    overlay_dir.mkdir()
+    render_preseed(overlay_dir=overlay_dir, preseed_file=preseed_file)
+    patch_iso_in_place(
+        debian_version=debian_version,
+        architecture=architecture,
+        iso_path=base_iso,
+        overlay_dir=overlay_dir,
+        output_file_path=output_file_path,
+    )
+    return output_file_path
@@ -1,83 +1,298 @@
 """Contains all CLI build methods."""
 
 import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from enum import Enum
 from logging import getLogger
 from pathlib import Path
-from shutil import copytree, rmtree
-from urllib.request import urlretrieve
+from shutil import copy2, copytree, rmtree
+from tempfile import TemporaryDirectory
 
 from setuptools_scm import get_version
 
-from voraus_debian_iso.constants import CACHE_DIR, DATA_DIR, EXTRACTED_DIR, ISO_FILENAME_TEMPLATE, MBR_FILE
-from voraus_debian_iso.methods.shell import execute_command
+from voraus_debian_iso.constants import (
+    BUILD_CACHE_DIR,
+    BUILD_CACHE_MAX_SIZE,
+    CACHE_DIR,
+    DATA_DIR,
+    ISO_FILENAME_TEMPLATE,
+    WORKSPACES_DIR,
+)
+from voraus_debian_iso.methods.build_cache import (
+    BuildCache,
+    get_directory_digest,
+    get_file_digest,
+    get_text_digest,
+    link_or_copy,
+)
+from voraus_debian_iso.methods.download import download_file, get_verified_sha256
+from voraus_debian_iso.methods.package_pool import (
+    OFFLINE_PRESEED_VALUES,
+    get_deb_files,
+    render_package_pool,
+    set_preseed_values,
+)
+from voraus_debian_iso.methods.shell import execute_command, execute_commands
+from voraus_debian_iso.methods.timing import phase
 
 _logger = getLogger(__name__)
 
+_MBR_FILE_NAME = "isohdpfx.bin"
+_ISO_FILE_NAME = "image.iso"
 
-def build_impl(debian_version: str, architecture: str, output_directory: Path) -> None:
+
+class BuildMode(str, Enum):
+    """Enum for the ways the customized ISO can be produced."""
+
+    IN_PLACE = "in-place"
+    EXTRACT = "extract"
+
+
+def build_impl(  # pylint: disable=too-many-locals
+    debian_version: str,
+    architecture: str,
+    output_directory: Path,
+    *,
+    mode: BuildMode = BuildMode.IN_PLACE,
+    explain: bool = False,
+    packages: list[Path] | None = None,
+    cache_dir: Path = BUILD_CACHE_DIR,
+) -> Path:
     """CLI build implementation.
 
+    Every phase (extract, patch, repack) is keyed by a hash of its inputs, so unchanged phases are taken from the
+    build cache instead of running again.
+
     Args:
         debian_version: The debian version to use.
         architecture: The architecture to use.
         output_directory: The directory where the output ISO file will be saved.
+        mode: The way the customized ISO is produced.
+        explain: Whether to log which phases are up to date and why the others have to run.
+        packages: The ``.deb`` files and directories of ``.deb`` files to embed into the APT repository of the ISO.
+        cache_dir: The directory of the build cache. An empty directory runs all phases.
+
+    Returns:
+        The path of the output ISO file.
     """
     CACHE_DIR.mkdir(exist_ok=True, parents=True)
-    iso_path = _download_iso(architecture=architecture, version=debian_version)
-    _extract_iso(iso_path=iso_path, extracted_dir=EXTRACTED_DIR)
-    _patch_extracted_iso(extracted_iso_dir=EXTRACTED_DIR)
-    _repack_iso(
-        debian_version=debian_version,
-        architecture=architecture,
-        extracted_iso_dir=EXTRACTED_DIR,
-        output_directory=output_directory,
-    )
+    WORKSPACES_DIR.mkdir(exist_ok=True, parents=True)
+    scope = f"{debian_version}-{architecture}"
+    with phase("build:download"):
+        iso_path = _download_iso(architecture=architecture, version=debian_version)
+    version = get_version()
+    output_file_path = output_directory / f"voraus-debian-{debian_version}-preseed-{version}-{architecture}-netinst.iso"
+
+    iso_digest = get_verified_sha256(iso_path) or get_file_digest(iso_path)
+    deb_files = get_deb_files(packages or [])
+
+    patch_inputs = {
+        "data": get_directory_digest(DATA_DIR),
+        "kernel_params": get_text_digest(get_kernel_params(preseed_file=DATA_DIR / "preseed" / "preseed.cfg")),
+    }
+    if deb_files:
+        # The package indexes extend the Release file of the upstream ISO
+        patch_inputs["iso"] = iso_digest
+        patch_inputs["packages"] = get_text_digest(" ".join(get_file_digest(deb_file) for deb_file in deb_files))
+    repack_inputs = {
+        "iso": iso_digest,
+        "patch": BuildCache.get_key(patch_inputs),
+        "version": version,
+        "debian_version": debian_version,
+        "architecture": architecture,
+        "mode": mode.value,
+    }
+
+    with (
+        BuildCache(root=cache_dir, max_size=BUILD_CACHE_MAX_SIZE) as cache,
+        TemporaryDirectory(prefix=f"{scope}-", dir=WORKSPACES_DIR) as workspace_dir,
+    ):
+
+        def _produce_repack(entry_dir: Path) -> None:
+            overlay_dir = cache.get_or_create(
+                phase="patch",
+                scope=scope,
+                inputs=patch_inputs,
+                producer=lambda directory: _render_overlay(
+                    overlay_dir=directory, iso_path=iso_path, architecture=architecture, deb_files=deb_files
+                ),
+                explain=explain,
+            )
+            if mode == BuildMode.IN_PLACE:
+                patch_iso_in_place(
+                    debian_version=debian_version,
+                    architecture=architecture,
+                    iso_path=iso_path,
+                    overlay_dir=overlay_dir,
+                    output_file_path=entry_dir / _ISO_FILE_NAME,
+                )
+                return
+
+            extract_dir = cache.get_or_create(
+                phase="extract",
+                scope=scope,
+                inputs={"iso": iso_digest},
+                producer=lambda directory: _extract_iso(iso_path=iso_path, extract_dir=directory),
+                explain=explain,
+            )
+            extracted_iso_dir = Path(workspace_dir) / "extracted"
+            _patch_extracted_iso(extract_dir=extract_dir, overlay_dir=overlay_dir, extracted_iso_dir=extracted_iso_dir)
+            _repack_iso(
+                debian_version=debian_version,
+                architecture=architecture,
+                extracted_iso_dir=extracted_iso_dir,
+                mbr_file=extract_dir / _MBR_FILE_NAME,
+                output_file_path=entry_dir / _ISO_FILE_NAME,
+            )
+
+        repack_dir = cache.get_or_create(
+            phase="repack", scope=scope, inputs=repack_inputs, producer=_produce_repack, explain=explain
+        )
+        link_or_copy(repack_dir / _ISO_FILE_NAME, output_file_path)
+        cache.evict()
+    _logger.info(f"ISO has been written to {output_file_path}")
+    return output_file_path
+
+
+def build_matrix_impl(  # pylint: disable=too-many-locals
+    debian_versions: list[str],
+    architectures: list[str],
+    output_directory: Path,
+    *,
+    mode: BuildMode = BuildMode.IN_PLACE,
+    explain: bool = False,
+    jobs: int | None = None,
+    packages: list[Path] | None = None,
+) -> list[Path]:
+    """CLI build implementation for several debian version / architecture pairs at once.
+
+    The builds run concurrently in a process pool. Every build uses its own workspace, while the download and build
+    caches are shared.
+
+    Args:
+        debian_versions: The debian versions to use.
+        architectures: The architectures to use. A single architecture is used for all debian versions, otherwise
+            the n-th architecture is paired with the n-th debian version.
+        output_directory: The directory where the output ISO files will be saved.
+        mode: The way the customized ISOs are produced.
+        explain: Whether to log which phases are up to date and why the others have to run.
+        jobs: The maximum number of concurrent builds. Defaults to the number of pairs.
+        packages: The ``.deb`` files and directories of ``.deb`` files to embed into the APT repository of the ISOs.
+
+    Returns:
+        The paths of the output ISO files.
+
+    Raises:
+        ValueError: If the debian versions and architectures can't be paired.
+        RuntimeError: If any of the builds failed.
+    """
+    if len(architectures) == 1:
+        architectures = architectures * len(debian_versions)
+    if len(architectures) != len(debian_versions):
+        raise ValueError(
+            f"Got {len(debian_versions)} debian versions but {len(architectures)} architectures. "
+            "Pass either a single architecture or one per debian version."
+        )
+    pairs = list(dict.fromkeys(zip(debian_versions, architectures)))
+    _logger.info(f"Building {len(pairs)} ISOs: {', '.join(f'{version}/{arch}' for version, arch in pairs)}")
+
+    output_files = []
+    failures = []
+    with ProcessPoolExecutor(max_workers=jobs or len(pairs)) as executor:
+        futures = {
+            executor.submit(
+                build_impl,
+                debian_version=version,
+                architecture=arch,
+                output_directory=output_directory,
+                mode=mode,
+                explain=explain,
+                packages=packages,
+            ): (version, arch)
+            for version, arch in pairs
+        }
+        for future in as_completed(futures):
+            version, arch = futures[future]
+            try:
+                output_files.append(future.result())
+            except Exception as error:  # pylint: disable=broad-except
+                _logger.error(f"Build of {version}/{arch} failed: {error}")
+                failures.append(f"{version}/{arch}")
+
+    if failures:
+        raise RuntimeError(f"Failed to build {', '.join(failures)}")
+    return output_files
 
 
 def _download_iso(architecture: str, version: str) -> Path:
     file_name = ISO_FILENAME_TEMPLATE.format(architecture=architecture, version=version)
-    file_path = CACHE_DIR / file_name
-    if file_path.is_file():
-        _logger.info(f"{file_path} exists, skipping download")
-        return file_path
-
-    for download_url in [
-        f"https://cdimage.debian.org/debian-cd/{version}/{architecture}/iso-cd/{file_name}",
-        f"https://cdimage.debian.org/cdimage/archive/{version}/{architecture}/iso-cd/{file_name}",
-    ]:
-        try:
-            _logger.info(f"Attempting download {download_url} to file {file_path}")
-            urlretrieve(download_url, file_path)
-            return file_path
-        except Exception as e:  # pylint: disable=broad-except
-            _logger.error(f"Failed to download {download_url}: {e}")
+    return download_file(
+        mirror_urls=[
+            f"https://cdimage.debian.org/debian-cd/{version}/{architecture}/iso-cd",
+            f"https://cdimage.debian.org/cdimage/archive/{version}/{architecture}/iso-cd",
+        ],
+        file_name=file_name,
+        destination=CACHE_DIR / file_name,
+    )
 
-    raise RuntimeError(f"Failed to download ISO for version {version} and architecture {architecture}")
 
+def _extract_iso(iso_path: Path, extract_dir: Path) -> None:
+    tree_dir = extract_dir / "tree"
+    tree_dir.mkdir()
+    mbr_file = extract_dir / _MBR_FILE_NAME
+    with phase("build:extract"):
+        _logger.info(f"Extracting ISO {iso_path} to {tree_dir} and generating file {mbr_file}")
+        # Verbose, so the extraction reports its progress
+        execute_commands(
+            [
+                ["bsdtar", "-C", str(tree_dir), "-xvf", str(iso_path)],
+                ["dd", f"if={iso_path}", "bs=1", "count=432", f"of={mbr_file}"],
+            ]
+        )
+        execute_command(["chmod", "-R", "+rw", str(tree_dir)])
 
-def _extract_iso(iso_path: Path, extracted_dir: Path) -> None:
-    if extracted_dir.is_dir():
-        rmtree(extracted_dir)
-    extracted_dir.mkdir()
-    _logger.info(f"Extracting ISO {iso_path} to {extracted_dir}")
-    execute_command(["bsdtar", "-C", str(extracted_dir), "-xf", str(iso_path)])
-    execute_command(["chmod", "-R", "+rw", str(extracted_dir)])
-    _logger.info(f"Generating file {MBR_FILE}")
-    execute_command(["dd", f"if={iso_path}", "bs=1", "count=432", f"of={MBR_FILE}"])
 
+def _patch_extracted_iso(extract_dir: Path, overlay_dir: Path, extracted_iso_dir: Path) -> None:
+    if extracted_iso_dir.is_dir():
+        rmtree(extracted_iso_dir)
+    _logger.info(f"Linking extracted ISO {extract_dir} to {extracted_iso_dir}")
+    execute_command(["cp", "-al", str(extract_dir / "tree"), str(extracted_iso_dir)])
+    _logger.info(f"Copying customized files from {overlay_dir} to {extracted_iso_dir}")
+    copytree(overlay_dir, extracted_iso_dir, dirs_exist_ok=True, copy_function=_replace_file)
 
-def _patch_extracted_iso(extracted_iso_dir: Path) -> None:
-    _configure_preseed(extracted_iso_dir=extracted_iso_dir)
 
+def _replace_file(source: str, destination: str) -> None:
+    # The extracted tree is hard-linked to the build cache, so files must be replaced instead of overwritten
+    Path(destination).unlink(missing_ok=True)
+    copy2(source, destination)
 
-def _configure_preseed(extracted_iso_dir: Path) -> None:
-    _logger.info("Configuring preseed")
-    preseed_dir = DATA_DIR / "preseed"
-    preseed_file = preseed_dir / "preseed.cfg"
-    preseed_checksum = hashlib.md5(preseed_file.read_bytes()).hexdigest()
-    copytree(preseed_dir, extracted_iso_dir, dirs_exist_ok=True)
 
-    kernel_params = " ".join(
+def _render_overlay(overlay_dir: Path, iso_path: Path, architecture: str, deb_files: list[Path]) -> None:
+    # Only the files that differ from the upstream ISO are rendered, using the directory layout of the ISO
+    with phase("build:patch"):
+        _logger.info("Patching GRUB / ISOLINUX")
+        copytree(DATA_DIR / "grub", overlay_dir / "boot" / "grub", dirs_exist_ok=True)
+        copytree(DATA_DIR / "isolinux", overlay_dir / "isolinux", dirs_exist_ok=True)
+        render_preseed(
+            overlay_dir=overlay_dir, preseed_file=DATA_DIR / "preseed" / "preseed.cfg", offline_pool=bool(deb_files)
+        )
+        if deb_files:
+            render_package_pool(
+                overlay_dir=overlay_dir, iso_path=iso_path, architecture=architecture, deb_files=deb_files
+            )
+
+
+def get_kernel_params(preseed_file: Path) -> str:
+    """Returns the kernel parameters for an automatic installation with a preseed file.
+
+    Args:
+        preseed_file: The preseed file, which is placed at the root of the ISO.
+
+    Returns:
+        The kernel parameters.
+    """
+    preseed_checksum = hashlib.md5(preseed_file.read_bytes()).hexdigest()
+    return " ".join(
         [
             "vga=788",
             "auto=true",
@@ -89,54 +304,106 @@ def _configure_preseed(extracted_iso_dir: Path) -> None:
         ]
     )
 
-    _logger.info("Patching GRUB / ISOLINUX")
-    copytree(DATA_DIR / "grub", extracted_iso_dir / "boot" / "grub", dirs_exist_ok=True)
-    copytree(DATA_DIR / "isolinux", extracted_iso_dir / "isolinux", dirs_exist_ok=True)
-    for file in [
-        extracted_iso_dir / "boot" / "grub" / "grub.cfg",
-        extracted_iso_dir / "isolinux" / "txt.cfg",
+
+def render_preseed(overlay_dir: Path, preseed_file: Path, offline_pool: bool = False) -> None:
+    """Renders a preseed file and the boot loader configurations that reference it into an overlay directory.
+
+    Args:
+        overlay_dir: The overlay directory, using the directory layout of the ISO.
+        preseed_file: The preseed file to use.
+        offline_pool: Whether the ISO has a package pool. The installer then takes the packages from the cdrom
+            instead of the network mirror.
+    """
+    _logger.info(f"Configuring preseed {preseed_file}")
+    if offline_pool:
+        preseed = set_preseed_values(preseed=preseed_file.read_text(), values=OFFLINE_PRESEED_VALUES)
+        (overlay_dir / "preseed.cfg").write_text(preseed)
+    else:
+        copy2(preseed_file, overlay_dir / "preseed.cfg")
+    # The checksum has to match the rendered file
+    kernel_params = get_kernel_params(preseed_file=overlay_dir / "preseed.cfg")
+    for template, file in [
+        (DATA_DIR / "grub" / "grub.cfg", overlay_dir / "boot" / "grub" / "grub.cfg"),
+        (DATA_DIR / "isolinux" / "txt.cfg", overlay_dir / "isolinux" / "txt.cfg"),
     ]:
-        file.write_text(file.read_text().replace("$KERNEL_PARAMS", kernel_params))
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text(template.read_text().replace("$KERNEL_PARAMS", kernel_params))
 
 
-def _repack_iso(debian_version: str, architecture: str, extracted_iso_dir: Path, output_directory: Path) -> Path:
-    version = get_version()
-    output_file_path = output_directory / f"voraus-debian-{debian_version}-preseed-{version}-{architecture}-netinst.iso"
-    output_directory.mkdir(parents=True, exist_ok=True)
+def patch_iso_in_place(
+    debian_version: str, architecture: str, iso_path: Path, overlay_dir: Path, output_file_path: Path
+) -> None:
+    """Writes a copy of an ISO with the files of an overlay directory mapped in and the boot records replayed.
+
+    Args:
+        debian_version: The debian version of the ISO.
+        architecture: The architecture of the ISO.
+        iso_path: The ISO to patch.
+        overlay_dir: The files to map into the ISO, using the directory layout of the ISO.
+        output_file_path: The path of the patched ISO.
+    """
+    output_file_path.parent.mkdir(parents=True, exist_ok=True)
+    output_file_path.unlink(missing_ok=True)
+
+    _logger.info(f"Patching ISO {iso_path} in place")
+    with phase("build:repack"):
+        execute_command(
+            [
+                "xorriso",
+                "-indev",
+                str(iso_path),
+                "-outdev",
+                str(output_file_path),
+                # Replays El Torito, the isohybrid MBR/GPT and the EFI image of the upstream ISO
+                "-boot_image",
+                "any",
+                "replay",
+                "-volid",
+                f"Debian {debian_version} {architecture}",
+                "-map",
+                str(overlay_dir),
+                "/",
+            ]
+        )
+
+
+def _repack_iso(
+    debian_version: str, architecture: str, extracted_iso_dir: Path, mbr_file: Path, output_file_path: Path
+) -> None:
+    output_file_path.parent.mkdir(parents=True, exist_ok=True)
 
     _logger.info("Re-packing customized ISO")
-    execute_command(
-        [
-            "xorriso",
-            "-as",
-            "mkisofs",
-            "-r",
-            "-V",
-            f"Debian {debian_version} {architecture}",
-            "-o",
-            str(output_file_path),
-            "-J",
-            "-J",
-            "-joliet-long",
-            "-cache-inodes",
-            "-isohybrid-mbr",
-            str(MBR_FILE),
-            "-b",
-            "isolinux/isolinux.bin",
-            "-c",
-            "isolinux/boot.cat",
-            "-boot-load-size",
-            "4",
-            "-boot-info-table",
-            "-no-emul-boot",
-            "-eltorito-alt-boot",
-            "-e",
-            "boot/grub/efi.img",
-            "-no-emul-boot",
-            "-isohybrid-gpt-basdat",
-            "-isohybrid-apm-hfsplus",
-            str(extracted_iso_dir),
-        ]
-    )
-    _logger.info(f"ISO has been written to {output_file_path}")
-    return output_file_path
+    with phase("build:repack"):
+        execute_command(
+            [
+                "xorriso",
+                "-as",
+                "mkisofs",
+                "-r",
+                "-V",
+                f"Debian {debian_version} {architecture}",
+                "-o",
+                str(output_file_path),
+                "-J",
+                "-J",
+                "-joliet-long",
+                "-cache-inodes",
+                "-isohybrid-mbr",
+                str(mbr_file),
+                "-b",
+                "isolinux/isolinux.bin",
+                "-c",
+                "isolinux/boot.cat",
+                "-boot-load-size",
+                "4",
+                "-boot-info-table",
+                "-no-emul-boot",
+                "-eltorito-alt-boot",
+                "-e",
+                "boot/grub/efi.img",
+                "-no-emul-boot",
+                "-isohybrid-gpt-basdat",
+                "-isohybrid-apm-hfsplus",
+                str(extracted_iso_dir),
+            ]
+        )
@@ -0,0 +1,66 @@
+"""Contains all CLI export methods."""
+
+import logging
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from voraus_debian_iso.constants import DEFAULT_QEMU_DISK_FILE
+from voraus_debian_iso.methods.compaction import trim_guest
+from voraus_debian_iso.methods.raw_images import Compression, get_block_map_file, write_compressed_image
+from voraus_debian_iso.methods.shell import execute_command
+
+_logger = logging.getLogger(__name__)
+
+
+def export_impl(
+    disk_file: Path = DEFAULT_QEMU_DISK_FILE,
+    output_file: Path | None = None,
+    compression: Compression = Compression.ZSTD,
+    level: int | None = None,
+    trim: bool = True,
+) -> Path:
+    """CLI export implementation.
+
+    Trims the installed qcow2 disk, converts it to a sparse raw image, in which all zero blocks are holes, and
+    compresses only its data ranges. The block map next to the compressed image tells 'restore' where the data
+    belongs.
+
+    Args:
+        disk_file: The installed qcow2 disk file.
+        output_file: The compressed image to write. Defaults to ``./output/<disk file name>.img.<extension>``.
+        compression: The compression of the image.
+        level: The compression level. Defaults to the default level of the compressor.
+        trim: Whether to boot the disk once to clean the package caches and trim its file systems first, so the
+            blocks they don't use become holes and are neither compressed nor written.
+
+    Returns:
+        The path of the compressed image.
+
+    Raises:
+        FileNotFoundError: If the disk file doesn't exist.
+    """
+    if not disk_file.is_file():
+        raise FileNotFoundError(f"Disk file {disk_file} doesn't exist. Create it with 'install'.")
+    output_file = output_file or Path("./output") / f"{disk_file.stem}.img.{compression.extension}"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    start_time = time.monotonic()
+    if trim:
+        trim_guest(disk_file=disk_file)
+    with TemporaryDirectory(prefix="export-", dir=output_file.parent) as temp_dir:
+        raw_file = Path(temp_dir) / "disk.raw"
+        _logger.info(f"Converting {disk_file} to sparse raw image {raw_file}")
+        # Fails while a VM writes to the disk, because QEMU holds a write lock on it
+        execute_command(["qemu-img", "convert", "-O", "raw", "-S", "4k", str(disk_file), str(raw_file)])
+        _logger.info(f"Compressing the data ranges of {raw_file} with {compression.value}")
+        block_map = write_compressed_image(
+            raw_file=raw_file, image_file=output_file, compression=compression, level=level
+        )
+
+    _logger.info(
+        f"Exported {block_map.mapped_size / 1024**2:.1f} MiB of data of the {block_map.image_size / 1024**2:.1f} MiB "
+        f"disk to {output_file} ({output_file.stat().st_size / 1024**2:.1f} MiB) and block map "
+        f"{get_block_map_file(output_file)} in {time.monotonic() - start_time:.1f}s"
+    )
+    return output_file
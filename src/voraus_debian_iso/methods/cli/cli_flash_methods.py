@@ -0,0 +1,57 @@
+"""Contains all CLI flash methods."""
+
+import logging
+from pathlib import Path
+
+from rich import print as rich_print
+from rich.table import Table
+
+from voraus_debian_iso.methods.flash import FlashResult, FlashSource, flash
+
+_logger = logging.getLogger(__name__)
+
+
+def flash_impl(
+    source: Path, targets: list[Path], block_size: int = 4, direct: bool = False, verify: bool = True
+) -> list[FlashResult]:
+    """CLI flash implementation.
+
+    Writes an ISO, a raw image or an image created with 'export' to several block devices or files at once and prints
+    the throughput of every target.
+
+    Args:
+        source: The ISO or image to write.
+        targets: The block devices or files to write.
+        block_size: The size of the blocks that are read and written in MiB.
+        direct: Whether to bypass the page cache of the host with ``O_DIRECT``.
+        verify: Whether to read every target back and compare it with the source.
+
+    Returns:
+        The results, in the order of the targets.
+
+    Raises:
+        RuntimeError: If any of the targets failed.
+    """
+    results = flash(
+        source=FlashSource.open(source),
+        targets=targets,
+        block_size=block_size * 1024 * 1024,
+        direct=direct,
+        verify=verify,
+    )
+
+    table = Table("Target", "Written", "Write", "Verify", "Result")
+    for result in results:
+        table.add_row(
+            str(result.target),
+            f"{result.written / 1024**2:.1f} MiB",
+            f"{result.write_throughput:.1f} MiB/s" if result.error is None else "",
+            f"{result.verify_seconds:.1f}s" if result.verify_seconds is not None else "",
+            result.error or "OK",
+        )
+    rich_print(table)
+
+    failures = [str(result.target) for result in results if result.error is not None]
+    if failures:
+        raise RuntimeError(f"Failed to flash {', '.join(failures)}")
+    return results
@@ -1,25 +1,75 @@
 """Contains all CLI install methods."""
 
 import logging
+import re
 import time
+from contextlib import ExitStack
 from pathlib import Path
+from tempfile import TemporaryDirectory
 
 import pexpect
 
-from voraus_debian_iso.methods.cli.cli_common_methods import get_qemu_common_args
+from voraus_debian_iso.constants import (
+    APT_CACHE_DIR,
+    APT_CACHE_MAX_SIZE,
+    DEFAULT_GOLDEN_DISK_FILE,
+    DEFAULT_QEMU_DISK_FILE,
+    WORKSPACES_DIR,
+)
+from voraus_debian_iso.methods.apt_proxy import AptCachingProxy
+from voraus_debian_iso.methods.compaction import compact_disk
+from voraus_debian_iso.methods.disk_images import is_golden_image, seal_golden_image
+from voraus_debian_iso.methods.install_monitor import InstallMonitor
 from voraus_debian_iso.methods.shell import execute_command
+from voraus_debian_iso.methods.timing import record_phase
+from voraus_debian_iso.methods.vm_profiles import VMProfile, get_drive_args, get_nic_args, get_qemu_common_args
 
 _logger = logging.getLogger(__name__)
 
+_GRUB_CONFIG_PATH = "boot/grub/grub.cfg"
+_GRUB_KERNEL_PATTERN = re.compile(r"^\s*linux\s+/(\S+)\s+(.*)$", re.MULTILINE)
+_GRUB_INITRD_PATTERN = re.compile(r"^\s*initrd\s+/(\S+)\s*$", re.MULTILINE)
 
-def install_impl(iso_file: Path, disk_file: Path) -> None:
+
+def install_impl(
+    iso_file: Path,
+    disk_file: Path | None = None,
+    *,
+    direct_kernel_boot: bool = False,
+    timeline_file: Path | None = None,
+    golden: bool = False,
+    profile: VMProfile = VMProfile.DEFAULT,
+    hugepages: bool = False,
+    apt_cache: bool = False,
+    compact: bool = False,
+) -> None:
     """CLI install implementation.
 
     Args:
         iso_file: The ISO to use for installation.
-        disk_file: The QEMU disk file to create/use.
+        disk_file: The QEMU disk file to create/use. Defaults to the golden image that 'reset' and 'start' use if the
+            disk is sealed as a golden image and to the default disk file otherwise.
+        direct_kernel_boot: Whether to boot the installer kernel directly instead of booting the ISO through
+            the firmware and GRUB. This also puts the installer console on the serial port, which enables the
+            per-stage stall detection.
+        timeline_file: The JSON file to write the installer stage timeline to. Defaults to a file next to the disk.
+        golden: Whether to seal the installed disk as a read-only golden image for thin overlays.
+        profile: The performance profile of the VM.
+        hugepages: Whether to back the VM memory with huge pages.
+        apt_cache: Whether to download the packages through a local caching proxy. This requires direct kernel boot,
+            which passes the proxy to the installer on the kernel command line.
+        compact: Whether to boot the installed system once to trim it and to rewrite the disk as a compressed qcow2.
+
+    Raises:
+        ValueError: If the caching proxy is requested without direct kernel boot.
     """
+    if apt_cache and not direct_kernel_boot:
+        raise ValueError("The caching APT proxy requires direct kernel boot to pass the proxy to the installer")
+    if disk_file is None:
+        disk_file = DEFAULT_GOLDEN_DISK_FILE if golden else DEFAULT_QEMU_DISK_FILE
     if disk_file.is_file():
+        if is_golden_image(disk_file):
+            _logger.warning(f"Disk file {disk_file} is a golden image. Overlays created from it become invalid.")
         _logger.warning(f"Disk file {disk_file} already exists. It will be overwritten.")
         disk_file.unlink()
 
@@ -27,9 +77,12 @@ def install_impl(iso_file: Path, disk_file: Path) -> None:
     _logger.info(f"Creating disk file {disk_file}...")
     execute_command(["qemu-img", "create", "-f", "qcow2", str(disk_file), "5G"])
 
-    qemu_command = get_qemu_common_args() + [
-        "-drive",
-        f"file={disk_file},format=qcow2",
+    qemu_command = (
+        get_qemu_common_args(profile=profile, hugepages=hugepages)
+        + get_drive_args(profile=profile, disk_file=disk_file, install=True)
+        + get_nic_args(profile=profile, netdev_options="")
+    )
+    qemu_command += [
         "-nographic",
         "-serial",
         "mon:stdio",
@@ -39,18 +92,117 @@ def install_impl(iso_file: Path, disk_file: Path) -> None:
         str(iso_file),
     ]
 
-    start_time = time.time()
-    install_process = pexpect.spawn(" ".join(qemu_command), timeout=30000)
-    _logger.info("Waiting for GRUB to be ready...")
-    install_process.expect("Booting from DVD/CD", timeout=10)
-    _logger.info(f"Installing ISO {iso_file} in a QEMU VM. This may take a while...")
-    time.sleep(5)  # Make sure GRUB is ready...
-    install_process.sendline("")  #  Select headless install (Press enter)
+    timeline_file = timeline_file or disk_file.with_name(f"{disk_file.stem}.timeline.json")
+    monitor = InstallMonitor(detect_stalls=direct_kernel_boot)
+    WORKSPACES_DIR.mkdir(parents=True, exist_ok=True)
+    with TemporaryDirectory(prefix="install-", dir=WORKSPACES_DIR) as workspace_dir, ExitStack() as exit_stack:
+        start_time = time.time()
+        if direct_kernel_boot:
+            install_process = _spawn_direct_kernel_boot(
+                qemu_command=qemu_command,
+                iso_file=iso_file,
+                boot_dir=Path(workspace_dir),
+                exit_stack=exit_stack,
+                apt_cache=apt_cache,
+            )
+        else:
+            install_process = pexpect.spawn(qemu_command[0], qemu_command[1:], timeout=30000, encoding="utf-8")
+            _logger.info("Waiting for GRUB to be ready...")
+            install_process.expect("Booting from DVD/CD", timeout=10)
+            _logger.info(f"Installing ISO {iso_file} in a QEMU VM. This may take a while...")
+            time.sleep(5)  # Make sure GRUB is ready...
+            install_process.sendline("")  #  Select headless install (Press enter)
+        try:
+            _follow_installer(install_process=install_process, monitor=monitor)
+        finally:
+            install_process.close(force=True)
+            monitor.write_timeline(timeline_file)
+            _logger.info(f"Installer stage timeline has been written to {timeline_file}")
+    _logger.info(f"Installation finished after {time.time() - start_time} seconds")
+    if compact:
+        compact_disk(disk_file=disk_file, profile=profile, hugepages=hugepages)
+    if golden:
+        seal_golden_image(disk_file)
+
+
+def _spawn_direct_kernel_boot(
+    qemu_command: list[str], iso_file: Path, boot_dir: Path, exit_stack: ExitStack, apt_cache: bool
+) -> pexpect.spawn:
+    installer_params = []
+    if apt_cache:
+        proxy = exit_stack.enter_context(AptCachingProxy(cache_dir=APT_CACHE_DIR, max_size=APT_CACHE_MAX_SIZE))
+        # QEMU user networking makes the loopback interface of the host reachable as 10.0.2.2
+        installer_params.append(f"mirror/http/proxy=http://10.0.2.2:{proxy.port}/")
+    kernel, initrd, kernel_params = extract_installer_boot_files(
+        iso_file=iso_file, target_dir=boot_dir, extra_installer_params=installer_params
+    )
+    qemu_command = qemu_command + ["-kernel", str(kernel), "-initrd", str(initrd), "-append", kernel_params]
+    _logger.info(f"Installing ISO {iso_file} in a QEMU VM with direct kernel boot. This may take a while...")
+    return pexpect.spawn(qemu_command[0], qemu_command[1:], timeout=30000, encoding="utf-8")
+
+
+def _follow_installer(install_process: pexpect.spawn, monitor: InstallMonitor) -> None:
     while True:
         try:
-            install_process.expect("\r\n", timeout=1)
+            monitor.feed(install_process.read_nonblocking(size=65536, timeout=1))
         except pexpect.TIMEOUT:
-            continue  # No output for 1 second, just continue
+            pass  # No output for 1 second
         except pexpect.EOF:
             break  # End of output -> Installation has finished
-    _logger.info(f"Installation finished after {time.time() - start_time} seconds")
+        # A stage that keeps printing, like a retry loop, can stall as well
+        monitor.check_stall()
+    monitor.finish()
+    for record in monitor.timeline:
+        if record.duration is not None:
+            _logger.info(f"Installer stage '{record.name}' took {record.duration:.0f} seconds")
+            record_phase(f"install:{record.name}", record.duration)
+
+
+def extract_installer_boot_files(
+    iso_file: Path, target_dir: Path, extra_installer_params: list[str] | None = None
+) -> tuple[Path, Path, str]:
+    """Extracts the installer kernel and initrd of an ISO together with the kernel parameters of its GRUB menu entry.
+
+    The kernel parameters are taken from the ISO itself, so they always match the preseed file on it. The installer
+    console is additionally directed to the serial port.
+
+    Args:
+        iso_file: The ISO to extract the boot files from.
+        target_dir: The directory to extract the boot files to.
+        extra_installer_params: Additional kernel parameters for the installer, for example preseed values.
+
+    Returns:
+        The paths of the kernel and the initrd and the kernel parameters.
+    """
+    target_dir.mkdir(parents=True, exist_ok=True)
+    execute_command(["bsdtar", "-C", str(target_dir), "-xf", str(iso_file), _GRUB_CONFIG_PATH])
+    kernel_path, kernel_params, initrd_path = parse_grub_installer_entry((target_dir / _GRUB_CONFIG_PATH).read_text())
+    _logger.info(f"Extracting {kernel_path} and {initrd_path} from {iso_file}")
+    execute_command(["bsdtar", "-C", str(target_dir), "-xf", str(iso_file), kernel_path, initrd_path])
+    installer_params, _, target_params = kernel_params.partition("---")
+    installer_params = " ".join([installer_params.strip(), *(extra_installer_params or []), "console=ttyS0,115200n8"])
+    kernel_params = f"{installer_params} --- {target_params.strip()}".strip()
+    return target_dir / kernel_path, target_dir / initrd_path, kernel_params
+
+
+def parse_grub_installer_entry(grub_config: str) -> tuple[str, str, str]:
+    r"""Parses the first installer menu entry of a GRUB configuration.
+
+    Args:
+        grub_config: The content of the GRUB configuration.
+
+    Returns:
+        The kernel path, the kernel parameters and the initrd path, with paths relative to the ISO root.
+
+    Raises:
+        ValueError: If the configuration doesn't contain a kernel and an initrd.
+
+    Example:
+        >>> parse_grub_installer_entry("linux /install.amd/vmlinuz auto=true --- quiet\ninitrd /install.amd/initrd.gz")
+        ('install.amd/vmlinuz', 'auto=true --- quiet', 'install.amd/initrd.gz')
+    """
+    kernel_match = _GRUB_KERNEL_PATTERN.search(grub_config)
+    initrd_match = _GRUB_INITRD_PATTERN.search(grub_config)
+    if kernel_match is None or initrd_match is None:
+        raise ValueError("The GRUB configuration doesn't contain a menu entry with a kernel and an initrd")
+    return kernel_match.group(1), kernel_match.group(2).strip(), initrd_match.group(1)
@@ -0,0 +1,34 @@
+"""Contains all CLI list methods."""
+
+import logging
+
+from rich import print as rich_print
+from rich.table import Table
+
+from voraus_debian_iso.methods.vm_instances import VMInstance, list_instances
+
+_logger = logging.getLogger(__name__)
+
+
+def list_impl() -> list[VMInstance]:
+    """CLI list implementation.
+
+    Prints the name, status, SSH port and disk file of all VMs.
+
+    Returns:
+        The VMs.
+    """
+    instances = list_instances()
+    table = Table("Name", "Status", "PID", "SSH port", "Disk file")
+    for instance in instances:
+        pid = instance.get_pid()
+        state = instance.state
+        table.add_row(
+            instance.name,
+            "running" if pid is not None else "stopped",
+            str(pid or ""),
+            str(state.get("ssh_port", "")),
+            state.get("disk_file", ""),
+        )
+    rich_print(table)
+    return instances
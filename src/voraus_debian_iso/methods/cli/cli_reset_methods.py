@@ -0,0 +1,31 @@
+"""Contains all CLI reset methods."""
+
+import logging
+from pathlib import Path
+
+from voraus_debian_iso.constants import DEFAULT_VM_NAME
+from voraus_debian_iso.methods.disk_images import create_overlay
+from voraus_debian_iso.methods.vm_instances import VMInstance
+
+_logger = logging.getLogger(__name__)
+
+
+def reset_impl(base_file: Path, name: str = DEFAULT_VM_NAME, disk_file: Path | None = None) -> None:
+    """CLI reset implementation.
+
+    Discards all changes of a VM by replacing its disk with a fresh thin overlay of the golden image.
+
+    Args:
+        base_file: The golden image.
+        name: The name of the VM.
+        disk_file: The overlay disk file to reset. Defaults to the overlay in the state directory of the VM.
+
+    Raises:
+        RuntimeError: If the QEMU VM is running.
+    """
+    instance = VMInstance(name)
+    if instance.is_running():
+        raise RuntimeError(f"QEMU VM '{name}' is running. Stop it before resetting its disk.")
+    disk_file = disk_file or instance.overlay_file
+    create_overlay(base_file=base_file, overlay_file=disk_file)
+    _logger.info(f"Disk file {disk_file} has been reset to golden image {base_file}")
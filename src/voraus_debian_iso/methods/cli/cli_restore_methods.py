@@ -0,0 +1,29 @@
+"""Contains all CLI restore methods."""
+
+import logging
+from pathlib import Path
+
+from voraus_debian_iso.methods.raw_images import get_block_map_file, restore_image
+
+_logger = logging.getLogger(__name__)
+
+
+def restore_impl(image_file: Path, target: Path, block_map_file: Path | None = None) -> None:
+    """CLI restore implementation.
+
+    Streams an image created with 'export' to a block device or file. Only the data ranges of the block map are
+    decompressed and written.
+
+    Args:
+        image_file: The compressed image.
+        target: The block device or file to write.
+        block_map_file: The block map of the image. Defaults to the block map next to the image.
+
+    Raises:
+        FileNotFoundError: If the image or its block map doesn't exist.
+    """
+    block_map_file = block_map_file or get_block_map_file(image_file)
+    for path in (image_file, block_map_file):
+        if not path.is_file():
+            raise FileNotFoundError(f"{path} doesn't exist. Create the image with 'export'.")
+    restore_image(image_file=image_file, target=target, block_map_file=block_map_file)
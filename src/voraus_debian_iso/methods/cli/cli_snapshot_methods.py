@@ -0,0 +1,48 @@
+"""Contains all CLI snapshot methods."""
+
+import asyncio
+import logging
+import time
+from pathlib import Path
+
+from voraus_debian_iso.constants import DEFAULT_VM_NAME
+from voraus_debian_iso.methods.cli.cli_start_methods import get_ssh_connection
+from voraus_debian_iso.methods.qmp import QMPClient
+from voraus_debian_iso.methods.vm_instances import VMInstance
+from voraus_debian_iso.methods.vm_profiles import VMProfile, get_snapshot_name
+
+_logger = logging.getLogger(__name__)
+
+
+def snapshot_impl(name: str = DEFAULT_VM_NAME, settle_time: float = 10.0) -> None:
+    """CLI snapshot implementation.
+
+    Saves the RAM and device state of the running, booted VM together with its disk state as an internal snapshot of
+    the qcow2 disk. ``start --from-snapshot`` restores it instead of booting the VM.
+
+    Args:
+        name: The name of the VM.
+        settle_time: The time in seconds to wait after SSH is reachable, so the boot services have finished and the
+            saved VM is idle.
+
+    Raises:
+        RuntimeError: If the QEMU VM is not running.
+    """
+    instance = VMInstance(name)
+    if not instance.is_running():
+        raise RuntimeError(f"QEMU VM '{name}' is not running.")
+
+    with next(get_ssh_connection(vm_name=name)) as connection:
+        connection.run("sync")
+    _logger.info(f"Waiting {settle_time} seconds for the VM to become idle...")
+    time.sleep(settle_time)
+
+    snapshot_name = get_snapshot_name(VMProfile(instance.state.get("profile", VMProfile.DEFAULT.value)))
+    start_time = time.time()
+    asyncio.run(_save_vm_state(qmp_socket=instance.qmp_socket, snapshot_name=snapshot_name))
+    _logger.info(f"VM state has been saved as snapshot '{snapshot_name}' after {time.time() - start_time} seconds")
+
+
+async def _save_vm_state(qmp_socket: Path, snapshot_name: str) -> None:
+    async with QMPClient(qmp_socket) as client:
+        await client.human_monitor_command(f"savevm {snapshot_name}")
@@ -1,7 +1,7 @@
 """Contains all CLI start methods."""
 
+import asyncio
 import logging
-import subprocess
 import time
 from pathlib import Path
 from typing import Generator
@@ -10,28 +10,48 @@ from fabric import Config, Connection
 from paramiko.ssh_exception import NoValidConnectionsError, SSHException
 from tenacity import after_log, retry, retry_if_exception_type
 from tenacity.stop import stop_after_delay
-from tenacity.wait import wait_fixed
+from tenacity.wait import wait_exponential
 
-from voraus_debian_iso.constants import QEMU_PID_FILE
-from voraus_debian_iso.methods.cli.cli_common_methods import get_qemu_common_args
+from voraus_debian_iso.constants import DEFAULT_QEMU_DISK_FILE, DEFAULT_VM_NAME
+from voraus_debian_iso.methods.cli.cli_status_methods import query_status
+from voraus_debian_iso.methods.disk_images import ensure_overlay, get_snapshots
+from voraus_debian_iso.methods.readiness import wait_for_ssh_banner
+from voraus_debian_iso.methods.shell import execute_command
+from voraus_debian_iso.methods.timing import record_phase
+from voraus_debian_iso.methods.vm_instances import VMInstance, allocate_free_port, get_port_allocation_lock
+from voraus_debian_iso.methods.vm_profiles import (
+    VMProfile,
+    get_drive_args,
+    get_nic_args,
+    get_qemu_common_args,
+    get_snapshot_name,
+)
 
 _logger = logging.getLogger(__name__)
 
+_SSH_HOST = "127.0.0.1"
 
-def get_ssh_connection(username: str = "localuser") -> Generator[Connection, None, None]:
-    """Establishes an SSH connection to the QEMU VM.
+
+def get_ssh_connection(
+    username: str = "localuser", vm_name: str = DEFAULT_VM_NAME
+) -> Generator[Connection, None, None]:
+    """Establishes an SSH connection to a QEMU VM.
 
     Args:
         username: The username to use for the SSH connection.
+        vm_name: The name of the VM.
 
     Yields:
         The SSH connection.
     """
-    _logger.info("Establishing SSH connection to the QEMU VM...")
+    port = VMInstance(vm_name).ssh_port
+    _logger.info(f"Establishing SSH connection to the QEMU VM '{vm_name}' on port {port}...")
+    # Only authenticate once the SSH server is up, a handshake against a booting guest fails and is costly to retry.
+    wait_for_ssh_banner(host=_SSH_HOST, port=port)
     with Connection(
-        host="localhost",
+        host=_SSH_HOST,
         user=username,
-        port=2222,
+        port=port,
         connect_kwargs={"password": "voraus"},
         connect_timeout=60,
         # Remote command output is only of interest to the caller, so it is not echoed to the local streams.
@@ -39,51 +59,141 @@ def get_ssh_connection(username: str = "localuser") -> Generator[Connection, Non
     ) as connection:
         retry(
             retry=retry_if_exception_type((NoValidConnectionsError, SSHException, TimeoutError)),
-            wait=wait_fixed(2),
-            stop=stop_after_delay(120),
+            wait=wait_exponential(multiplier=0.1, max=2),
+            stop=stop_after_delay(30),
             # tenacity>=9.1 annotates the logger with its own LoggerProtocol, which logging.Logger does not satisfy
             after=after_log(_logger, logging.DEBUG),  # type: ignore[arg-type]
         )(connection.open)()
         yield connection
 
 
-def start_impl(disk_file: Path, gui: bool = False) -> None:
+def start_impl(
+    name: str = DEFAULT_VM_NAME,
+    *,
+    disk_file: Path | None = None,
+    gui: bool = False,
+    base_file: Path | None = None,
+    from_snapshot: bool = False,
+    profile: VMProfile = VMProfile.DEFAULT,
+    hugepages: bool = False,
+    discard: bool | None = None,
+) -> None:
     """CLI start implementation.
 
     Args:
-        disk_file: The QEMU disk file to start.
+        name: The name of the VM.
+        disk_file: The QEMU disk file to start. Defaults to the overlay in the state directory of the VM if a golden
+            image is given and to the default disk file for the default VM. Other VMs can't share the default disk
+            file, so they need either a disk file or a golden image.
         gui: Whether to start the VM with a GUI.
+        base_file: The golden image to start from. The disk file is then a thin overlay of it, which is created if it
+            doesn't exist or belongs to another image.
+        from_snapshot: Whether to restore the booted VM state saved with the snapshot command instead of booting.
+            This also reverts the disk to the state of the snapshot.
+        profile: The performance profile of the VM. A snapshot can only be restored with the profile it was saved
+            with.
+        hugepages: Whether to back the VM memory with huge pages.
+        discard: Whether blocks the guest trims are released in the disk file. Defaults to the setting of the profile.
 
     Raises:
+        ValueError: If a VM other than the default VM has neither a disk file nor a golden image.
         FileNotFoundError: If the disk file doesn't exist.
+        RuntimeError: If the disk file doesn't contain the VM snapshot or the VM doesn't run after its start.
     """
+    instance = VMInstance(name)
+    pid = instance.get_pid()
+    if pid is not None:
+        _logger.warning(f"QEMU VM '{name}' is already running with PID {pid}. Stop it before starting again.")
+        return
+
+    if disk_file is None and base_file is None and name != DEFAULT_VM_NAME:
+        # QEMU locks the disk file for writing, so a second VM on the default disk file would fail to start
+        raise ValueError(f"QEMU VM '{name}' requires a disk file or a golden image to start a thin overlay of")
+    if disk_file is None:
+        disk_file = DEFAULT_QEMU_DISK_FILE if base_file is None else instance.overlay_file
+    if base_file is not None:
+        ensure_overlay(base_file=base_file, overlay_file=disk_file)
     if not disk_file.is_file():
         raise FileNotFoundError(f"Disk file {disk_file} doesn't exist.")
+    snapshot_name = get_snapshot_name(profile)
+    if from_snapshot and snapshot_name not in get_snapshots(disk_file):
+        raise RuntimeError(
+            f"Disk file {disk_file} has no snapshot '{snapshot_name}'. "
+            f"Create it with 'snapshot' on a VM started with profile '{profile.value}'."
+        )
 
-    if QEMU_PID_FILE.is_file():
-        _logger.warning(f"QEMU VM is already running with PID file {QEMU_PID_FILE}. Stop it before starting again.")
-        return
-
-    _logger.info(f"Starting QEMU VM with disk file {disk_file}.")
     start_time = time.time()
-    qemu_command = get_qemu_common_args() + [
-        "-pidfile",
-        str(QEMU_PID_FILE),
-        "-drive",
-        f"file={disk_file},format=qcow2",
-        "-device",
-        "e1000,netdev=eth0",
-        "-netdev",
-        "user,id=eth0,hostfwd=tcp::2222-:22",
-        "-display",
-        "gtk" if gui else "none",
-        "-daemonize",
-    ]
-
-    with subprocess.Popen(args=qemu_command):
-        try:
-            next(get_ssh_connection())
-        except StopIteration:
-            pass
-        _logger.info(f"QEMU VM started successfully after {time.time() - start_time} seconds.")
-        return
+    # QEMU only returns from -daemonize once it has bound the forwarded ports, so holding the lock until then keeps
+    # concurrent starts from picking the same port.
+    with get_port_allocation_lock():
+        ssh_port = allocate_free_port()
+        instance.save_state(ssh_port=ssh_port, disk_file=disk_file.resolve(), profile=profile.value)
+        instance.serial_log.unlink(missing_ok=True)
+        _logger.info(
+            f"Starting QEMU VM '{name}' with disk file {disk_file}, profile '{profile.value}' and SSH port {ssh_port}."
+        )
+        qemu_command = _get_qemu_command(
+            instance=instance,
+            disk_file=disk_file,
+            ssh_port=ssh_port,
+            profile=profile,
+            hugepages=hugepages,
+            gui=gui,
+            discard=discard,
+        )
+        if from_snapshot:
+            # The restored VM must use the same devices as the saved one, so only options that don't change the VM
+            # hardware (like the display) may differ between saving and restoring.
+            qemu_command += ["-loadvm", snapshot_name]
+        execute_command(qemu_command)
+    _wait_until_ready(instance=instance, start_time=start_time)
+
+
+def _wait_until_ready(instance: VMInstance, start_time: float) -> None:
+    vm_status = asyncio.run(query_status(instance))
+    if vm_status.status != "running":
+        raise RuntimeError(f"QEMU VM '{instance.name}' has been started but is {vm_status.status}.")
+    launch_time = time.time()
+
+    wait_for_ssh_banner(host=_SSH_HOST, port=instance.ssh_port)
+    ssh_ready_time = time.time()
+    with next(get_ssh_connection(vm_name=instance.name)):
+        pass
+    record_phase("start:launch", launch_time - start_time)
+    record_phase("start:boot-to-ssh", ssh_ready_time - launch_time)
+    record_phase("start:ssh-login", time.time() - ssh_ready_time)
+    _logger.info(
+        f"QEMU VM '{instance.name}' started successfully after {time.time() - start_time:.2f} seconds "
+        f"(QEMU launch {launch_time - start_time:.2f} s, boot-to-SSH {ssh_ready_time - launch_time:.2f} s, "
+        f"SSH login {time.time() - ssh_ready_time:.2f} s)."
+    )
+
+
+def _get_qemu_command(
+    *,
+    instance: VMInstance,
+    disk_file: Path,
+    ssh_port: int,
+    profile: VMProfile,
+    hugepages: bool,
+    gui: bool,
+    discard: bool | None,
+) -> list[str]:
+    return (
+        get_qemu_common_args(profile=profile, hugepages=hugepages)
+        + [
+            "-name",
+            instance.name,
+            "-pidfile",
+            str(instance.pid_file),
+            "-qmp",
+            f"unix:{instance.qmp_socket},server=on,wait=off",
+            "-serial",
+            f"file:{instance.serial_log}",
+            "-display",
+            "gtk" if gui else "none",
+            "-daemonize",
+        ]
+        + get_drive_args(profile=profile, disk_file=disk_file, discard=discard)
+        + get_nic_args(profile=profile, netdev_options=f"hostfwd=tcp:127.0.0.1:{ssh_port}-:22")
+    )
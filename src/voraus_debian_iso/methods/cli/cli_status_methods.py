@@ -0,0 +1,119 @@
+"""Contains all CLI status methods."""
+
+import logging
+from dataclasses import dataclass
+from typing import Any
+
+from voraus_debian_iso.methods.vm_instances import VMInstance, list_instances
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class VMStatus:
+    """The live status of a VM, queried via QMP.
+
+    Attributes:
+        name: The name of the VM.
+        status: The run state, for example ``running`` or ``paused``, or ``stopped`` if QEMU is not running.
+        cpus: The vCPUs with their index and host thread ID.
+        block_stats: The I/O statistics per block device.
+    """
+
+    name: str
+    status: str
+    cpus: list[dict[str, Any]]
+    block_stats: dict[str, dict[str, int]]
+
+
+def status_impl(name: str | None = None) -> list[VMStatus]:
+    """CLI status implementation.
+
+    Prints the run state, the vCPUs and the block I/O statistics of the VMs.
+
+    Args:
+        name: The name of the VM. Defaults to all VMs.
+
+    Returns:
+        The status of the VMs.
+    """
+    instances = list_instances() if name is None else [VMInstance(name)]
+    if any(instance.is_running() for instance in instances):
+        statuses = _query_statuses(instances)
+    else:
+        statuses = [_get_stopped_status(instance) for instance in instances]
+
+    # A plain table, since importing rich would slow down the startup of 'status'
+    rows: list[tuple[str, ...]] = [("Name", "Status", "vCPU threads", "Device", "Read", "Written")]
+    for vm_status in statuses:
+        threads = ", ".join(str(cpu.get("thread-id")) for cpu in vm_status.cpus)
+        devices = vm_status.block_stats or {"": {}}
+        for index, (device, stats) in enumerate(devices.items()):
+            rows.append(
+                (
+                    vm_status.name if index == 0 else "",
+                    vm_status.status if index == 0 else "",
+                    threads if index == 0 else "",
+                    device,
+                    _format_io(stats.get("rd_bytes"), stats.get("rd_operations")),
+                    _format_io(stats.get("wr_bytes"), stats.get("wr_operations")),
+                )
+            )
+    _print_table(rows)
+    return statuses
+
+
+def _query_statuses(instances: list[VMInstance]) -> list[VMStatus]:
+    # asyncio is only imported once there is a running VM to query, to keep the startup of 'status' fast
+    import asyncio  # pylint: disable=import-outside-toplevel
+
+    async def _query_all() -> list[VMStatus]:
+        return list(await asyncio.gather(*(query_status(instance) for instance in instances)))
+
+    return asyncio.run(_query_all())
+
+
+async def query_status(instance: VMInstance) -> VMStatus:
+    """Queries the live status of a VM via QMP.
+
+    Args:
+        instance: The VM.
+
+    Returns:
+        The status of the VM.
+    """
+    if not instance.is_running():
+        return _get_stopped_status(instance)
+
+    from voraus_debian_iso.methods.qmp import QMPClient  # pylint: disable=import-outside-toplevel
+
+    async with QMPClient(instance.qmp_socket) as client:
+        run_state = await client.execute("query-status")
+        cpus = await client.execute("query-cpus-fast")
+        block_stats = await client.execute("query-blockstats")
+    return VMStatus(
+        name=instance.name,
+        status=run_state["status"],
+        cpus=cpus,
+        block_stats={
+            device.get("device") or device.get("qdev", ""): device.get("stats", {})
+            for device in block_stats
+            if device.get("stats", {}).get("rd_operations") or device.get("stats", {}).get("wr_operations")
+        },
+    )
+
+
+def _get_stopped_status(instance: VMInstance) -> VMStatus:
+    return VMStatus(name=instance.name, status="stopped", cpus=[], block_stats={})
+
+
+def _print_table(rows: list[tuple[str, ...]]) -> None:
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    for row in rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+
+def _format_io(size: int | None, operations: int | None) -> str:
+    if size is None:
+        return ""
+    return f"{size / 1024**2:.1f} MiB ({operations} ops)"
@@ -2,27 +2,36 @@
 
 import logging
 
-from voraus_debian_iso.constants import QEMU_PID_FILE
-from voraus_debian_iso.methods.shell import execute_command
+from voraus_debian_iso.constants import DEFAULT_VM_NAME
+from voraus_debian_iso.methods.vm_instances import VMInstance, list_instances
 
 _logger = logging.getLogger(__name__)
 
 
-def stop_impl() -> None:
+def stop_impl(name: str = DEFAULT_VM_NAME, all_instances: bool = False, timeout: float = 30.0) -> None:
     """CLI stop implementation.
 
+    Asks the guest to power down via ACPI and tells QEMU to quit if the guest doesn't power down within the timeout.
+    Several VMs are stopped concurrently.
+
+    Args:
+        name: The name of the VM to stop.
+        all_instances: Whether to stop all running VMs instead of the named one.
+        timeout: The time in seconds the guest gets to power down.
+
     Raises:
-        Exception: If anything goes wrong.
+        RuntimeError: If a VM could not be stopped.
     """
-    if not QEMU_PID_FILE.is_file():
-        _logger.warning(f"QEMU VM is not running. PID file {QEMU_PID_FILE} does not exist.")
+    instances = list_instances() if all_instances else [VMInstance(name)]
+    running = [instance for instance in instances if instance.is_running()]
+    if not running and not all_instances:
+        _logger.warning(f"QEMU VM '{name}' is not running.")
         return
 
-    try:
-        pid = int(QEMU_PID_FILE.read_text().strip())
-        _logger.info(f"Stopping QEMU VM with PID {pid}.")
-        execute_command(["kill", str(pid)])
-        QEMU_PID_FILE.unlink(missing_ok=True)
-    except Exception as error:
-        _logger.error(f"Failed to stop QEMU VM: {error}")
-        raise
+    # asyncio and the QMP client are only imported once there is a VM to stop, to keep the startup of 'stop' fast
+    from voraus_debian_iso.methods.vm_shutdown import stop_instances  # pylint: disable=import-outside-toplevel
+
+    results = stop_instances(running, timeout=timeout)
+    failed = [f"{instance.name} ({result})" for instance, result in zip(running, results) if result is not None]
+    if failed:
+        raise RuntimeError(f"Failed to stop QEMU VMs: {', '.join(failed)}")
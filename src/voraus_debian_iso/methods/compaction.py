@@ -0,0 +1,107 @@
+"""Contains the post-install compaction of installed qcow2 disks."""
+
+import shutil
+import subprocess
+from logging import getLogger
+from pathlib import Path
+
+from voraus_debian_iso.methods.cli.cli_start_methods import get_ssh_connection, start_impl
+from voraus_debian_iso.methods.cli.cli_stop_methods import stop_impl
+from voraus_debian_iso.methods.shell import execute_command
+from voraus_debian_iso.methods.vm_instances import VMInstance
+from voraus_debian_iso.methods.vm_profiles import VMProfile
+
+_logger = getLogger(__name__)
+
+COMPACTION_VM_NAME = "compaction"
+
+# Package downloads are only needed during the installation, and trimming releases all blocks the file systems no
+# longer use, for example the temporary files of the installer.
+_CLEANUP_COMMANDS = ["apt-get clean", "rm -f /var/cache/apt/*.bin", "fstrim --all --verbose", "sync"]
+
+
+def compact_disk(disk_file: Path, profile: VMProfile = VMProfile.DEFAULT, hugepages: bool = False) -> None:
+    """Shrinks an installed qcow2 disk to the blocks its file systems use.
+
+    The guest is booted once with discard enabled to clean the package caches and trim its file systems, so the
+    freed blocks are released in the disk file. The disk is then rewritten as a compressed qcow2, which drops all
+    unallocated and zero clusters, and only replaces the original after ``qemu-img compare`` confirmed that both have
+    the same content.
+
+    Args:
+        disk_file: The installed qcow2 disk.
+        profile: The performance profile to boot the guest with.
+        hugepages: Whether to back the VM memory with huge pages.
+    """
+    original_size = disk_file.stat().st_size
+    trim_guest(disk_file=disk_file, profile=profile, hugepages=hugepages)
+    trimmed_size = disk_file.stat().st_size
+
+    compacted_file = disk_file.with_name(f".{disk_file.name}.compacted")
+    try:
+        convert_compressed(source_file=disk_file, target_file=compacted_file)
+        compacted_file.replace(disk_file)
+    finally:
+        compacted_file.unlink(missing_ok=True)
+    _logger.info(
+        f"Compacted disk file {disk_file} from {original_size / 1024**2:.0f} MiB to "
+        f"{disk_file.stat().st_size / 1024**2:.0f} MiB ({trimmed_size / 1024**2:.0f} MiB after trimming)"
+    )
+
+
+def trim_guest(disk_file: Path, profile: VMProfile = VMProfile.DEFAULT, hugepages: bool = False) -> None:
+    """Boots an installed disk once to clean the package caches and trim the file systems of the guest.
+
+    Args:
+        disk_file: The installed qcow2 disk.
+        profile: The performance profile to boot the guest with.
+        hugepages: Whether to back the VM memory with huge pages.
+    """
+    instance = VMInstance(COMPACTION_VM_NAME)
+    start_impl(name=instance.name, disk_file=disk_file, profile=profile, hugepages=hugepages, discard=True)
+    try:
+        with next(get_ssh_connection(username="root", vm_name=instance.name)) as connection:
+            for command in _CLEANUP_COMMANDS:
+                _logger.info(f"Running '{command}' in the guest")
+                output = connection.run(command).stdout.strip()
+                if output:
+                    _logger.debug(output)
+    finally:
+        stop_impl(name=instance.name)
+        shutil.rmtree(instance.state_dir, ignore_errors=True)
+
+
+def convert_compressed(source_file: Path, target_file: Path) -> None:
+    """Writes a compressed copy of a qcow2 disk and verifies that it has the same content.
+
+    Args:
+        source_file: The qcow2 disk.
+        target_file: The compressed copy to write.
+
+    Raises:
+        RuntimeError: If the content of the copy differs from the disk.
+    """
+    _logger.info(f"Writing compressed copy {target_file} of disk file {source_file}")
+    execute_command(
+        [
+            "qemu-img",
+            "convert",
+            "-c",
+            "-O",
+            "qcow2",
+            "-o",
+            "compression_type=zstd",
+            # Parallel coroutines. Out-of-order writes (-W) would be faster, but qemu-img rejects them for compressed
+            # targets.
+            "-m",
+            "8",
+            str(source_file),
+            str(target_file),
+        ]
+    )
+    try:
+        execute_command(["qemu-img", "compare", "-f", "qcow2", "-F", "qcow2", str(source_file), str(target_file)])
+    except subprocess.CalledProcessError as error:
+        raise RuntimeError(
+            f"Compressed copy {target_file} differs from disk file {source_file}: {error.output.strip()}"
+        ) from error
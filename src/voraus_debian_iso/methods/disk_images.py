@@ -0,0 +1,105 @@
+"""Contains methods for golden disk images and their thin qcow2 overlays."""
+
+import json
+import stat
+from logging import getLogger
+from pathlib import Path
+
+from voraus_debian_iso.methods.shell import execute_command
+
+_logger = getLogger(__name__)
+
+_WRITE_PERMISSIONS = stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
+
+
+def seal_golden_image(disk_file: Path) -> None:
+    """Marks an installed disk as a read-only golden image.
+
+    Overlays reference the golden image by its path and only store the blocks that differ from it, so it must never
+    be changed once overlays exist.
+
+    Args:
+        disk_file: The installed disk file.
+    """
+    disk_file.chmod(disk_file.stat().st_mode & ~_WRITE_PERMISSIONS)
+    _logger.info(f"Disk file {disk_file} has been sealed as a read-only golden image")
+
+
+def is_golden_image(disk_file: Path) -> bool:
+    """Returns whether a disk file is a sealed golden image.
+
+    Args:
+        disk_file: The disk file.
+
+    Returns:
+        Whether the disk file exists and is read-only.
+    """
+    return disk_file.is_file() and not disk_file.stat().st_mode & _WRITE_PERMISSIONS
+
+
+def get_backing_file(disk_file: Path) -> Path | None:
+    """Returns the backing file of a qcow2 disk.
+
+    Args:
+        disk_file: The qcow2 disk file.
+
+    Returns:
+        The absolute path of the backing file or None if the disk has no backing file.
+    """
+    info = json.loads(execute_command(["qemu-img", "info", "--output=json", "-U", str(disk_file)]))
+    backing_file = info.get("full-backing-filename") or info.get("backing-filename")
+    return None if backing_file is None else Path(backing_file)
+
+
+def get_snapshots(disk_file: Path) -> list[str]:
+    """Returns the names of the internal snapshots of a qcow2 disk.
+
+    Args:
+        disk_file: The qcow2 disk file.
+
+    Returns:
+        The snapshot names.
+    """
+    info = json.loads(execute_command(["qemu-img", "info", "--output=json", "-U", str(disk_file)]))
+    return [snapshot["name"] for snapshot in info.get("snapshots", [])]
+
+
+def create_overlay(base_file: Path, overlay_file: Path) -> None:
+    """Creates a thin qcow2 overlay of a golden image, replacing an existing overlay.
+
+    All writes of a VM that runs on the overlay go to the overlay, the golden image is only read.
+
+    Args:
+        base_file: The golden image.
+        overlay_file: The overlay to create.
+
+    Raises:
+        FileNotFoundError: If the golden image doesn't exist.
+        ValueError: If the overlay would replace the golden image itself.
+    """
+    if not base_file.is_file():
+        raise FileNotFoundError(f"Golden image {base_file} doesn't exist. Create it with 'install --golden'.")
+    if overlay_file.resolve() == base_file.resolve():
+        raise ValueError(f"The overlay {overlay_file} can't replace its own golden image")
+    if not is_golden_image(base_file):
+        _logger.warning(f"Disk file {base_file} is not sealed. Changing it will corrupt its overlays.")
+
+    overlay_file.parent.mkdir(parents=True, exist_ok=True)
+    overlay_file.unlink(missing_ok=True)
+    _logger.info(f"Creating overlay {overlay_file} of golden image {base_file}...")
+    execute_command(
+        ["qemu-img", "create", "-f", "qcow2", "-b", str(base_file.resolve()), "-F", "qcow2", str(overlay_file)]
+    )
+
+
+def ensure_overlay(base_file: Path, overlay_file: Path) -> None:
+    """Creates a thin qcow2 overlay of a golden image unless the existing overlay already belongs to it.
+
+    Args:
+        base_file: The golden image.
+        overlay_file: The overlay to reuse or create.
+    """
+    if overlay_file.is_file() and get_backing_file(overlay_file) == base_file.resolve():
+        _logger.info(f"Reusing overlay {overlay_file} of golden image {base_file}")
+        return
+    create_overlay(base_file=base_file, overlay_file=overlay_file)
@@ -0,0 +1,438 @@
+"""Contains a resumable, segmented and checksum-verified HTTP download engine."""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from http.client import HTTPException
+from logging import getLogger
+from pathlib import Path
+from typing import Callable
+from urllib.request import Request, urlopen
+
+from voraus_debian_iso.methods.locking import FileLock
+
+_logger = getLogger(__name__)
+
+DEFAULT_CONNECTIONS = 8
+DEFAULT_SEGMENT_SIZE = 16 * 1024 * 1024
+DEFAULT_TIMEOUT = 30
+CHECKSUM_FILE_NAME = "SHA256SUMS"
+
+_CHUNK_SIZE = 1024 * 1024
+_SEGMENT_ATTEMPTS = 3
+
+
+@dataclass
+class MirrorProbe:
+    """The result of probing a mirror for a file.
+
+    Attributes:
+        url: The URL of the file on the mirror.
+        size: The size of the file in bytes.
+        accepts_ranges: Whether the mirror supports HTTP Range requests.
+    """
+
+    url: str
+    size: int
+    accepts_ranges: bool
+
+
+@dataclass
+class _DownloadState:
+    sha256: str
+    size: int
+    segment_size: int
+    completed: set[int] = field(default_factory=set)
+
+    @property
+    def segment_count(self) -> int:
+        """Returns the number of segments of the file.
+
+        Returns:
+            The number of segments.
+        """
+        return max(1, -(-self.size // self.segment_size))
+
+    def segment_range(self, index: int) -> tuple[int, int]:
+        """Returns the byte range of a segment.
+
+        Args:
+            index: The index of the segment.
+
+        Returns:
+            The start (inclusive) and end (exclusive) offset of the segment.
+        """
+        start = index * self.segment_size
+        return start, min(start + self.segment_size, self.size)
+
+    def save(self, state_file: Path) -> None:
+        """Atomically writes the state to the sidecar state file.
+
+        Args:
+            state_file: The sidecar state file.
+        """
+        temporary_file = state_file.with_suffix(".tmp")
+        temporary_file.write_text(
+            json.dumps(
+                {
+                    "sha256": self.sha256,
+                    "size": self.size,
+                    "segment_size": self.segment_size,
+                    "completed": sorted(self.completed),
+                }
+            )
+        )
+        temporary_file.replace(state_file)
+
+    @classmethod
+    def load(cls, state_file: Path) -> "_DownloadState | None":
+        """Loads the state from the sidecar state file.
+
+        Args:
+            state_file: The sidecar state file.
+
+        Returns:
+            The state or None if the file is missing or invalid.
+        """
+        try:
+            data = json.loads(state_file.read_text())
+            return cls(
+                sha256=data["sha256"],
+                size=data["size"],
+                segment_size=data["segment_size"],
+                completed=set(data["completed"]),
+            )
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+def download_file(
+    mirror_urls: list[str],
+    file_name: str,
+    destination: Path,
+    connections: int = DEFAULT_CONNECTIONS,
+    segment_size: int = DEFAULT_SEGMENT_SIZE,
+) -> Path:
+    """Downloads a file from the fastest responding mirror and verifies it against the mirror's SHA256SUMS.
+
+    The file is fetched in HTTP Range segments over several connections at once. Progress is tracked in a sidecar
+    state file, so an interrupted download resumes where it stopped. The data is hashed while it arrives. A file that
+    already exists at the destination is only reused if it matches the published checksum. Concurrent calls for the
+    same destination are serialized with a lock file, so parallel builds share one download.
+
+    Args:
+        mirror_urls: The URLs of the mirror directories containing the file and its SHA256SUMS file.
+        file_name: The name of the file to download.
+        destination: The path to write the file to.
+        connections: The number of parallel connections to use.
+        segment_size: The size of a single HTTP Range segment in bytes.
+
+    Returns:
+        The path of the verified file.
+
+    Raises:
+        RuntimeError: If the file has no published checksum or the downloaded file doesn't match it.
+    """
+    with FileLock(destination.with_name(destination.name + ".lock")):
+        return _download_file(
+            mirror_urls=mirror_urls,
+            file_name=file_name,
+            destination=destination,
+            connections=connections,
+            segment_size=segment_size,
+        )
+
+
+def _download_file(
+    mirror_urls: list[str], file_name: str, destination: Path, connections: int, segment_size: int
+) -> Path:
+    marker_file = _get_marker_file(destination)
+    if _is_verified(destination, marker_file):
+        _logger.info(f"{destination} exists and has been verified before, skipping download")
+        return destination
+
+    probe = race_mirrors([f"{url.rstrip('/')}/{file_name}" for url in mirror_urls])
+    checksums = fetch_sha256sums(probe.url.rsplit("/", 1)[0] + f"/{CHECKSUM_FILE_NAME}")
+    if file_name not in checksums:
+        raise RuntimeError(f"{file_name} is not listed in the {CHECKSUM_FILE_NAME} file of {probe.url}")
+    expected_sha256 = checksums[file_name]
+
+    if destination.is_file():
+        _logger.info(f"{destination} exists, verifying it against {CHECKSUM_FILE_NAME}")
+        if _hash_file(destination) == expected_sha256:
+            _write_marker(destination, marker_file, expected_sha256)
+            return destination
+        _logger.warning(f"{destination} doesn't match its published checksum, downloading it again")
+        destination.unlink()
+
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    part_file = destination.with_name(destination.name + ".part")
+    state_file = destination.with_name(destination.name + ".part.json")
+    _logger.info(f"Downloading {probe.url} ({probe.size} bytes) to {destination}")
+    if probe.accepts_ranges and probe.size > 0:
+        actual_sha256 = _download_segmented(
+            probe,
+            part_file,
+            state_file,
+            expected_sha256=expected_sha256,
+            connections=connections,
+            segment_size=segment_size,
+        )
+    else:
+        _logger.info(f"{probe.url} doesn't support HTTP Range requests, downloading it in a single stream")
+        actual_sha256 = _download_single(probe.url, part_file)
+
+    state_file.unlink(missing_ok=True)
+    if actual_sha256 != expected_sha256:
+        part_file.unlink(missing_ok=True)
+        raise RuntimeError(
+            f"Checksum mismatch for {probe.url}: expected {expected_sha256}, got {actual_sha256}. "
+            "The partial download has been removed."
+        )
+    part_file.replace(destination)
+    _write_marker(destination, marker_file, expected_sha256)
+    _logger.info(f"{destination} has been downloaded and verified")
+    return destination
+
+
+def race_mirrors(urls: list[str], timeout: float = DEFAULT_TIMEOUT) -> MirrorProbe:
+    """Probes all mirrors at once and returns the first one that serves the file.
+
+    Args:
+        urls: The URLs of the file on the different mirrors.
+        timeout: The timeout of a single probe in seconds.
+
+    Returns:
+        The probe result of the first mirror that serves the file.
+
+    Raises:
+        RuntimeError: If no mirror serves the file.
+    """
+    errors: list[str] = []
+    executor = ThreadPoolExecutor(max_workers=len(urls))
+    try:
+        pending = {executor.submit(_probe_mirror, url, timeout): url for url in urls}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = pending.pop(future)
+                try:
+                    probe = future.result()
+                except Exception as error:  # pylint: disable=broad-except
+                    _logger.debug(f"Mirror {url} is not usable: {error}")
+                    errors.append(f"{url}: {error}")
+                    continue
+                _logger.info(f"Using mirror {probe.url}")
+                return probe
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    raise RuntimeError(f"No mirror serves the requested file: {'; '.join(errors)}")
+
+
+def fetch_sha256sums(url: str, timeout: float = DEFAULT_TIMEOUT) -> dict[str, str]:
+    """Fetches and parses a SHA256SUMS file.
+
+    Args:
+        url: The URL of the SHA256SUMS file.
+        timeout: The timeout in seconds.
+
+    Returns:
+        A mapping of file names to their SHA256 hex digests.
+    """
+    with urlopen(url, timeout=timeout) as response:
+        content = response.read().decode()
+    checksums = {}
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        digest, name = line.split(maxsplit=1)
+        checksums[name.lstrip("*")] = digest.lower()
+    return checksums
+
+
+def get_verified_sha256(path: Path) -> str | None:
+    """Returns the checksum a downloaded file has been verified against, if it is unchanged since then.
+
+    Args:
+        path: The downloaded file.
+
+    Returns:
+        The SHA256 hex digest or None if the file has not been verified or has changed since.
+    """
+    if not _is_verified(path, _get_marker_file(path)):
+        return None
+    return json.loads(_get_marker_file(path).read_text())["sha256"]
+
+
+def _probe_mirror(url: str, timeout: float) -> MirrorProbe:
+    with urlopen(Request(url, method="HEAD"), timeout=timeout) as response:
+        return MirrorProbe(
+            url=response.geturl(),
+            size=int(response.headers.get("Content-Length", 0)),
+            accepts_ranges=response.headers.get("Accept-Ranges", "").lower() == "bytes",
+        )
+
+
+def _download_segmented(
+    probe: MirrorProbe, part_file: Path, state_file: Path, *, expected_sha256: str, connections: int, segment_size: int
+) -> str:
+    state = _load_or_create_state(probe, part_file, state_file, expected_sha256, segment_size)
+    condition = threading.Condition()
+    failed = threading.Event()
+    hasher = _SegmentHasher(part_file, state, condition, failed)
+    hasher.start()
+
+    def _on_segment_done(index: int) -> None:
+        with condition:
+            state.completed.add(index)
+            state.save(state_file)
+            condition.notify_all()
+
+    file_descriptor = os.open(part_file, os.O_WRONLY)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, connections)) as executor:
+            futures = [
+                executor.submit(_download_segment, probe.url, file_descriptor, state, index, _on_segment_done)
+                for index in range(state.segment_count)
+                if index not in state.completed
+            ]
+            for future in futures:
+                try:
+                    future.result()
+                except BaseException:
+                    failed.set()
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    raise
+    finally:
+        os.close(file_descriptor)
+        with condition:
+            condition.notify_all()
+        hasher.join()
+    return hasher.hexdigest()
+
+
+def _load_or_create_state(
+    probe: MirrorProbe, part_file: Path, state_file: Path, expected_sha256: str, segment_size: int
+) -> _DownloadState:
+    state = _DownloadState.load(state_file)
+    if (
+        state is None
+        or not part_file.is_file()
+        or state.sha256 != expected_sha256
+        or state.size != probe.size
+        or part_file.stat().st_size != probe.size
+    ):
+        state = _DownloadState(sha256=expected_sha256, size=probe.size, segment_size=segment_size)
+        with part_file.open("wb") as file:
+            file.truncate(probe.size)
+        state.save(state_file)
+    elif state.completed:
+        _logger.info(f"Resuming download, {len(state.completed)}/{state.segment_count} segments already present")
+    return state
+
+
+def _download_segment(
+    url: str, file_descriptor: int, state: _DownloadState, index: int, on_done: Callable[[int], None]
+) -> None:
+    start, end = state.segment_range(index)
+    for attempt in range(1, _SEGMENT_ATTEMPTS + 1):
+        offset = start
+        try:
+            request = Request(url, headers={"Range": f"bytes={start}-{end - 1}"})
+            with urlopen(request, timeout=DEFAULT_TIMEOUT) as response:
+                if response.status != 206:
+                    raise RuntimeError(f"Expected a partial response for segment {index}, got HTTP {response.status}")
+                while offset < end:
+                    chunk = response.read(min(_CHUNK_SIZE, end - offset))
+                    if not chunk:
+                        break
+                    offset += os.pwrite(file_descriptor, chunk, offset)
+            if offset != end:
+                raise RuntimeError(f"Segment {index} ended after {offset - start} of {end - start} bytes")
+            on_done(index)
+            return
+        # A truncated response raises IncompleteRead, which is an HTTPException
+        except (OSError, RuntimeError, HTTPException) as error:
+            if attempt == _SEGMENT_ATTEMPTS:
+                raise
+            _logger.debug(f"Retrying segment {index} after attempt {attempt} failed: {error}")
+
+
+def _download_single(url: str, part_file: Path) -> str:
+    digest = hashlib.sha256()
+    with urlopen(url, timeout=DEFAULT_TIMEOUT) as response, part_file.open("wb") as file:
+        while chunk := response.read(_CHUNK_SIZE):
+            digest.update(chunk)
+            file.write(chunk)
+    return digest.hexdigest()
+
+
+class _SegmentHasher(threading.Thread):
+    """Hashes the segments of a part file in order as soon as they have been written."""
+
+    def __init__(
+        self, part_file: Path, state: _DownloadState, condition: threading.Condition, failed: threading.Event
+    ) -> None:
+        super().__init__(daemon=True)
+        self._part_file = part_file
+        self._state = state
+        self._condition = condition
+        self._failed = failed
+        self._digest = hashlib.sha256()
+        self._hashed_segments = 0
+
+    def run(self) -> None:
+        with self._part_file.open("rb", buffering=0) as file:
+            while self._hashed_segments < self._state.segment_count:
+                with self._condition:
+                    while self._hashed_segments not in self._state.completed and not self._failed.is_set():
+                        self._condition.wait(timeout=1)
+                    if self._failed.is_set():
+                        return
+                start, end = self._state.segment_range(self._hashed_segments)
+                file.seek(start)
+                remaining = end - start
+                while remaining > 0:
+                    chunk = file.read(min(_CHUNK_SIZE, remaining))
+                    self._digest.update(chunk)
+                    remaining -= len(chunk)
+                self._hashed_segments += 1
+
+    def hexdigest(self) -> str:
+        """Returns the digest of all hashed segments.
+
+        Returns:
+            The SHA256 hex digest.
+        """
+        return self._digest.hexdigest()
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as file:
+        while chunk := file.read(_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _get_marker_file(path: Path) -> Path:
+    return path.with_name(path.name + ".sha256")
+
+
+def _write_marker(path: Path, marker_file: Path, sha256: str) -> None:
+    stat = path.stat()
+    marker_file.write_text(json.dumps({"sha256": sha256, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}))
+
+
+def _is_verified(path: Path, marker_file: Path) -> bool:
+    if not path.is_file():
+        return False
+    try:
+        marker = json.loads(marker_file.read_text())
+    except (OSError, ValueError):
+        return False
+    stat = path.stat()
+    return marker.get("size") == stat.st_size and marker.get("mtime_ns") == stat.st_mtime_ns
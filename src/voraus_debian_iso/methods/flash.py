@@ -0,0 +1,338 @@
+"""Contains methods to write one ISO or disk image to many block devices at once."""
+
+import fcntl
+import hashlib
+import mmap
+import os
+import queue
+import subprocess
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from logging import getLogger
+from pathlib import Path
+from typing import IO, cast
+
+from voraus_debian_iso.methods.raw_images import BlockMap, get_block_map_file, is_block_device, zero_ranges
+
+_logger = getLogger(__name__)
+
+# O_DIRECT requires the offset, the length and the memory address of every write to be aligned to the logical block
+# size of the device. 4 KiB covers all current devices.
+_DIRECT_ALIGNMENT = 4096
+_QUEUE_DEPTH = 8
+
+# Either a chunk with its offset on the target or, after the last chunk, the SHA256 hex digest of all chunks
+_QueueItem = tuple[int, memoryview] | str
+
+
+@dataclass
+class FlashSource:
+    """The data to flash.
+
+    Attributes:
+        path: The ISO, raw image or image created with 'export'.
+        size: The size of the data on the target in bytes.
+        ranges: The offsets and lengths of the ranges to write in bytes.
+        block_map: The block map of an exported image, None for an ISO or raw image.
+        unmapped_ranges: The offsets and lengths of the ranges that read as zeros, which block devices zero instead of
+            writing them.
+    """
+
+    path: Path
+    size: int
+    ranges: list[tuple[int, int]]
+    block_map: BlockMap | None = None
+    unmapped_ranges: list[tuple[int, int]] = field(default_factory=list)
+
+    @classmethod
+    def open(cls, path: Path) -> "FlashSource":
+        """Returns the source of an ISO, a raw image or an image created with 'export'.
+
+        Args:
+            path: The ISO or image. Images created with 'export' are recognized by their block map.
+
+        Returns:
+            The source.
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist.
+        """
+        if not path.is_file():
+            raise FileNotFoundError(f"Source {path} doesn't exist")
+        block_map_file = get_block_map_file(path)
+        if block_map_file.is_file():
+            block_map = BlockMap.load(block_map_file)
+            return cls(
+                path=path,
+                size=block_map.image_size,
+                ranges=block_map.ranges,
+                block_map=block_map,
+                unmapped_ranges=block_map.unmapped_ranges,
+            )
+        size = path.stat().st_size
+        return cls(path=path, size=size, ranges=[(0, size)])
+
+    @property
+    def mapped_size(self) -> int:
+        """Returns the number of bytes that are written to every target.
+
+        Returns:
+            The mapped size in bytes.
+        """
+        return sum(length for _, length in self.ranges)
+
+
+@dataclass
+class FlashResult:
+    """The result of flashing one target.
+
+    Attributes:
+        target: The block device or file.
+        written: The number of bytes written.
+        write_seconds: The time from opening the target until all data has been flushed to it.
+        verify_seconds: The time the read-back verification took, None if the target hasn't been verified.
+        error: The reason the target failed, None if it succeeded.
+    """
+
+    target: Path
+    written: int = 0
+    write_seconds: float = 0.0
+    verify_seconds: float | None = None
+    error: str | None = None
+
+    @property
+    def write_throughput(self) -> float:
+        """Returns the write throughput.
+
+        Returns:
+            The write throughput in MiB/s.
+        """
+        return self.written / 1024**2 / max(self.write_seconds, 1e-9)
+
+
+def flash(
+    source: FlashSource,
+    targets: list[Path],
+    block_size: int = 4 * 1024 * 1024,
+    direct: bool = False,
+    verify: bool = True,
+) -> list[FlashResult]:
+    """Writes a source to several targets at once.
+
+    The source is read once, in aligned blocks. Every target has its own writer thread with a bounded queue, so all
+    targets are written concurrently and a slow target only holds back the others once its queue is full. A target
+    that fails is dropped without stopping the others.
+
+    Args:
+        source: The data to write.
+        targets: The block devices or files to write.
+        block_size: The size of the blocks that are read and written, a multiple of 4 KiB.
+        direct: Whether to bypass the page cache of the host with ``O_DIRECT``.
+        verify: Whether to read every target back after writing it and compare the SHA256 with the one of the source.
+            The unmapped ranges of an exported image have to read as zeros.
+
+    Returns:
+        The results, in the order of the targets.
+
+    Raises:
+        ValueError: If the block size is not a multiple of 4 KiB or a target is listed twice or mounted.
+    """
+    if block_size <= 0 or block_size % _DIRECT_ALIGNMENT:
+        raise ValueError(f"Block size {block_size} is not a multiple of {_DIRECT_ALIGNMENT} bytes")
+    _check_targets(targets)
+
+    results = [FlashResult(target=target) for target in targets]
+    queues: list[queue.Queue[_QueueItem]] = [queue.Queue(maxsize=_QUEUE_DEPTH) for _ in targets]
+    threads = [
+        threading.Thread(
+            target=_flash_target,
+            kwargs={
+                "result": result,
+                "source": source,
+                "chunks": chunks,
+                "block_size": block_size,
+                "direct": direct,
+                "verify": verify,
+            },
+            name=f"flash-{result.target.name}",
+        )
+        for result, chunks in zip(results, queues)
+    ]
+    for thread in threads:
+        thread.start()
+
+    _logger.info(f"Flashing {source.mapped_size / 1024**2:.1f} MiB of {source.path} to {len(targets)} targets")
+    digest = hashlib.sha256()
+    try:
+        for offset, chunk in _read_source(source=source, block_size=block_size):
+            digest.update(chunk)
+            for chunks in queues:
+                chunks.put((offset, chunk))
+    finally:
+        # Also stops the writers if reading the source failed, which then fail verification
+        for chunks in queues:
+            chunks.put(digest.hexdigest())
+        for thread in threads:
+            thread.join()
+    return results
+
+
+def _check_targets(targets: list[Path]) -> None:
+    resolved_targets = [str(target.resolve()) for target in targets]
+    if len(set(resolved_targets)) != len(resolved_targets):
+        raise ValueError("Every target may only be listed once")
+    mounted_devices = _get_mounted_devices()
+    for target in resolved_targets:
+        # Partitions of a device share its path as prefix, for example /dev/sdb1 of /dev/sdb
+        if any(device.startswith(target) for device in mounted_devices):
+            raise ValueError(f"Target {target} or one of its partitions is mounted")
+
+
+def _flash_target(
+    *,
+    result: FlashResult,
+    source: FlashSource,
+    chunks: queue.Queue[_QueueItem],
+    block_size: int,
+    direct: bool,
+    verify: bool,
+) -> None:
+    start_time = time.monotonic()
+    fd = None
+    is_device = is_block_device(result.target)
+    # A file target is truncated, so its unmapped ranges are holes. A device keeps its previous content there.
+    ranges_to_zero = source.unmapped_ranges if is_device else []
+    try:
+        fd = _open_target(target=result.target, size=source.size, direct=direct, is_device=is_device)
+    except (OSError, ValueError) as error:
+        result.error = str(error)
+
+    while not isinstance(item := chunks.get(), str):
+        offset, chunk = item
+        if fd is None or result.error is not None:
+            continue  # Keep consuming, so the reader isn't blocked by a failed target
+        try:
+            _write_chunk(fd=fd, offset=offset, chunk=chunk, direct=direct)
+            result.written += len(chunk)
+        except OSError as error:
+            result.error = f"Writing at offset {offset} failed: {error}"
+    if fd is None:
+        return
+
+    try:
+        if result.error is None:
+            zero_ranges(fd=fd, ranges=ranges_to_zero)
+            os.fsync(fd)
+            result.write_seconds = time.monotonic() - start_time
+            if verify:
+                verify_start_time = time.monotonic()
+                if not _matches_source(fd=fd, source=source, digest=item, block_size=block_size):
+                    result.error = "Read-back data doesn't match the source"
+                result.verify_seconds = time.monotonic() - verify_start_time
+    except OSError as error:
+        result.error = str(error)
+    finally:
+        os.close(fd)
+
+
+def _open_target(target: Path, size: int, direct: bool, is_device: bool) -> int:
+    flags = os.O_RDWR | (os.O_DIRECT if direct else 0) | (0 if is_device else os.O_CREAT | os.O_TRUNC)
+    fd = os.open(target, flags, 0o644)
+    try:
+        if is_device:
+            device_size = os.lseek(fd, 0, os.SEEK_END)
+            if device_size < size:
+                raise ValueError(f"Device {target} has {device_size} bytes, the source needs {size}")
+        else:
+            os.ftruncate(fd, size)
+    except (OSError, ValueError):
+        os.close(fd)
+        raise
+    return fd
+
+
+def _write_chunk(fd: int, offset: int, chunk: memoryview, direct: bool) -> None:
+    unaligned = direct and (offset % _DIRECT_ALIGNMENT or len(chunk) % _DIRECT_ALIGNMENT)
+    if unaligned:  # Only the tail of a source can be unaligned, which is written through the page cache
+        fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) & ~os.O_DIRECT)
+    try:
+        view = chunk
+        while view:
+            written = os.pwrite(fd, view, offset)
+            view = view[written:]
+            offset += written
+    finally:
+        if unaligned:
+            fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_DIRECT)
+
+
+def _matches_source(fd: int, source: FlashSource, digest: str, block_size: int) -> bool:
+    if _get_digest(fd=fd, ranges=source.ranges, block_size=block_size) != digest:
+        return False
+    return all(
+        not data.strip(b"\0") for data in _read_back(fd=fd, ranges=source.unmapped_ranges, block_size=block_size)
+    )
+
+
+def _get_digest(fd: int, ranges: list[tuple[int, int]], block_size: int) -> str:
+    digest = hashlib.sha256()
+    for data in _read_back(fd=fd, ranges=ranges, block_size=block_size):
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def _read_back(fd: int, ranges: list[tuple[int, int]], block_size: int) -> Iterator[bytes]:
+    # Drops the written data from the page cache, so it is really read back from the target
+    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) & ~os.O_DIRECT)
+    for offset, length in ranges:
+        end = offset + length
+        while offset < end:
+            data = os.pread(fd, min(block_size, end - offset), offset)
+            if not data:
+                raise OSError(f"Unexpected end of target at offset {offset}")
+            yield data
+            offset += len(data)
+
+
+def _read_source(source: FlashSource, block_size: int) -> Iterator[tuple[int, memoryview]]:
+    with ExitStack() as exit_stack:
+        stream = cast(IO[bytes], exit_stack.enter_context(source.path.open("rb", buffering=0)))
+        if source.block_map is not None:
+            process = exit_stack.enter_context(
+                subprocess.Popen(
+                    source.block_map.compression.get_decompress_command(), stdin=stream, stdout=subprocess.PIPE
+                )
+            )
+            stream = cast(IO[bytes], process.stdout)
+        for offset, length in source.ranges:
+            if source.block_map is None:
+                stream.seek(offset)
+            end = offset + length
+            while offset < end:
+                # Anonymous mappings are page aligned, as O_DIRECT requires. Every chunk gets its own buffer, because
+                # the writers still use the previous ones.
+                chunk = memoryview(mmap.mmap(-1, block_size))[: min(block_size, end - offset)]
+                _read_exactly(stream=stream, buffer=chunk)
+                yield offset, chunk
+                offset += len(chunk)
+
+
+def _read_exactly(stream: IO[bytes], buffer: memoryview) -> None:
+    position = 0
+    while position < len(buffer):
+        count = stream.readinto(buffer[position:])  # type: ignore[attr-defined]
+        if not count:
+            raise ValueError(f"Unexpected end of source, {len(buffer) - position} bytes of a block are missing")
+        position += count
+
+
+def _get_mounted_devices() -> set[str]:
+    try:
+        mounts = Path("/proc/mounts").read_text(encoding="utf-8")
+    except OSError:
+        return set()
+    return {str(Path(line.split()[0]).resolve()) for line in mounts.splitlines() if line.startswith("/dev/")}
@@ -0,0 +1,189 @@
+"""Contains a monitor that follows the debian-installer through its serial console output."""
+
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from logging import getLogger
+from pathlib import Path
+from typing import Callable
+
+_logger = getLogger(__name__)
+
+_ANSI_ESCAPE_PATTERN = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]|\x1b[()][A-Za-z0-9]|[\x00-\x08\x0e-\x1f]")
+
+
+@dataclass
+class InstallStage:
+    """A stage of the debian-installer.
+
+    Attributes:
+        name: The name of the stage.
+        pattern: The pattern of a console line that marks the start of the stage.
+        stall_timeout: The maximum duration of the stage in seconds before the installation is considered stalled.
+    """
+
+    name: str
+    pattern: re.Pattern
+    stall_timeout: float
+
+
+@dataclass
+class StageRecord:
+    """The timeline record of a stage.
+
+    Attributes:
+        name: The name of the stage.
+        start: The start of the stage in seconds since the start of the installation.
+        end: The end of the stage in seconds since the start of the installation or None if it is still running.
+    """
+
+    name: str
+    start: float
+    end: float | None = None
+
+    @property
+    def duration(self) -> float | None:
+        """Returns the duration of the stage.
+
+        Returns:
+            The duration in seconds or None if the stage is still running.
+        """
+        return None if self.end is None else self.end - self.start
+
+
+DEFAULT_STAGES = [
+    InstallStage("boot", re.compile(r"Linux version|Booting from"), stall_timeout=600),
+    InstallStage("partitioning", re.compile(r"Partitioning disks|partman", re.IGNORECASE), stall_timeout=900),
+    InstallStage("base-system", re.compile(r"Installing the base system|debootstrap"), stall_timeout=3600),
+    InstallStage("package-install", re.compile(r"Select and install software|pkgsel|tasksel"), stall_timeout=5400),
+    InstallStage("grub", re.compile(r"Install the GRUB boot loader|grub-installer"), stall_timeout=1800),
+    InstallStage("finish", re.compile(r"Finishing the installation|finish-install"), stall_timeout=1800),
+    InstallStage("reboot", re.compile(r"reboot: (Power down|Restarting system)"), stall_timeout=300),
+]
+
+DEFAULT_FATAL_PATTERNS = [
+    re.compile(r"Kernel panic"),
+    re.compile(r"An installation step failed"),
+    re.compile(r"Bad archive mirror"),
+    re.compile(r"Failed to retrieve the preconfiguration file"),
+    re.compile(r"Unable to install (the selected kernel|GRUB)"),
+    re.compile(r"No root file system is defined"),
+]
+
+
+@dataclass
+class InstallMonitor:
+    """Parses the serial console stream of the debian-installer and keeps a timeline of its stages.
+
+    The stages are expected in order, so a line of an earlier stage never moves the timeline back. The monitor raises
+    on known fatal console output and, if enabled, when a stage takes longer than its stall timeout.
+
+    Attributes:
+        stages: The stages of the installation in their expected order.
+        fatal_patterns: Console lines that indicate a failed installation.
+        detect_stalls: Whether to fail stages that exceed their stall timeout. This requires the installer console on
+            the serial port.
+        clock: The monotonic clock, in seconds.
+    """
+
+    stages: list[InstallStage] = field(default_factory=lambda: list(DEFAULT_STAGES))
+    fatal_patterns: list[re.Pattern] = field(default_factory=lambda: list(DEFAULT_FATAL_PATTERNS))
+    detect_stalls: bool = True
+    clock: Callable[[], float] = time.monotonic
+    timeline: list[StageRecord] = field(init=False, default_factory=list)
+    result: str = field(init=False, default="running")
+    _start: float = field(init=False, default=0.0)
+    _stage_index: int = field(init=False, default=0)
+    _buffer: str = field(init=False, default="")
+
+    def __post_init__(self) -> None:
+        """Starts the timeline with the first stage."""
+        self._start = self.clock()
+        self.timeline.append(StageRecord(name=self.stages[0].name, start=0.0))
+
+    def feed(self, data: str) -> None:
+        """Feeds console output into the monitor.
+
+        Args:
+            data: The console output, which may end in the middle of a line.
+
+        Raises:
+            RuntimeError: If the output contains a fatal pattern.
+        """
+        self._buffer += _ANSI_ESCAPE_PATTERN.sub("", data.replace("\r", "\n"))
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            self._process_line(line.strip())
+
+    def check_stall(self) -> None:
+        """Checks whether the current stage exceeds its stall timeout.
+
+        Raises:
+            RuntimeError: If stall detection is enabled and the current stage exceeds its stall timeout.
+        """
+        stage = self.stages[self._stage_index]
+        elapsed = self._elapsed() - self.timeline[-1].start
+        if self.detect_stalls and elapsed > stage.stall_timeout:
+            self._fail(f"stage '{stage.name}' stalled for {elapsed:.0f} seconds")
+
+    def finish(self) -> None:
+        """Marks the installation as finished."""
+        self._close_stage()
+        if self.result == "running":
+            self.result = "success"
+
+    def write_timeline(self, path: Path) -> None:
+        """Writes the stage timeline as JSON.
+
+        Args:
+            path: The path of the JSON file.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps(
+                {
+                    "result": self.result,
+                    "total_seconds": round(self._elapsed(), 3),
+                    "stages": [
+                        {
+                            "name": record.name,
+                            "start_seconds": round(record.start, 3),
+                            "duration_seconds": None if record.duration is None else round(record.duration, 3),
+                        }
+                        for record in self.timeline
+                    ],
+                },
+                indent=2,
+            )
+        )
+
+    def _process_line(self, line: str) -> None:
+        if not line:
+            return
+        for fatal_pattern in self.fatal_patterns:
+            if fatal_pattern.search(line):
+                self._fail(f"installer reported '{line}'")
+        for index in range(len(self.stages) - 1, self._stage_index, -1):
+            if self.stages[index].pattern.search(line):
+                self._enter_stage(index)
+                return
+
+    def _enter_stage(self, index: int) -> None:
+        self._close_stage()
+        self._stage_index = index
+        now = self._elapsed()
+        _logger.info(f"Installer stage '{self.stages[index].name}' started after {now:.0f} seconds")
+        self.timeline.append(StageRecord(name=self.stages[index].name, start=now))
+
+    def _close_stage(self) -> None:
+        if self.timeline[-1].end is None:
+            self.timeline[-1].end = self._elapsed()
+
+    def _fail(self, reason: str) -> None:
+        self._close_stage()
+        self.result = f"failed: {reason}"
+        raise RuntimeError(f"Installation failed: {reason}")
+
+    def _elapsed(self) -> float:
+        return self.clock() - self._start
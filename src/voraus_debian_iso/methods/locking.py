@@ -0,0 +1,75 @@
+"""Contains file based locks to share caches between concurrent processes."""
+
+import fcntl
+import os
+from pathlib import Path
+from types import TracebackType
+
+
+class FileLock:
+    """An advisory lock on a lock file, based on ``flock``.
+
+    The lock is bound to the open file description, so it is released when the process exits, even if it crashes.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Initializes the lock without acquiring it.
+
+        Args:
+            path: The path of the lock file. It is created if it doesn't exist.
+        """
+        self.path = path
+        self._file_descriptor: int | None = None
+
+    def acquire(self, shared: bool = False, blocking: bool = True) -> bool:
+        """Acquires the lock or converts an already acquired lock to the requested type.
+
+        Args:
+            shared: Whether to acquire a shared lock instead of an exclusive one.
+            blocking: Whether to wait until the lock is available.
+
+        Returns:
+            Whether the lock has been acquired.
+        """
+        if self._file_descriptor is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file_descriptor = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        if not blocking:
+            operation |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(self._file_descriptor, operation)
+        except BlockingIOError:
+            self.release()
+            return False
+        return True
+
+    def release(self) -> None:
+        """Releases the lock."""
+        if self._file_descriptor is not None:
+            os.close(self._file_descriptor)
+            self._file_descriptor = None
+
+    def __enter__(self) -> "FileLock":
+        """Acquires an exclusive lock.
+
+        Returns:
+            The acquired lock.
+        """
+        self.acquire()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Releases the lock.
+
+        Args:
+            exc_type: The type of the exception that has been raised, if any.
+            exc_value: The exception that has been raised, if any.
+            traceback: The traceback of the exception that has been raised, if any.
+        """
+        self.release()
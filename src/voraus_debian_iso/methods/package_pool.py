@@ -0,0 +1,263 @@
+"""Contains methods to embed a local package pool into the APT repository of a debian ISO."""
+
+import gzip
+import hashlib
+import io
+import lzma
+import re
+import tarfile
+from logging import getLogger
+from pathlib import Path
+from shutil import copy2
+from tempfile import TemporaryDirectory
+
+from voraus_debian_iso.methods.shell import execute_command
+
+_logger = getLogger(__name__)
+
+LOCAL_COMPONENT = "local"
+
+_AR_MAGIC = b"!<arch>\n"
+_AR_HEADER_SIZE = 60
+_RELEASE_HASHES = {"MD5Sum": "md5", "SHA1": "sha1", "SHA256": "sha256", "SHA512": "sha512"}
+
+# The installer scans the cdrom first, which adds all its components including the pool, and doesn't use the mirror
+OFFLINE_PRESEED_VALUES = {
+    "apt-setup/cdrom/set-first": "boolean true",
+    "apt-setup/use_mirror": "boolean false",
+}
+
+
+def get_deb_files(paths: list[Path]) -> list[Path]:
+    """Returns the debian packages of a list of package files and directories.
+
+    Args:
+        paths: The ``.deb`` files and directories that contain ``.deb`` files.
+
+    Returns:
+        The ``.deb`` files, with the files of a directory sorted by name.
+
+    Raises:
+        FileNotFoundError: If a path doesn't exist or a directory doesn't contain any ``.deb`` files.
+    """
+    deb_files = []
+    for path in paths:
+        if path.is_dir():
+            directory_files = sorted(path.glob("*.deb"))
+            if not directory_files:
+                raise FileNotFoundError(f"Package directory {path} doesn't contain any .deb files")
+            deb_files += directory_files
+        elif path.is_file():
+            deb_files.append(path)
+        else:
+            raise FileNotFoundError(f"Package {path} doesn't exist")
+    return deb_files
+
+
+def read_deb_control(deb_file: Path) -> dict[str, str]:
+    """Reads the control fields of a debian package.
+
+    The package is read directly, so the build host doesn't need dpkg.
+
+    Args:
+        deb_file: The ``.deb`` file.
+
+    Returns:
+        The control fields in the order of the control file. Continuation lines are kept in the values.
+
+    Raises:
+        ValueError: If the file is not a debian package or its control archive can't be read.
+    """
+    with deb_file.open("rb") as file:
+        if file.read(len(_AR_MAGIC)) != _AR_MAGIC:
+            raise ValueError(f"{deb_file} is not a debian package")
+        while header := file.read(_AR_HEADER_SIZE):
+            name = header[:16].decode().strip().rstrip("/")
+            size = int(header[48:58].decode())
+            if not name.startswith("control.tar"):
+                file.seek(size + size % 2, io.SEEK_CUR)
+                continue
+            control_tar = _decompress(name=name, data=file.read(size), deb_file=deb_file)
+            with tarfile.open(fileobj=io.BytesIO(control_tar)) as archive:
+                control_member = next(
+                    (member for member in archive.getmembers() if member.name.removeprefix("./") == "control"), None
+                )
+                control_file = archive.extractfile(control_member) if control_member else None
+                if control_file is None:
+                    raise ValueError(f"Control archive of {deb_file} doesn't contain a control file")
+                return parse_control(control_file.read().decode())
+    raise ValueError(f"{deb_file} doesn't contain a control archive")
+
+
+def parse_control(text: str) -> dict[str, str]:
+    """Parses a single deb822 paragraph, for example a package control file or a ``Release`` file.
+
+    Args:
+        text: The paragraph.
+
+    Returns:
+        The fields in the order of the paragraph. Continuation lines are kept in the values.
+    """
+    fields: dict[str, str] = {}
+    name = None
+    for line in text.splitlines():
+        if line.startswith((" ", "\t")) and name is not None:
+            fields[name] += f"\n{line}"
+        elif ":" in line:
+            name, _, value = line.partition(":")
+            fields[name] = value.strip()
+    return fields
+
+
+def get_pool_path(package: str, file_name: str) -> str:
+    """Returns the path of a package file in the local pool, using the layout of the debian archive.
+
+    Args:
+        package: The name of the source package.
+        file_name: The file name of the ``.deb`` file.
+
+    Returns:
+        The path, relative to the root of the ISO.
+    """
+    prefix = package[:4] if package.startswith("lib") else package[:1]
+    return f"pool/{LOCAL_COMPONENT}/{prefix}/{package}/{file_name}"
+
+
+def render_package_pool(overlay_dir: Path, iso_path: Path, architecture: str, deb_files: list[Path]) -> None:
+    """Renders a local package pool with its indexes into an overlay directory.
+
+    The packages are added as an additional component of the APT repository on the ISO, next to ``main``. The
+    installer trusts the cdrom repository without a signature, so the ``Release`` file is rewritten with the hashes of
+    the new indexes.
+
+    Args:
+        overlay_dir: The overlay directory, using the directory layout of the ISO.
+        iso_path: The upstream ISO, which provides the ``Release`` file to extend.
+        architecture: The architecture of the ISO.
+        deb_files: The ``.deb`` files to embed.
+
+    Raises:
+        ValueError: If a package is built for another architecture or two packages share a file name.
+    """
+    stanzas = {}
+    for deb_file in deb_files:
+        if deb_file.name in stanzas:
+            raise ValueError(f"Package file name {deb_file.name} is used by more than one package")
+        stanzas[deb_file.name] = _add_to_pool(overlay_dir=overlay_dir, deb_file=deb_file, architecture=architecture)
+    _logger.info(f"Embedding {len(stanzas)} packages into component '{LOCAL_COMPONENT}' of the ISO repository")
+
+    packages = "\n".join(stanza for _, stanza in sorted(stanzas.items())).encode()
+    index_dir = f"{LOCAL_COMPONENT}/binary-{architecture}"
+    index_files = {f"{index_dir}/Packages": packages, f"{index_dir}/Packages.gz": gzip.compress(packages, mtime=0)}
+
+    release = update_release(
+        release=_read_release_file(iso_path=iso_path), component=LOCAL_COMPONENT, index_files=index_files
+    )
+    dist_dir = overlay_dir / "dists" / parse_control(release)["Codename"]
+    for relative_path, content in index_files.items():
+        (dist_dir / relative_path).parent.mkdir(parents=True, exist_ok=True)
+        (dist_dir / relative_path).write_bytes(content)
+    (dist_dir / "Release").write_text(release)
+
+
+def set_preseed_values(preseed: str, values: dict[str, str]) -> str:
+    """Sets debian-installer questions in a preseed file.
+
+    Active lines of the questions are replaced, the other questions are appended.
+
+    Args:
+        preseed: The content of the preseed file.
+        values: The type and value of every question, for example ``boolean true``, by question name.
+
+    Returns:
+        The updated content of the preseed file.
+    """
+    for question, value in values.items():
+        line = f"d-i {question} {value}"
+        preseed, count = re.subn(rf"^d-i[ \t]+{re.escape(question)}[ \t].*$", line, preseed, flags=re.MULTILINE)
+        if count == 0:
+            preseed = preseed.rstrip("\n") + f"\n{line}\n"
+    return preseed
+
+
+def update_release(release: str, component: str, index_files: dict[str, bytes]) -> str:
+    """Adds a component and its index files to the ``Release`` file of a distribution.
+
+    Args:
+        release: The content of the ``Release`` file.
+        component: The component to add.
+        index_files: The contents of the index files, by their path relative to the distribution directory.
+
+    Returns:
+        The updated content of the ``Release`` file.
+    """
+    lines = []
+    hash_name = None
+    for line in release.splitlines():
+        if line.startswith(" "):
+            if hash_name is not None and line.split()[-1] in index_files:
+                continue  # Replaced by the new entry
+            lines.append(line)
+            continue
+        if hash_name is not None:
+            lines += _get_release_hash_lines(hash_name=hash_name, index_files=index_files)
+        name, _, value = line.partition(":")
+        hash_name = _RELEASE_HASHES.get(name)
+        if name == "Components" and component not in value.split():
+            line = f"{line} {component}"
+        lines.append(line)
+    if hash_name is not None:
+        lines += _get_release_hash_lines(hash_name=hash_name, index_files=index_files)
+    return "\n".join(lines) + "\n"
+
+
+def _add_to_pool(overlay_dir: Path, deb_file: Path, architecture: str) -> str:
+    control = read_deb_control(deb_file)
+    if control.get("Architecture") not in (architecture, "all"):
+        raise ValueError(
+            f"Package {deb_file.name} is built for architecture '{control.get('Architecture')}', not '{architecture}'"
+        )
+    source = control.get("Source", control["Package"]).split(" ")[0]
+    pool_path = get_pool_path(package=source, file_name=deb_file.name)
+    (overlay_dir / pool_path).parent.mkdir(parents=True, exist_ok=True)
+    copy2(deb_file, overlay_dir / pool_path)
+    return _get_packages_stanza(control=control, deb_file=deb_file, pool_path=pool_path)
+
+
+def _get_release_hash_lines(hash_name: str, index_files: dict[str, bytes]) -> list[str]:
+    return [
+        f" {hashlib.new(hash_name, content).hexdigest()} {len(content):>16} {path}"
+        for path, content in index_files.items()
+    ]
+
+
+def _get_packages_stanza(control: dict[str, str], deb_file: Path, pool_path: str) -> str:
+    content = deb_file.read_bytes()
+    fields = {
+        **control,
+        "Filename": pool_path,
+        "Size": str(len(content)),
+        "MD5sum": hashlib.md5(content).hexdigest(),
+        "SHA256": hashlib.sha256(content).hexdigest(),
+    }
+    return "".join(f"{name}: {value}\n" for name, value in fields.items())
+
+
+def _decompress(name: str, data: bytes, deb_file: Path) -> bytes:
+    if name.endswith(".gz"):
+        return gzip.decompress(data)
+    if name.endswith(".xz"):
+        return lzma.decompress(data)
+    if name == "control.tar":
+        return data
+    raise ValueError(f"Unsupported control archive {name} in {deb_file}. Rebuild the package with xz or gzip.")
+
+
+def _read_release_file(iso_path: Path) -> str:
+    with TemporaryDirectory() as temp_dir:
+        execute_command(["bsdtar", "-C", temp_dir, "-xf", str(iso_path), "dists/*/Release"])
+        # dists/stable is a symbolic link to the directory of the codename
+        release_files = [path for path in Path(temp_dir).glob("dists/*/Release") if not path.parent.is_symlink()]
+        if not release_files:
+            raise FileNotFoundError(f"ISO {iso_path} doesn't contain an APT repository")
+        return release_files[0].read_text()
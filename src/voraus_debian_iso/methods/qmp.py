@@ -0,0 +1,130 @@
+"""Contains an asyncio client for the QEMU machine protocol (QMP)."""
+
+import asyncio
+import json
+from logging import getLogger
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+
+_logger = getLogger(__name__)
+
+
+class QMPError(RuntimeError):
+    """Raised if QEMU answers a QMP command with an error."""
+
+
+class QMPClient:
+    """A client for the QMP socket of a QEMU VM.
+
+    QEMU sends a greeting on connect and only accepts commands after the capabilities have been negotiated, which the
+    client does in ``connect``. Asynchronous events that arrive while waiting for a command result are collected in
+    ``events``.
+    """
+
+    def __init__(self, socket_path: Path) -> None:
+        """Initializes the client without connecting.
+
+        Args:
+            socket_path: The path of the QMP unix socket.
+        """
+        self.socket_path = socket_path
+        self.events: list[dict[str, Any]] = []
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def connect(self) -> None:
+        """Connects to the QMP socket and negotiates the capabilities."""
+        self._reader, self._writer = await asyncio.open_unix_connection(str(self.socket_path))
+        greeting = await self._read_message()
+        _logger.debug(f"Connected to QMP socket {self.socket_path}: {greeting.get('QMP', {}).get('version')}")
+        await self.execute("qmp_capabilities")
+
+    async def execute(self, command: str, arguments: dict[str, Any] | None = None) -> Any:
+        """Executes a QMP command.
+
+        Args:
+            command: The name of the command.
+            arguments: The arguments of the command.
+
+        Returns:
+            The result of the command.
+
+        Raises:
+            QMPError: If QEMU answers with an error.
+            ConnectionError: If the client is not connected.
+        """
+        if self._writer is None:
+            raise ConnectionError(f"Not connected to QMP socket {self.socket_path}")
+        message: dict[str, Any] = {"execute": command}
+        if arguments:
+            message["arguments"] = arguments
+        self._writer.write(json.dumps(message).encode() + b"\n")
+        await self._writer.drain()
+        while True:
+            response = await self._read_message()
+            if "event" in response:
+                self.events.append(response)
+            elif "error" in response:
+                raise QMPError(f"QMP command '{command}' failed: {response['error'].get('desc')}")
+            elif "return" in response:
+                return response["return"]
+
+    async def human_monitor_command(self, command_line: str) -> str:
+        """Executes a human monitor (HMP) command, for commands without a QMP equivalent.
+
+        Args:
+            command_line: The HMP command line.
+
+        Returns:
+            The output of the command.
+
+        Raises:
+            QMPError: If the command reports an error.
+        """
+        output = await self.execute("human-monitor-command", {"command-line": command_line})
+        if output.lstrip().startswith("Error"):  # HMP reports errors as output instead of a QMP error
+            raise QMPError(f"HMP command '{command_line}' failed: {output.strip()}")
+        return output
+
+    async def close(self) -> None:
+        """Closes the connection."""
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass  # QEMU may already have closed the socket, for example after 'quit'
+            self._reader = self._writer = None
+
+    async def __aenter__(self) -> "QMPClient":
+        """Connects to the QMP socket.
+
+        Returns:
+            The connected client.
+        """
+        await self.connect()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Closes the connection.
+
+        Args:
+            exc_type: The type of the exception that has been raised, if any.
+            exc_value: The exception that has been raised, if any.
+            traceback: The traceback of the exception that has been raised, if any.
+        """
+        await self.close()
+
+    async def _read_message(self) -> dict[str, Any]:
+        if self._reader is None:
+            raise ConnectionError(f"Not connected to QMP socket {self.socket_path}")
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError(f"QMP socket {self.socket_path} has been closed")
+        return json.loads(line)
@@ -0,0 +1,334 @@
+"""Contains methods for compressed sparse raw disk images with a block map."""
+
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import stat
+import struct
+import subprocess
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import asdict, dataclass, field
+from enum import Enum
+from logging import getLogger
+from pathlib import Path
+from typing import IO, cast
+
+_logger = getLogger(__name__)
+
+_CHUNK_SIZE = 4 * 1024 * 1024
+_BLOCK_MAP_VERSION = 1
+# The ioctl of linux/fs.h that zeroes a byte range of a block device, _IO(0x12, 127)
+_BLKZEROOUT = 0x127F
+
+
+class Compression(str, Enum):
+    """Enum for the compressions of raw images."""
+
+    ZSTD = "zstd"
+    XZ = "xz"
+
+    @property
+    def extension(self) -> str:
+        """Returns the file extension of the compression.
+
+        Returns:
+            The file extension without the leading dot.
+        """
+        return "zst" if self == Compression.ZSTD else "xz"
+
+    def get_compress_command(self, level: int | None = None) -> list[str]:
+        """Returns the command that compresses stdin to stdout, using all cores.
+
+        Args:
+            level: The compression level. Defaults to the default level of the compressor.
+
+        Returns:
+            The command.
+        """
+        return [self.value, "-T0", "-q", "-c", *([f"-{level}"] if level is not None else [])]
+
+    def get_decompress_command(self) -> list[str]:
+        """Returns the command that decompresses stdin to stdout.
+
+        Returns:
+            The command.
+        """
+        return [self.value, "-d", "-q", "-c"]
+
+
+@dataclass
+class BlockMap:
+    """The block map of a compressed raw image.
+
+    Only the mapped ranges are part of the compressed stream, in the order of the ranges. Everything else reads as
+    zeros and is not compressed. On restore, it is zeroed by the target device instead of being written.
+
+    Attributes:
+        image_size: The size of the raw image in bytes.
+        compression: The compression of the stream.
+        ranges: The offsets and lengths of the mapped ranges in bytes.
+        sha256: The SHA256 hex digest of the uncompressed stream.
+        version: The version of the block map format.
+    """
+
+    image_size: int
+    compression: Compression
+    ranges: list[tuple[int, int]] = field(default_factory=list)
+    sha256: str = ""
+    version: int = _BLOCK_MAP_VERSION
+
+    @property
+    def mapped_size(self) -> int:
+        """Returns the number of bytes in the mapped ranges.
+
+        Returns:
+            The mapped size in bytes.
+        """
+        return sum(length for _, length in self.ranges)
+
+    @property
+    def unmapped_ranges(self) -> list[tuple[int, int]]:
+        """Returns the ranges of the image that are not part of the stream and read as zeros.
+
+        Returns:
+            The offsets and lengths of the unmapped ranges in bytes.
+        """
+        ranges = []
+        position = 0
+        for offset, length in self.ranges:
+            if offset > position:
+                ranges.append((position, offset - position))
+            position = offset + length
+        if position < self.image_size:
+            ranges.append((position, self.image_size - position))
+        return ranges
+
+    def save(self, path: Path) -> None:
+        """Saves the block map as JSON.
+
+        Args:
+            path: The block map file.
+        """
+        path.write_text(json.dumps(asdict(self), indent=2) + "\n")
+
+    @classmethod
+    def load(cls, path: Path) -> "BlockMap":
+        """Loads a block map from JSON.
+
+        Args:
+            path: The block map file.
+
+        Returns:
+            The block map.
+
+        Raises:
+            ValueError: If the block map has an unsupported version.
+        """
+        data = json.loads(path.read_text())
+        if data.get("version") != _BLOCK_MAP_VERSION:
+            raise ValueError(f"Block map {path} has unsupported version {data.get('version')}")
+        return cls(
+            image_size=data["image_size"],
+            compression=Compression(data["compression"]),
+            ranges=[(int(offset), int(length)) for offset, length in data["ranges"]],
+            sha256=data["sha256"],
+        )
+
+
+def get_block_map_file(image_file: Path) -> Path:
+    """Returns the block map file that belongs to a compressed raw image.
+
+    Args:
+        image_file: The compressed raw image.
+
+    Returns:
+        The block map file.
+    """
+    return image_file.with_name(f"{image_file.name}.bmap.json")
+
+
+def get_data_ranges(raw_file: Path) -> list[tuple[int, int]]:
+    """Returns the ranges of a sparse file that contain data, skipping its holes.
+
+    Args:
+        raw_file: The sparse file.
+
+    Returns:
+        The offsets and lengths of the data ranges in bytes.
+    """
+    ranges = []
+    fd = os.open(raw_file, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        offset = 0
+        while offset < size:
+            try:
+                start = os.lseek(fd, offset, os.SEEK_DATA)
+            except OSError:  # ENXIO if there is no data after the offset
+                break
+            end = os.lseek(fd, start, os.SEEK_HOLE)
+            ranges.append((start, end - start))
+            offset = end
+    finally:
+        os.close(fd)
+    return ranges
+
+
+def is_block_device(path: Path) -> bool:
+    """Returns whether a path is a block device.
+
+    Args:
+        path: The path.
+
+    Returns:
+        True if the path exists and is a block device.
+    """
+    return path.exists() and stat.S_ISBLK(path.stat().st_mode)
+
+
+def zero_ranges(fd: int, ranges: list[tuple[int, int]]) -> None:
+    """Zeroes ranges of a block device.
+
+    The ranges are zeroed with ``BLKZEROOUT``, which lets the device use write-zeroes or a discard that guarantees
+    zeros instead of transferring the zeros. Targets that don't support it are written with zeros.
+
+    Args:
+        fd: The file descriptor of the block device, opened for writing.
+        ranges: The offsets and lengths of the ranges in bytes.
+    """
+    zeros = None
+    for offset, length in ranges:
+        try:
+            fcntl.ioctl(fd, _BLKZEROOUT, struct.pack("QQ", offset, length))
+            continue
+        except OSError:
+            pass
+        # Anonymous mappings are zeroed and page aligned, as O_DIRECT requires
+        zeros = zeros or memoryview(mmap.mmap(-1, _CHUNK_SIZE))
+        end = offset + length
+        while offset < end:
+            offset += os.pwrite(fd, zeros[: min(_CHUNK_SIZE, end - offset)], offset)
+
+
+def write_compressed_image(
+    raw_file: Path, image_file: Path, compression: Compression = Compression.ZSTD, level: int | None = None
+) -> BlockMap:
+    """Compresses the data ranges of a sparse raw image into a stream and writes its block map next to it.
+
+    Args:
+        raw_file: The sparse raw image.
+        image_file: The compressed image to write.
+        compression: The compression of the stream.
+        level: The compression level. Defaults to the default level of the compressor.
+
+    Returns:
+        The block map.
+
+    Raises:
+        RuntimeError: If the compressor fails.
+    """
+    block_map = BlockMap(image_size=raw_file.stat().st_size, compression=compression, ranges=get_data_ranges(raw_file))
+    digest = hashlib.sha256()
+    with (
+        raw_file.open("rb") as raw,
+        image_file.open("wb") as output,
+        subprocess.Popen(
+            compression.get_compress_command(level=level), stdin=subprocess.PIPE, stdout=output
+        ) as process,
+    ):
+        stdin = cast(IO[bytes], process.stdin)
+        for offset, length in block_map.ranges:
+            raw.seek(offset)
+            for chunk in _read_chunks(read=raw.read, length=length):
+                digest.update(chunk)
+                stdin.write(chunk)
+        stdin.close()
+        if process.wait() != 0:
+            raise RuntimeError(f"{compression.value} failed with exit code {process.returncode}")
+    block_map.sha256 = digest.hexdigest()
+    block_map.save(get_block_map_file(image_file))
+    return block_map
+
+
+def restore_image(image_file: Path, target: Path, block_map_file: Path | None = None) -> int:
+    """Streams a compressed raw image to a block device or file, writing only the mapped ranges.
+
+    A file target is truncated to the image size first, so the unmapped ranges are holes. On a block device, the
+    unmapped ranges are zeroed by the device, because the image relies on them reading as zeros: the export turns all
+    zero blocks into holes, including zero-filled file data and metadata.
+
+    Args:
+        image_file: The compressed raw image.
+        target: The block device or file to write.
+        block_map_file: The block map. Defaults to the block map next to the image.
+
+    Returns:
+        The number of bytes written.
+
+    Raises:
+        ValueError: If the target device is too small or the written data doesn't match the block map.
+        RuntimeError: If the decompressor fails.
+    """
+    block_map = BlockMap.load(block_map_file or get_block_map_file(image_file))
+    is_device = is_block_device(target)
+    fd = os.open(target, os.O_WRONLY | (0 if is_device else os.O_CREAT | os.O_TRUNC), 0o644)
+    try:
+        if is_device:
+            device_size = os.lseek(fd, 0, os.SEEK_END)
+            if device_size < block_map.image_size:
+                raise ValueError(f"Device {target} has {device_size} bytes, the image needs {block_map.image_size}")
+        else:
+            os.ftruncate(fd, block_map.image_size)
+        start_time = time.monotonic()
+        digest = _write_ranges(image_file=image_file, block_map=block_map, fd=fd)
+        if is_device:
+            zero_ranges(fd=fd, ranges=block_map.unmapped_ranges)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    if digest != block_map.sha256:
+        raise ValueError(f"Restored data of {image_file} doesn't match its block map (SHA256 {digest})")
+
+    duration = time.monotonic() - start_time
+    _logger.info(
+        f"Wrote {block_map.mapped_size / 1024**2:.1f} MiB of the {block_map.image_size / 1024**2:.1f} MiB image to "
+        f"{target} in {duration:.1f}s ({block_map.mapped_size / 1024**2 / max(duration, 1e-9):.1f} MiB/s)"
+    )
+    return block_map.mapped_size
+
+
+def _write_ranges(image_file: Path, block_map: BlockMap, fd: int) -> str:
+    digest = hashlib.sha256()
+    with (
+        image_file.open("rb") as image,
+        subprocess.Popen(
+            block_map.compression.get_decompress_command(), stdin=image, stdout=subprocess.PIPE
+        ) as process,
+    ):
+        stdout = cast(IO[bytes], process.stdout)
+        for offset, length in block_map.ranges:
+            for chunk in _read_chunks(read=stdout.read, length=length):
+                digest.update(chunk)
+                view = memoryview(chunk)
+                while view:
+                    written = os.pwrite(fd, view, offset)
+                    view = view[written:]
+                    offset += written
+        if stdout.read(1):
+            raise ValueError(f"Image {image_file} contains more data than its block map")
+        if process.wait() != 0:
+            raise RuntimeError(f"{block_map.compression.value} failed with exit code {process.returncode}")
+    return digest.hexdigest()
+
+
+def _read_chunks(read: Callable[[int], bytes], length: int) -> Iterator[bytes]:
+    remaining = length
+    while remaining:
+        chunk = read(min(_CHUNK_SIZE, remaining))
+        if not chunk:
+            raise ValueError(f"Unexpected end of data, {remaining} bytes are missing")
+        remaining -= len(chunk)
+        yield chunk
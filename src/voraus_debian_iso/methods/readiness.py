@@ -0,0 +1,77 @@
+"""Contains a cheap readiness probe for the SSH server of a VM."""
+
+import socket
+import time
+from logging import getLogger
+
+_logger = getLogger(__name__)
+
+_SSH_BANNER_PREFIX = b"SSH-"
+
+
+def read_ssh_banner(host: str, port: int, timeout: float = 1.0) -> str | None:
+    """Reads the identification banner an SSH server sends right after a connection has been accepted.
+
+    QEMU user networking accepts connections on forwarded ports before the guest listens on them and closes them
+    again, so an accepted connection alone doesn't mean that the SSH server is ready.
+
+    Args:
+        host: The host to connect to.
+        port: The port to connect to.
+        timeout: The connection and read timeout in seconds.
+
+    Returns:
+        The banner or None if the server is not ready.
+    """
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as connection:
+            data = b""
+            while b"\n" not in data and len(data) < 256:
+                chunk = connection.recv(256)
+                if not chunk:
+                    break
+                data += chunk
+    except OSError:
+        return None
+    line = data.split(b"\n", 1)[0].strip()
+    return line.decode(errors="replace") if line.startswith(_SSH_BANNER_PREFIX) else None
+
+
+def wait_for_ssh_banner(
+    host: str,
+    port: int,
+    timeout: float = 120.0,
+    initial_interval: float = 0.05,
+    max_interval: float = 1.0,
+) -> float:
+    """Waits until an SSH server sends its banner, probing with exponential backoff.
+
+    Probing is much cheaper than an SSH handshake, so it can start with a short interval.
+
+    Args:
+        host: The host to connect to.
+        port: The port to connect to.
+        timeout: The maximum time to wait in seconds.
+        initial_interval: The interval between the first probes in seconds.
+        max_interval: The maximum interval between probes in seconds.
+
+    Returns:
+        The time in seconds until the banner has been received.
+
+    Raises:
+        TimeoutError: If the SSH server is not ready within the timeout.
+    """
+    start_time = time.monotonic()
+    interval = initial_interval
+    attempts = 0
+    while True:
+        attempts += 1
+        banner = read_ssh_banner(host=host, port=port, timeout=max(max_interval, 0.1))
+        elapsed = time.monotonic() - start_time
+        if banner is not None:
+            _logger.debug(f"SSH server on {host}:{port} is ready after {elapsed:.2f} seconds and {attempts} probes")
+            return elapsed
+        if elapsed >= timeout:
+            raise TimeoutError(f"SSH server on {host}:{port} is not ready after {timeout} seconds")
+        time.sleep(min(interval, max(timeout - elapsed, 0)))
+        interval = min(interval * 2, max_interval)
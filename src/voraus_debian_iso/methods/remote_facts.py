@@ -0,0 +1,107 @@
+"""Contains the batched collection of facts about a remote host over SSH."""
+
+import json
+import shlex
+from dataclasses import dataclass
+from logging import getLogger
+
+from fabric import Connection
+
+_logger = getLogger(__name__)
+
+# Runs on the remote host, which needs python3. The facts don't depend on each other, so they are collected in
+# parallel and the batch takes as long as its slowest command.
+_COLLECTOR_SCRIPT = """
+import json, subprocess, sys
+from concurrent.futures import ThreadPoolExecutor
+commands = json.loads(sys.argv[1])
+def run(command):
+    result = subprocess.run(command, shell=True, capture_output=True, text=True, errors="replace")
+    return {"stdout": result.stdout, "stderr": result.stderr, "exit_code": result.returncode}
+with ThreadPoolExecutor(max_workers=8) as executor:
+    print(json.dumps(dict(zip(commands, executor.map(run, commands.values())))))
+"""
+
+
+@dataclass(frozen=True)
+class Fact:
+    """The result of a fact command.
+
+    Attributes:
+        stdout: The standard output of the command.
+        stderr: The standard error of the command.
+        exit_code: The exit code of the command.
+    """
+
+    stdout: str
+    stderr: str
+    exit_code: int
+
+    @property
+    def ok(self) -> bool:
+        """Returns whether the command succeeded.
+
+        Returns:
+            Whether the exit code is zero.
+        """
+        return self.exit_code == 0
+
+
+class RemoteFacts:
+    """Collects named facts about a remote host with one SSH round trip per batch.
+
+    Every fact is the result of a shell command. The commands of a batch are sent to the host as one script, which
+    runs them concurrently and returns all results as JSON. Collected facts are cached, so the commands must not have
+    side effects.
+    """
+
+    def __init__(self, connection: Connection) -> None:
+        """Initializes the facts without collecting any.
+
+        Args:
+            connection: The SSH connection to the remote host.
+        """
+        self.connection = connection
+        self.round_trips = 0
+        self._commands: dict[str, str] = {}
+        self._facts: dict[str, Fact] = {}
+
+    def collect(self, commands: dict[str, str]) -> dict[str, Fact]:
+        """Collects facts in one round trip, taking the facts that have been collected before from the cache.
+
+        Args:
+            commands: The shell commands of the facts, by fact name.
+
+        Returns:
+            The facts, by fact name.
+
+        Raises:
+            ValueError: If a fact name has been collected with another command before.
+        """
+        for name, command in commands.items():
+            if self._commands.get(name, command) != command:
+                raise ValueError(f"Fact '{name}' has already been collected with command '{self._commands[name]}'")
+        missing = {name: command for name, command in commands.items() if name not in self._facts}
+        if missing:
+            self._facts.update(self._run_batch(missing))
+            self._commands.update(missing)
+        return {name: self._facts[name] for name in commands}
+
+    def __getitem__(self, name: str) -> Fact:
+        """Returns a collected fact.
+
+        Args:
+            name: The name of the fact.
+
+        Returns:
+            The fact.
+        """
+        return self._facts[name]
+
+    def _run_batch(self, commands: dict[str, str]) -> dict[str, Fact]:
+        _logger.debug(f"Collecting facts {', '.join(commands)} from {self.connection.host}")
+        result = self.connection.run(
+            f"python3 -c {shlex.quote(_COLLECTOR_SCRIPT)} {shlex.quote(json.dumps(commands))}", hide=True
+        )
+        self.round_trips += 1
+        return {name: Fact(**values) for name, values in json.loads(result.stdout).items()}
@@ -1,16 +1,358 @@
 """Contains shell helper functions."""
 
+import asyncio
+import io
+import os
+import re
+import resource
+import signal
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass
 from logging import getLogger
-from subprocess import check_output
+from pathlib import Path
+from subprocess import PIPE, CalledProcessError, Popen, TimeoutExpired
+from types import FrameType
+from typing import IO, Any, Callable, Optional, cast
+
+from voraus_debian_iso.methods.tracing import span
 
 _logger = getLogger(__name__)
 
+_STDERR_TAIL_SIZE = 4096
+_READ_SIZE = 65536
+_PROGRESS_LOG_INTERVAL = 5.0
+_TERMINATE_TIMEOUT = 5.0
+_XORRISO_PROGRESS_PATTERN = re.compile(r"^xorriso : UPDATE :\s*(.*)$")
+_TERMINATING_SIGNALS = (signal.SIGTERM, signal.SIGHUP)
+
+# The process groups of the running commands. They don't receive the signals sent to the process group of this
+# process, so they are terminated by the signal handlers before this process terminates.
+_running_process_groups: set[int] = set()
+_running_process_groups_lock = threading.Lock()
+
+# Turns a line of the standard error of a command into a progress message, or returns None for other lines
+ProgressParser = Callable[[str], Optional[str]]
+
+
+@dataclass(frozen=True)
+class CommandResult:
+    """The result of a finished command.
+
+    Attributes:
+        stdout: The standard output of the command.
+        stderr_tail: The last bytes of the standard error of the command.
+        exit_code: The exit code of the command, negative if it was killed by a signal.
+        rusage: The resources the command used, including its own children.
+    """
+
+    stdout: str
+    stderr_tail: str
+    exit_code: int
+    rusage: resource.struct_rusage
+
+    def get_trace_attributes(self) -> dict[str, Any]:
+        """Returns the attributes of the trace span of the command.
+
+        Returns:
+            The exit code, the CPU times, the peak memory, the block I/O and the stderr tail.
+        """
+        return {
+            "exit_code": self.exit_code,
+            "user_cpu_seconds": self.rusage.ru_utime,
+            "system_cpu_seconds": self.rusage.ru_stime,
+            "max_rss_kib": self.rusage.ru_maxrss,
+            "block_input_operations": self.rusage.ru_inblock,
+            "block_output_operations": self.rusage.ru_oublock,
+            "stderr_tail": self.stderr_tail,
+        }
+
+
+def install_signal_handlers() -> None:
+    """Terminates the process groups of the running commands before this process is terminated by SIGTERM or SIGHUP.
+
+    Every command runs in its own session, so it doesn't receive the signals sent to this process or its process group.
+    The handlers terminate the running commands and then terminate this process with the same signal. Signals that
+    already have a handler or are ignored are left alone. Handlers can only be installed from the main thread, so
+    calls from other threads are ignored; running a command installs them as well.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for signal_number in _TERMINATING_SIGNALS:
+        if signal.getsignal(signal_number) == signal.SIG_DFL:
+            signal.signal(signal_number, _terminate_running_commands)
+
+
+def _terminate_running_commands(signal_number: int, _: FrameType | None) -> None:
+    with _running_process_groups_lock:
+        process_groups = list(_running_process_groups)
+    for pgid in process_groups:
+        _signal_process_group(pgid, signal.SIGTERM)
+    # Terminates this process the same way the signal would have without the handler
+    signal.signal(signal_number, signal.SIG_DFL)
+    os.kill(os.getpid(), signal_number)
+
+
+def parse_xorriso_progress(line: str) -> str | None:
+    """Returns the progress message of an ``xorriso : UPDATE :`` line.
+
+    Args:
+        line: A line of the standard error of xorriso.
+
+    Returns:
+        The progress, for example ``45.00% done, estimate finish ...``, or None for other lines.
+    """
+    match = _XORRISO_PROGRESS_PATTERN.match(line)
+    return match.group(1) if match else None
+
+
+class ExtractProgress:
+    """Counts the files a verbose ``bsdtar -x`` reports on its standard error."""
+
+    def __init__(self) -> None:
+        """Initializes the progress without files."""
+        self.files = 0
+        self._start_time = time.monotonic()
+
+    def __call__(self, line: str) -> str | None:
+        """Counts an extracted file.
+
+        Args:
+            line: A line of the standard error of bsdtar.
+
+        Returns:
+            The number of extracted files and the extraction rate, or None for other lines.
+        """
+        if not line.startswith("x "):
+            return None
+        self.files += 1
+        return f"{self.files} files extracted ({self.files / max(time.monotonic() - self._start_time, 1e-9):.0f}/s)"
+
 
-def execute_command(command: list[str]) -> None:
+# The progress of the long running tools is logged without the callers asking for it
+_DEFAULT_PROGRESS_PARSERS: dict[str, Callable[[], ProgressParser]] = {
+    "xorriso": lambda: parse_xorriso_progress,
+    "bsdtar": ExtractProgress,
+}
+
+
+def execute_command(command: list[str], timeout: float | None = None, progress: ProgressParser | None = None) -> str:
     """Executes a shell command and logs the command.
 
     Args:
         command: The command to execute as a list of strings.
+        timeout: The time in seconds after which the command is killed.
+        progress: Turns lines of the standard error into progress messages, which are logged periodically. Defaults
+            to the parser of the tool, if any.
+
+    Returns:
+        The standard output of the command.
+    """
+    return asyncio.run(execute_command_async(command, timeout=timeout, progress=progress))
+
+
+def execute_commands(commands: list[list[str]], timeout: float | None = None) -> list[str]:
+    """Executes independent shell commands concurrently.
+
+    If one of the commands fails, the others are killed.
+
+    Args:
+        commands: The commands to execute as lists of strings.
+        timeout: The time in seconds after which each command is killed.
+
+    Returns:
+        The standard outputs of the commands, in the order of the commands.
+    """
+    return asyncio.run(_execute_all(commands, timeout=timeout))
+
+
+async def _execute_all(commands: list[list[str]], timeout: float | None) -> list[str]:
+    tasks = [asyncio.create_task(execute_command_async(command, timeout=timeout)) for command in commands]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def execute_command_async(
+    command: list[str], timeout: float | None = None, progress: ProgressParser | None = None
+) -> str:
+    """Executes a shell command and logs the command, its output and its progress.
+
+    The command is traced as a span with its resource usage.
+
+    Args:
+        command: The command to execute as a list of strings.
+        timeout: The time in seconds after which the command is killed.
+        progress: Turns lines of the standard error into progress messages, which are logged periodically. Defaults
+            to the parser of the tool, if any.
+
+    Returns:
+        The standard output of the command.
+
+    Raises:
+        CalledProcessError: If the command fails. Its stderr is the tail of the standard error, which is logged as an
+            error as well.
     """
     _logger.debug(f"Executing command '{' '.join(command)}'")
-    check_output(command)
+    name = Path(command[0]).name
+    if progress is None and name in _DEFAULT_PROGRESS_PARSERS:
+        progress = _DEFAULT_PROGRESS_PARSERS[name]()
+    with span(name, category="subprocess", command=command) as attributes:
+        result = await run_command(command, timeout=timeout, progress=progress)
+        attributes.update(result.get_trace_attributes())
+    if result.exit_code != 0:
+        # The standard error is only logged in debug level while the command runs, but explains why it failed
+        _logger.error(f"{name} failed with exit code {result.exit_code}:\n{result.stderr_tail.rstrip()}")
+        raise CalledProcessError(result.exit_code, command, output=result.stdout, stderr=result.stderr_tail)
+    return result.stdout
+
+
+async def run_command(
+    command: list[str], timeout: float | None = None, progress: ProgressParser | None = None
+) -> CommandResult:
+    """Runs a command to completion in its own process group and streams its output line by line into the log.
+
+    If the command times out or the calling task is cancelled, the whole process group is terminated, so no child of
+    the command is left behind. The same happens if this process is terminated by SIGTERM or SIGHUP, see
+    :func:`install_signal_handlers`.
+
+    Args:
+        command: The command to run as a list of strings.
+        timeout: The time in seconds after which the command is killed.
+        progress: Turns lines of the standard error into progress messages, which are logged periodically.
+
+    Returns:
+        The result of the command.
+
+    Raises:
+        TimeoutExpired: If the command didn't finish within the timeout.
+        BaseException: Any other error while the command runs, like the cancellation of the task, after the process
+            group has been terminated.
+    """
+    name = Path(command[0]).name
+    stdout = bytearray()
+    stderr_tail = bytearray()
+    install_signal_handlers()
+
+    def on_stderr(chunk: bytes) -> None:
+        stderr_tail.extend(chunk)
+        del stderr_tail[:-_STDERR_TAIL_SIZE]
+
+    with (
+        Popen(command, stdout=PIPE, stderr=PIPE, start_new_session=True) as process,
+        _register_process_group(process.pid),
+        _watch_exit(process.pid) as exited,
+    ):
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    _read_stream(cast(IO[bytes], process.stdout), stdout.extend, _get_line_logger(name)),
+                    _read_stream(cast(IO[bytes], process.stderr), on_stderr, _get_line_logger(name, progress)),
+                    # Cancelling the gather must not cancel the exit, which is still awaited below
+                    asyncio.shield(exited),
+                ),
+                timeout=timeout,
+            )
+        except BaseException as error:
+            await _terminate_process_group(process.pid, exited)
+            if isinstance(error, TimeoutError):
+                raise TimeoutExpired(
+                    command, cast(float, timeout), output=bytes(stdout), stderr=bytes(stderr_tail)
+                ) from error
+            raise
+        finally:
+            # Reaping the child with wait4 provides the resource usage of exactly this command
+            _, status, rusage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+    return CommandResult(
+        # Decoded like check_output(text=True): locale encoding and universal newlines
+        stdout=io.TextIOWrapper(io.BytesIO(stdout)).read(),
+        stderr_tail=stderr_tail.decode(errors="replace"),
+        exit_code=process.returncode,
+        rusage=rusage,
+    )
+
+
+def _get_line_logger(name: str, progress: ProgressParser | None = None) -> Callable[[str], None]:
+    last_report = time.monotonic()
+
+    def log_line(line: str) -> None:
+        nonlocal last_report
+        message = progress(line) if progress is not None else None
+        if message is None:
+            _logger.debug(f"{name}: {line}")
+        elif time.monotonic() - last_report >= _PROGRESS_LOG_INTERVAL:
+            last_report = time.monotonic()
+            _logger.info(f"{name}: {message}")
+
+    return log_line
+
+
+async def _read_stream(pipe: IO[bytes], on_chunk: Callable[[bytes], Any], on_line: Callable[[str], None]) -> None:
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+    pending = b""
+    try:
+        while chunk := await reader.read(_READ_SIZE):
+            on_chunk(chunk)
+            *lines, pending = re.split(rb"\r?\n|\r", pending + chunk)
+            for line in lines:
+                on_line(line.decode(errors="replace"))
+        if pending:
+            on_line(pending.decode(errors="replace"))
+    finally:
+        transport.close()
+
+
+@contextmanager
+def _register_process_group(pgid: int) -> Iterator[None]:
+    with _running_process_groups_lock:
+        _running_process_groups.add(pgid)
+    try:
+        yield
+    finally:
+        with _running_process_groups_lock:
+            _running_process_groups.discard(pgid)
+
+
+@contextmanager
+def _watch_exit(pid: int) -> Iterator["asyncio.Future[None]"]:
+    # A pidfd becomes readable once the process exited. Unlike the child watchers of asyncio, it doesn't reap the
+    # process, so wait4 can still collect its resource usage.
+    loop = asyncio.get_running_loop()
+    exited: asyncio.Future[None] = loop.create_future()
+    pidfd = os.pidfd_open(pid)
+
+    def on_exit() -> None:
+        if not exited.done():
+            exited.set_result(None)
+
+    loop.add_reader(pidfd, on_exit)
+    try:
+        yield exited
+    finally:
+        loop.remove_reader(pidfd)
+        os.close(pidfd)
+
+
+async def _terminate_process_group(pgid: int, exited: "asyncio.Future[None]") -> None:
+    _logger.warning(f"Terminating process group {pgid}")
+    _signal_process_group(pgid, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(asyncio.shield(exited), timeout=_TERMINATE_TIMEOUT)
+    except TimeoutError:
+        _signal_process_group(pgid, signal.SIGKILL)
+        await exited
+    # Children that ignored SIGTERM must not outlive the command
+    _signal_process_group(pgid, signal.SIGKILL)
+
+
+def _signal_process_group(pgid: int, signal_number: signal.Signals) -> None:
+    with suppress(ProcessLookupError):
+        os.killpg(pgid, signal_number)
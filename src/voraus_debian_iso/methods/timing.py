@@ -0,0 +1,76 @@
+"""Contains the recording of phase timings, for example for benchmarks."""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from voraus_debian_iso.methods.tracing import span
+
+_active_recorder: ContextVar["PhaseRecorder | None"] = ContextVar("active_recorder", default=None)
+
+
+class PhaseRecorder:
+    """Collects the durations of the phases that run while the recorder is active.
+
+    Phases report to the active recorder of their context and cost nothing if no recorder is active. Durations of
+    phases that run several times are summed up.
+    """
+
+    def __init__(self) -> None:
+        """Initializes the recorder without activating it."""
+        self.phases: dict[str, float] = {}
+
+    def record(self, name: str, duration: float) -> None:
+        """Records the duration of a phase.
+
+        Args:
+            name: The name of the phase.
+            duration: The duration in seconds.
+        """
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    @contextmanager
+    def activate(self) -> Iterator["PhaseRecorder"]:
+        """Makes the recorder the active recorder of the current context.
+
+        Yields:
+            The recorder.
+        """
+        token = _active_recorder.set(self)
+        try:
+            yield self
+        finally:
+            _active_recorder.reset(token)
+
+
+def record_phase(name: str, duration: float) -> None:
+    """Records the duration of a phase that has been measured elsewhere in the active recorder, if any.
+
+    Args:
+        name: The name of the phase.
+        duration: The duration in seconds.
+    """
+    recorder = _active_recorder.get()
+    if recorder is not None:
+        recorder.record(name, duration)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Measures the duration of a phase and records it in the active recorder, if any.
+
+    The phase is traced as a span as well.
+
+    Args:
+        name: The name of the phase.
+
+    Yields:
+        Nothing, the phase runs in the body of the context.
+    """
+    start_time = time.perf_counter()
+    try:
+        with span(name):
+            yield
+    finally:
+        record_phase(name, time.perf_counter() - start_time)
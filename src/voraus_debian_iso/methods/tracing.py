@@ -0,0 +1,108 @@
+"""Contains the tracing of CLI commands, their phases and their subprocesses as nested spans."""
+
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from logging import getLogger
+from pathlib import Path
+from typing import Any
+
+_logger = getLogger(__name__)
+
+# The tracers are active for the whole process, so the spans of worker threads (like the unit ISOs of a fleet build or
+# the segments of a download) are traced as well. Only the innermost tracer receives the spans.
+_active_tracers: list["Tracer"] = []
+
+
+class Tracer:
+    """Collects the spans that end while the tracer is active and writes them in the Chrome trace event format.
+
+    Every span is a complete event (``"ph": "X"``) with its attributes as arguments. Spans of the same thread nest by
+    their timestamps, so the file shows the command, its phases and their subprocesses as a flame graph in Perfetto or
+    ``chrome://tracing``.
+    """
+
+    def __init__(self) -> None:
+        """Initializes the tracer without activating it."""
+        self.events: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, category: str, *, start_ns: int, end_ns: int, attributes: dict[str, Any]) -> None:
+        """Adds a finished span.
+
+        Args:
+            name: The name of the span.
+            category: The category of the span, for example ``phase`` or ``subprocess``.
+            start_ns: The start of the span on the performance counter in nanoseconds.
+            end_ns: The end of the span on the performance counter in nanoseconds.
+            attributes: The attributes of the span.
+        """
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start_ns / 1000,
+            "dur": (end_ns - start_ns) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+            "args": attributes,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def write(self, trace_file: Path) -> None:
+        """Writes all spans to a Chrome trace file.
+
+        Args:
+            trace_file: The trace file.
+        """
+        trace_file.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            events = sorted(self.events, key=lambda event: event["ts"])
+        trace_file.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}), encoding="utf-8")
+        _logger.info(f"Trace with {len(events)} spans has been written to {trace_file}")
+
+    @contextmanager
+    def activate(self) -> Iterator["Tracer"]:
+        """Makes the tracer the active tracer of the process.
+
+        Yields:
+            The tracer.
+        """
+        _active_tracers.append(self)
+        try:
+            yield self
+        finally:
+            _active_tracers.remove(self)
+
+
+@contextmanager
+def span(name: str, category: str = "phase", **attributes: Any) -> Iterator[dict[str, Any]]:
+    """Traces a span in the active tracer, if any.
+
+    Exceptions that leave the span are added to its attributes as ``error``.
+
+    Args:
+        name: The name of the span.
+        category: The category of the span, for example ``phase`` or ``subprocess``.
+        attributes: The initial attributes of the span.
+
+    Yields:
+        The attributes of the span, which can be extended until the span ends.
+
+    Raises:
+        BaseException: Any exception of the span, after it has been added to the attributes.
+    """
+    tracer = _active_tracers[-1] if _active_tracers else None
+    start_ns = time.perf_counter_ns()
+    try:
+        yield attributes
+    except BaseException as error:
+        attributes["error"] = repr(error)
+        raise
+    finally:
+        if tracer is not None:
+            tracer.add_span(name, category, start_ns=start_ns, end_ns=time.perf_counter_ns(), attributes=attributes)
@@ -0,0 +1,187 @@
+"""Contains the state of named QEMU VM instances."""
+
+import json
+import os
+import re
+import socket
+from dataclasses import dataclass
+from logging import getLogger
+from pathlib import Path
+from typing import Any
+
+from voraus_debian_iso.constants import VMS_DIR
+from voraus_debian_iso.methods.locking import FileLock
+
+_logger = getLogger(__name__)
+
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,31}$")
+_STATE_FILE_NAME = "state.json"
+
+
+@dataclass(frozen=True)
+class VMInstance:
+    """A named QEMU VM instance with its own state directory.
+
+    The state directory holds the PID file, the QMP socket, the serial console log, the allocated host ports and, for
+    VMs started from a golden image, the disk overlay.
+
+    Attributes:
+        name: The name of the instance.
+    """
+
+    name: str
+
+    def __post_init__(self) -> None:
+        """Validates the name, which is used as a directory name.
+
+        Raises:
+            ValueError: If the name is not valid.
+        """
+        if not _NAME_PATTERN.match(self.name):
+            raise ValueError(f"Invalid VM name '{self.name}' (up to 32 letters, digits, '.', '_', '-')")
+
+    @property
+    def state_dir(self) -> Path:
+        """Returns the state directory of the instance.
+
+        Returns:
+            The state directory.
+        """
+        return VMS_DIR / self.name
+
+    @property
+    def pid_file(self) -> Path:
+        """Returns the PID file QEMU writes when the instance is started.
+
+        Returns:
+            The PID file.
+        """
+        return self.state_dir / "qemu.pid"
+
+    @property
+    def qmp_socket(self) -> Path:
+        """Returns the QMP socket of the instance.
+
+        Returns:
+            The QMP socket.
+        """
+        return self.state_dir / "qmp.sock"
+
+    @property
+    def serial_log(self) -> Path:
+        """Returns the file the serial console of the instance is written to.
+
+        Returns:
+            The serial console log.
+        """
+        return self.state_dir / "serial.log"
+
+    @property
+    def overlay_file(self) -> Path:
+        """Returns the default disk overlay of the instance.
+
+        Returns:
+            The disk overlay.
+        """
+        return self.state_dir / "disk.qcow2"
+
+    @property
+    def state(self) -> dict[str, Any]:
+        """Returns the state the instance has been started with.
+
+        Returns:
+            The state, for example the SSH port and the disk file, or an empty dict if the instance was never started.
+        """
+        try:
+            return json.loads((self.state_dir / _STATE_FILE_NAME).read_text())
+        except (OSError, ValueError):
+            return {}
+
+    @property
+    def ssh_port(self) -> int:
+        """Returns the host port that is forwarded to the SSH port of the instance.
+
+        Returns:
+            The SSH port.
+
+        Raises:
+            RuntimeError: If the instance was never started.
+        """
+        if "ssh_port" not in self.state:
+            raise RuntimeError(f"VM '{self.name}' has never been started")
+        return int(self.state["ssh_port"])
+
+    def save_state(self, **state: Any) -> None:
+        """Saves the state the instance is started with.
+
+        Args:
+            state: The state values, for example the SSH port and the disk file.
+        """
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        (self.state_dir / _STATE_FILE_NAME).write_text(json.dumps(state, indent=2, default=str))
+
+    def get_pid(self) -> int | None:
+        """Returns the PID of the running instance and removes the PID file of an instance that is no longer running.
+
+        Returns:
+            The PID or None if the instance is not running.
+        """
+        try:
+            pid = int(self.pid_file.read_text().strip())
+        except (OSError, ValueError):
+            return None
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            _logger.warning(f"VM '{self.name}' with PID {pid} is no longer running. Removing stale PID file.")
+            self.pid_file.unlink(missing_ok=True)
+            return None
+        except PermissionError:
+            pass  # The process exists but belongs to another user
+        return pid
+
+    def is_running(self) -> bool:
+        """Returns whether the instance is running.
+
+        Returns:
+            Whether the instance is running.
+        """
+        return self.get_pid() is not None
+
+
+def list_instances() -> list[VMInstance]:
+    """Returns all instances that have a state directory.
+
+    Returns:
+        The instances, sorted by name.
+    """
+    if not VMS_DIR.is_dir():
+        return []
+    return [VMInstance(path.name) for path in sorted(VMS_DIR.iterdir()) if _NAME_PATTERN.match(path.name)]
+
+
+def get_port_allocation_lock() -> FileLock:
+    """Returns the lock that serializes port allocation and VM start, so concurrent starts never pick the same port.
+
+    Returns:
+        The lock, which is not acquired yet.
+    """
+    return FileLock(VMS_DIR / ".ports.lock")
+
+
+def allocate_free_port() -> int:
+    """Returns a free TCP port on the loopback interface.
+
+    The port is only guaranteed to be free at the time of the call. Hold the port allocation lock until QEMU has bound
+    the port, and skip ports allocated to other instances that are not bound right now.
+
+    Returns:
+        The port.
+    """
+    used_ports = {instance.state.get("ssh_port") for instance in list_instances() if instance.is_running()}
+    while True:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        if port not in used_ports:
+            return port
@@ -0,0 +1,198 @@
+"""Contains the performance profiles of the QEMU VMs."""
+
+import os
+from dataclasses import dataclass
+from enum import Enum
+from logging import getLogger
+from pathlib import Path
+
+from voraus_debian_iso.methods.accelerator import detect_accelerator
+
+_logger = getLogger(__name__)
+
+_HUGEPAGES_DIR = Path("/dev/hugepages")
+_SNAPSHOT_NAME_PREFIX = "voraus-booted"
+
+
+class VMProfile(str, Enum):
+    """The performance profiles of the QEMU VMs."""
+
+    DEFAULT = "default"
+    FAST_INSTALL = "fast-install"
+    REALISTIC = "realistic"
+
+
+@dataclass(frozen=True)
+class ProfileSettings:
+    """The QEMU settings of a profile.
+
+    Attributes:
+        max_cpus: The maximum number of vCPUs. The VM gets as many vCPUs as the host has cores, up to this number.
+        memory: The memory size, in QEMU notation.
+        disk_interface: The interface of the disk, ``ide`` for an emulated disk or ``virtio`` for a paravirtual one.
+        disk_cache: The host cache mode of the disk while the VM runs.
+        install_disk_cache: The host cache mode of the disk during the installation. The installation is repeated if
+            the host crashes, so it can skip flushing to the host disk.
+        disk_aio: The asynchronous I/O backend of the disk.
+        discard: Whether trimmed blocks are released in the disk file.
+        nic_model: The model of the network card.
+    """
+
+    max_cpus: int
+    memory: str
+    disk_interface: str
+    disk_cache: str
+    install_disk_cache: str
+    disk_aio: str
+    discard: bool
+    nic_model: str
+
+
+PROFILES = {
+    # The emulated hardware the VMs had before profiles existed
+    VMProfile.DEFAULT: ProfileSettings(
+        max_cpus=1,
+        memory="2G",
+        disk_interface="ide",
+        disk_cache="writeback",
+        install_disk_cache="writeback",
+        disk_aio="threads",
+        discard=False,
+        nic_model="e1000",
+    ),
+    VMProfile.FAST_INSTALL: ProfileSettings(
+        max_cpus=8,
+        memory="2G",
+        disk_interface="virtio",
+        disk_cache="writeback",
+        install_disk_cache="unsafe",
+        disk_aio="io_uring",
+        discard=True,
+        nic_model="virtio-net-pci",
+    ),
+    # Paravirtual devices without the host page cache, which behaves like a real disk of a robot
+    VMProfile.REALISTIC: ProfileSettings(
+        max_cpus=4,
+        memory="2G",
+        disk_interface="virtio",
+        disk_cache="none",
+        install_disk_cache="none",
+        disk_aio="native",
+        discard=True,
+        nic_model="virtio-net-pci",
+    ),
+}
+
+
+def get_snapshot_name(profile: VMProfile) -> str:
+    """Returns the name of the booted VM snapshot of a profile.
+
+    A saved VM state can only be restored on the same virtual hardware, so every profile has its own snapshot.
+
+    Args:
+        profile: The profile.
+
+    Returns:
+        The snapshot name.
+    """
+    return f"{_SNAPSHOT_NAME_PREFIX}-{profile.value}"
+
+
+def get_cpu_count(profile: VMProfile) -> int:
+    """Returns the number of vCPUs of a profile on this host.
+
+    Args:
+        profile: The profile.
+
+    Returns:
+        The number of vCPUs.
+    """
+    return max(1, min(PROFILES[profile].max_cpus, len(os.sched_getaffinity(0))))
+
+
+def get_machine_args(profile: VMProfile, hugepages: bool = False, cpus: int | None = None) -> list[str]:
+    """Returns the QEMU arguments for the vCPUs and the memory of a profile.
+
+    Args:
+        profile: The profile.
+        hugepages: Whether to back the memory with preallocated huge pages from ``/dev/hugepages``.
+        cpus: The number of vCPUs to use instead of the one of the profile.
+
+    Returns:
+        The QEMU arguments.
+
+    Raises:
+        FileNotFoundError: If huge pages are requested but hugetlbfs is not mounted.
+    """
+    settings = PROFILES[profile]
+    args = ["-smp", str(cpus or get_cpu_count(profile)), "-m", settings.memory]
+    if hugepages:
+        if not _HUGEPAGES_DIR.is_dir():
+            raise FileNotFoundError(f"Huge pages require hugetlbfs to be mounted at {_HUGEPAGES_DIR}")
+        args += [
+            "-object",
+            f"memory-backend-file,id=ram,size={settings.memory},mem-path={_HUGEPAGES_DIR},prealloc=on,share=off",
+            "-machine",
+            "memory-backend=ram",
+        ]
+    return args
+
+
+def get_drive_args(
+    profile: VMProfile, disk_file: Path, install: bool = False, discard: bool | None = None
+) -> list[str]:
+    """Returns the QEMU arguments for the qcow2 disk of a profile.
+
+    Args:
+        profile: The profile.
+        disk_file: The qcow2 disk file.
+        install: Whether the disk is used for the installation.
+        discard: Whether trimmed blocks are released in the disk file. Defaults to the setting of the profile.
+
+    Returns:
+        The QEMU arguments.
+    """
+    settings = PROFILES[profile]
+    options = [
+        f"file={disk_file}",
+        "format=qcow2",
+        f"if={settings.disk_interface}",
+        f"cache={settings.install_disk_cache if install else settings.disk_cache}",
+        f"aio={settings.disk_aio}",
+    ]
+    if settings.discard if discard is None else discard:
+        options += ["discard=unmap", "detect-zeroes=unmap"]
+    return ["-drive", ",".join(options)]
+
+
+def get_nic_args(profile: VMProfile, netdev_options: str) -> list[str]:
+    """Returns the QEMU arguments for the user network card of a profile.
+
+    Args:
+        profile: The profile.
+        netdev_options: Additional options of the user network backend, for example port forwardings.
+
+    Returns:
+        The QEMU arguments.
+    """
+    netdev = ",".join(filter(None, ["user,id=eth0", netdev_options]))
+    return ["-device", f"{PROFILES[profile].nic_model},netdev=eth0", "-netdev", netdev]
+
+
+def get_qemu_common_args(profile: VMProfile = VMProfile.DEFAULT, hugepages: bool = False) -> list[str]:
+    """Get the common QEMU arguments.
+
+    Args:
+        profile: The performance profile of the VM.
+        hugepages: Whether to back the VM memory with huge pages.
+
+    Returns:
+        The common QEMU arguments with the fastest accelerator of the host.
+    """
+    qemu_binary = "qemu-system-x86_64"
+    accelerator = detect_accelerator(qemu_binary)
+    return (
+        [qemu_binary]
+        + list(accelerator.args)
+        + get_machine_args(profile=profile, hugepages=hugepages, cpus=accelerator.cpus)
+    )
@@ -0,0 +1,77 @@
+"""Contains the graceful shutdown of running QEMU VMs via QMP."""
+
+import asyncio
+import os
+import signal
+import time
+from logging import getLogger
+
+from voraus_debian_iso.methods.qmp import QMPClient, QMPError
+from voraus_debian_iso.methods.vm_instances import VMInstance
+
+_logger = getLogger(__name__)
+
+_QUIT_TIMEOUT = 5.0
+
+
+def stop_instances(instances: list[VMInstance], timeout: float) -> list[BaseException | None]:
+    """Stops several VMs concurrently.
+
+    Args:
+        instances: The running VMs.
+        timeout: The time in seconds each guest gets to power down.
+
+    Returns:
+        The error each VM failed to stop with, or None if it stopped.
+    """
+    return asyncio.run(_stop_all(instances, timeout=timeout))
+
+
+async def _stop_all(instances: list[VMInstance], timeout: float) -> list[BaseException | None]:
+    return await asyncio.gather(
+        *(stop_instance(instance, timeout=timeout) for instance in instances), return_exceptions=True
+    )
+
+
+async def stop_instance(instance: VMInstance, timeout: float) -> None:
+    """Stops a VM gracefully, escalating from an ACPI power down to 'quit' and finally to SIGKILL.
+
+    Args:
+        instance: The VM to stop.
+        timeout: The time in seconds the guest gets to power down.
+    """
+    pid = instance.get_pid()
+    if pid is None:
+        return
+    start_time = time.monotonic()
+    try:
+        async with QMPClient(instance.qmp_socket) as client:
+            _logger.info(f"Powering down QEMU VM '{instance.name}' with PID {pid}.")
+            await client.execute("system_powerdown")
+            if not await _wait_for_exit(pid, timeout=timeout):
+                _logger.warning(
+                    f"QEMU VM '{instance.name}' did not power down within {timeout} seconds. Quitting QEMU."
+                )
+                await client.execute("quit")
+    except (OSError, QMPError) as error:
+        # The QMP socket is gone or QEMU closed it while quitting
+        _logger.debug(f"QMP connection to QEMU VM '{instance.name}' failed: {error}")
+
+    if not await _wait_for_exit(pid, timeout=_QUIT_TIMEOUT):
+        _logger.warning(f"QEMU VM '{instance.name}' did not quit. Killing PID {pid}.")
+        os.kill(pid, signal.SIGKILL)
+        await _wait_for_exit(pid, timeout=_QUIT_TIMEOUT)
+    instance.pid_file.unlink(missing_ok=True)
+    instance.qmp_socket.unlink(missing_ok=True)
+    _logger.info(f"QEMU VM '{instance.name}' stopped after {time.monotonic() - start_time:.2f} seconds.")
+
+
+async def _wait_for_exit(pid: int, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        await asyncio.sleep(0.1)
+    return False
@@ -11,12 +11,19 @@ import pytest
 from fabric import Connection
 from typer.testing import CliRunner
 
-from voraus_debian_iso.cli.main import app
-from voraus_debian_iso.constants import DEFAULT_QEMU_DISK_FILE
-from voraus_debian_iso.methods.cli.cli_start_methods import get_ssh_connection
+from tests.utils.golden_image import use_golden_image
+from tests.utils.ssh_pool import SSHConnectionPool
+from voraus_debian_iso.constants import CACHE_DIR, DEFAULT_ARCHITECTURE, DEFAULT_DEBIAN_VERSION
+from voraus_debian_iso.methods.cli.cli_build_methods import build_impl
+from voraus_debian_iso.methods.cli.cli_reset_methods import reset_impl
+from voraus_debian_iso.methods.cli.cli_start_methods import start_impl
+from voraus_debian_iso.methods.cli.cli_stop_methods import stop_impl
+from voraus_debian_iso.methods.remote_facts import RemoteFacts
 
 _logger = logging.getLogger(__file__)
 
+_GOLDEN_IMAGE_FILE = CACHE_DIR / "integration_golden.img"
+
 
 @pytest.fixture(scope="session", name="resource_dir")
 def resource_dir_fixture() -> Path:
@@ -38,25 +45,62 @@ def cli_runner_fixture() -> CliRunner:
     return CliRunner(env={"COLUMNS": "120"})
 
 
-@pytest.fixture(scope="session", name="dut")
-def device_under_test_fixture(cli_runner: CliRunner) -> Generator[Connection, None, None]:
+@pytest.fixture(scope="session", name="golden_image")
+def golden_image_fixture() -> Generator[Path, None, None]:
+    """Returns the golden image of the current ISO, which is shared by all workers and only installed if outdated.
+
+    Yields:
+        The golden image.
+    """
     images_path = Path(__file__).parent.parent / "output"
-    cli_runner.invoke(app, ["build", "--output-directory", str(images_path)])
-    iso_files = list(images_path.glob("*.iso"))
-    match len(iso_files):
-        case 0:
-            raise RuntimeError(f"No ISO file found in {images_path}")
-        case 1:
-            iso_path = images_path / iso_files[0]
-        case _:
-            iso_path = max(iso_files, key=os.path.getctime)
-            _logger.warning(f"Multiple ISO files found in {images_path}: {iso_files}. Using latest ISO file {iso_path}")
+    with use_golden_image(
+        build_iso=lambda: build_impl(
+            debian_version=DEFAULT_DEBIAN_VERSION, architecture=DEFAULT_ARCHITECTURE, output_directory=images_path
+        ),
+        golden_file=_GOLDEN_IMAGE_FILE,
+    ) as golden_file:
+        yield golden_file
+
+
+@pytest.fixture(scope="session", name="vm")
+def vm_fixture(golden_image: Path) -> Generator[str, None, None]:
+    """Starts a VM on a fresh thin overlay of the golden image, one per pytest-xdist worker.
+
+    Yields:
+        The name of the VM.
+    """
+    name = f"pytest-{os.environ.get('PYTEST_XDIST_WORKER', 'main')}"
+    stop_impl(name=name)  # Left over by an aborted session
+    reset_impl(base_file=golden_image, name=name)
+    start_impl(name=name, base_file=golden_image)
+
+    yield name
 
-    if not DEFAULT_QEMU_DISK_FILE.is_file():
-        cli_runner.invoke(app, ["install", "--iso-file", str(iso_path), "--disk-file", str(DEFAULT_QEMU_DISK_FILE)])
+    stop_impl(name=name)
 
-    cli_runner.invoke(app, ["start", "--disk-file", str(DEFAULT_QEMU_DISK_FILE)])
 
-    yield from get_ssh_connection()
+@pytest.fixture(scope="session", name="ssh_pool")
+def ssh_pool_fixture(vm: str) -> Generator[SSHConnectionPool, None, None]:
+    """Returns the pool of SSH connections to the VM of this worker, one per user.
 
-    cli_runner.invoke(app, ["stop"])
+    Yields:
+        The connection pool, which is closed before the VM is stopped.
+    """
+    pool = SSHConnectionPool(vm_name=vm)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture(scope="session", name="dut")
+def device_under_test_fixture(ssh_pool: SSHConnectionPool) -> Connection:
+    return ssh_pool.get("localuser")
+
+
+@pytest.fixture(scope="session", name="dut_facts")
+def device_under_test_facts_fixture(dut: Connection) -> RemoteFacts:
+    """Returns the facts of the device under test, which are cached for the whole session.
+
+    Returns:
+        The facts.
+    """
+    return RemoteFacts(dut)
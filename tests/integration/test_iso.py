@@ -4,65 +4,88 @@ import sys
 from pathlib import Path
 
 import pytest
-from fabric import Connection
 
-from voraus_debian_iso.methods.cli.cli_start_methods import get_ssh_connection
+from tests.utils.ssh_pool import SSHConnectionPool
+from voraus_debian_iso.methods.remote_facts import Fact, RemoteFacts
 
+# All facts are collected in a single SSH round trip, so new checks should add their commands here.
+_FACTS = {
+    "debian_version": "cat /etc/debian_version",
+    "kernel_release": "uname -r",
+    "python_version": "python3 --version",
+    "timezone": "timedatectl show --property=Timezone --value",
+    "networking_state": "systemctl is-active networking",
+    "interfaces": "cat /etc/network/interfaces",
+    # Virtual devices (like the loopback device) are excluded because they do not provide a device symlink in sysfs.
+    "physical_nics": "find /sys/class/net -mindepth 1 -maxdepth 1 -exec test -e {}/device ';' -print",
+}
 
-def get_physical_nics(dut: Connection) -> list[str]:
-    """Returns the names of all physical NICs of the DUT.
 
-    Virtual devices (like the loopback device) are excluded because they do not provide a device symlink in sysfs.
+@pytest.fixture(scope="module", name="facts")
+def facts_fixture(dut_facts: RemoteFacts) -> dict[str, Fact]:
+    """Returns the facts the ISO tests check.
+
+    Returns:
+        The facts, by fact name.
+    """
+    return dut_facts.collect(_FACTS)
+
+
+def get_physical_nics(facts: dict[str, Fact]) -> list[str]:
+    """Returns the names of all physical NICs of the DUT.
 
     Args:
-        dut: The connection to the device under test.
+        facts: The facts of the device under test.
 
     Returns:
         The NIC names, for example ["enp0s3"].
     """
-    result = dut.run("find /sys/class/net -mindepth 1 -maxdepth 1 -exec test -e {}/device ';' -print")
-    return [Path(path).name for path in result.stdout.split()]
+    return [Path(path).name for path in facts["physical_nics"].stdout.split()]
 
 
 @pytest.mark.skipif(sys.platform != "linux", reason="Only supported on linux because it requires qemu")
 class TestISO:
     """Contains all ISO tests."""
 
-    def test_debian_version(self, dut: Connection) -> None:
-        assert dut.run("cat /etc/debian_version").stdout.strip() == "13.6"
+    def test_debian_version(self, facts: dict[str, Fact]) -> None:
+        assert facts["debian_version"].stdout.strip() == "13.6"
 
-    def test_debian_kernel(self, dut: Connection) -> None:
-        assert dut.run("uname -r").stdout.strip() == "6.12.94+deb13-amd64"
+    def test_debian_kernel(self, facts: dict[str, Fact]) -> None:
+        assert facts["kernel_release"].stdout.strip() == "6.12.94+deb13-amd64"
 
-    def test_python_version(self, dut: Connection) -> None:
-        assert dut.run("python3 --version").stdout.strip() == "Python 3.13.5"
+    def test_python_version(self, facts: dict[str, Fact]) -> None:
+        assert facts["python_version"].stdout.strip() == "Python 3.13.5"
 
-    def test_root_ssh_access(self, dut: Connection) -> None:  # pylint: disable=unused-argument
-        root_ssh_connection = next(get_ssh_connection(username="root"))
-        assert root_ssh_connection.run("whoami").stdout.strip() == "root"
+    def test_root_ssh_access(self, ssh_pool: SSHConnectionPool) -> None:
+        assert ssh_pool.get("root").run("whoami").stdout.strip() == "root"
 
-    def test_timezone(self, dut: Connection) -> None:
-        assert dut.run("timedatectl show --property=Timezone --value").stdout.strip() == "Europe/Berlin"
+    def test_timezone(self, facts: dict[str, Fact]) -> None:
+        assert facts["timezone"].stdout.strip() == "Europe/Berlin"
 
-    def test_sudo_available(self, dut: Connection) -> None:  # pylint: disable=unused-argument
-        root_ssh_connection = next(get_ssh_connection(username="root"))
-        assert root_ssh_connection.run("sudo --validate").ok
+    def test_sudo_available(self, ssh_pool: SSHConnectionPool) -> None:
+        assert ssh_pool.get("root").run("sudo --validate").ok
 
-    def test_networking_service_active(self, dut: Connection) -> None:
+    def test_networking_service_active(self, facts: dict[str, Fact]) -> None:
         # A duplicate interface stanza (for example because the interface used during the installation is configured
         # in /etc/network/interfaces as well as in /etc/network/interfaces.d) makes ifupdown fail.
-        assert dut.run("systemctl is-active networking", warn=True).stdout.strip() == "active"
+        assert facts["networking_state"].stdout.strip() == "active"
 
-    def test_interfaces_file_only_configures_loopback(self, dut: Connection) -> None:
-        interfaces = dut.run("cat /etc/network/interfaces").stdout
-        stanzas = [line for line in interfaces.splitlines() if line.startswith("iface")]
+    def test_interfaces_file_only_configures_loopback(self, facts: dict[str, Fact]) -> None:
+        stanzas = [line for line in facts["interfaces"].stdout.splitlines() if line.startswith("iface")]
         assert stanzas == ["iface lo inet loopback"]
 
-    def test_all_nics_configured_for_dhcp(self, dut: Connection) -> None:
-        nics = get_physical_nics(dut)
+    def test_all_nics_configured_for_dhcp(self, facts: dict[str, Fact], dut_facts: RemoteFacts) -> None:
+        nics = get_physical_nics(facts)
         assert nics, "The device under test does not provide any physical NIC"
+        # One round trip for all NICs
+        nic_facts = dut_facts.collect(
+            {
+                **{f"interfaces_{nic}": f"cat /etc/network/interfaces.d/{nic}" for nic in nics},
+                **{f"address_{nic}": f"ip -4 address show {nic}" for nic in nics},
+            }
+        )
         for nic in nics:
-            stanza = dut.run(f"cat /etc/network/interfaces.d/{nic}").stdout
+            stanza = nic_facts[f"interfaces_{nic}"].stdout
             assert f"allow-hotplug {nic}" in stanza
             assert f"iface {nic} inet dhcp" in stanza
-            assert "inet " in dut.run(f"ip -4 address show {nic}").stdout
+            assert "inet " in nic_facts[f"address_{nic}"].stdout
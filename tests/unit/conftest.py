@@ -0,0 +1,20 @@
+"""This module contains pytest fixtures of the unit tests."""
+
+from pathlib import Path
+
+import pytest
+from pytest import MonkeyPatch
+
+from voraus_debian_iso.methods import vm_instances
+
+
+@pytest.fixture(name="vms_dir")
+def vms_dir_fixture(monkeypatch: MonkeyPatch, tmp_path: Path) -> Path:
+    """Keeps the state of the VMs of a test in a temporary directory instead of the cache directory.
+
+    Returns:
+        The temporary directory of the VMs.
+    """
+    vms_dir = tmp_path / "vms"
+    monkeypatch.setattr(vm_instances, "VMS_DIR", vms_dir)
+    return vms_dir
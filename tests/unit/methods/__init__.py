@@ -0,0 +1 @@
+"""Contains unit tests for the methods sub-package."""
@@ -0,0 +1,77 @@
+"""Contains tests for the CLI build-fleet methods."""
+
+import json
+from pathlib import Path
+
+import pytest
+from pytest import MonkeyPatch
+
+from voraus_debian_iso.methods.cli import cli_build_fleet_methods
+from voraus_debian_iso.methods.cli.cli_build_fleet_methods import build_fleet_impl, load_inventory, render_template
+
+
+def test_load_inventory_reads_csv_and_json(tmp_path: Path) -> None:
+    csv_file = tmp_path / "inventory.csv"
+    csv_file.write_text("name,hostname\nrobot-01,ipc-01\nrobot-02,ipc-02\n")
+    json_file = tmp_path / "inventory.json"
+    json_file.write_text(json.dumps([{"name": "robot-01", "hostname": "ipc-01"}, {"name": "robot-02", "port": 22}]))
+    assert load_inventory(csv_file) == [
+        {"name": "robot-01", "hostname": "ipc-01"},
+        {"name": "robot-02", "hostname": "ipc-02"},
+    ]
+    assert load_inventory(json_file)[1] == {"name": "robot-02", "port": "22"}
+
+
+@pytest.mark.parametrize(
+    ("content", "message"),
+    [
+        ("name\nrobot/01\n", "Unit 0 .* has no valid name"),
+        ("name\nrobot-01\nrobot-01\n", "'robot-01' is used more than once"),
+    ],
+)
+def test_load_inventory_rejects_invalid_names(tmp_path: Path, content: str, message: str) -> None:
+    inventory_file = tmp_path / "inventory.csv"
+    inventory_file.write_text(content)
+    with pytest.raises(ValueError, match=message):
+        load_inventory(inventory_file)
+
+
+def test_render_template_rejects_missing_values() -> None:
+    with pytest.raises(ValueError, match="No value for placeholders domain, hostname of unit 'robot-01'"):
+        render_template("{{ hostname }}.{{domain}}", {"name": "robot-01"})
+
+
+def test_build_fleet_impl_only_changes_preseed_per_unit(monkeypatch: MonkeyPatch, tmp_path: Path) -> None:
+    base_iso = tmp_path / "voraus-debian.iso"
+    overlays: dict[Path, dict[str, str]] = {}
+
+    def _fake_patch_iso_in_place(iso_path: Path, overlay_dir: Path, output_file_path: Path, **_: str) -> None:
+        assert iso_path == base_iso
+        overlays[output_file_path] = {
+            str(path.relative_to(overlay_dir)): path.read_text() for path in overlay_dir.rglob("*") if path.is_file()
+        }
+
+    monkeypatch.setattr(cli_build_fleet_methods, "WORKSPACES_DIR", tmp_path / "workspaces")
+    monkeypatch.setattr(cli_build_fleet_methods, "build_impl", lambda **_: base_iso)
+    monkeypatch.setattr(cli_build_fleet_methods, "patch_iso_in_place", _fake_patch_iso_in_place)
+    inventory_file = tmp_path / "inventory.csv"
+    inventory_file.write_text("name,hostname\nrobot-01,ipc-01\nrobot-02,ipc-02\n")
+    template_file = tmp_path / "preseed.cfg"
+    template_file.write_text("d-i netcfg/hostname string {{ hostname }}\n")
+
+    output_files = build_fleet_impl(
+        inventory_file=inventory_file,
+        template_file=template_file,
+        debian_version="13.6.0",
+        architecture="amd64",
+        output_directory=tmp_path,
+    )
+
+    assert output_files == [tmp_path / "voraus-debian-robot-01.iso", tmp_path / "voraus-debian-robot-02.iso"]
+    first, second = (overlays[output_file] for output_file in output_files)
+    assert sorted(first) == ["boot/grub/grub.cfg", "isolinux/txt.cfg", "preseed.cfg"]
+    assert first["preseed.cfg"] == "d-i netcfg/hostname string ipc-01\n"
+    assert second["preseed.cfg"] == "d-i netcfg/hostname string ipc-02\n"
+    assert "preseed/file/checksum=" in first["boot/grub/grub.cfg"]
+    assert first["boot/grub/grub.cfg"] != second["boot/grub/grub.cfg"]
+    assert not list((tmp_path / "workspaces").iterdir())
@@ -0,0 +1,128 @@
+"""Contains tests for the CLI build methods."""
+
+import hashlib
+from pathlib import Path
+from typing import Callable
+
+import pytest
+from pytest import MonkeyPatch
+
+from voraus_debian_iso.constants import DATA_DIR
+from voraus_debian_iso.methods.cli import cli_build_methods
+from voraus_debian_iso.methods.cli.cli_build_methods import (
+    BuildMode,
+    build_impl,
+    build_matrix_impl,
+    patch_iso_in_place,
+    render_preseed,
+)
+
+
+def _fake_build_impl(debian_version: str, architecture: str, output_directory: Path, **_: object) -> Path:
+    if debian_version == "broken":
+        raise RuntimeError("download failed")
+    return output_directory / f"{debian_version}-{architecture}.iso"
+
+
+def test_build_matrix_impl_pairs_versions_with_single_architecture(monkeypatch: MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setattr(cli_build_methods, "build_impl", _fake_build_impl)
+    output_files = build_matrix_impl(
+        debian_versions=["13.5.0", "13.6.0", "13.6.0"], architectures=["amd64"], output_directory=tmp_path, jobs=2
+    )
+    assert sorted(output_files) == [tmp_path / "13.5.0-amd64.iso", tmp_path / "13.6.0-amd64.iso"]
+
+
+def test_build_matrix_impl_reports_failed_builds(monkeypatch: MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setattr(cli_build_methods, "build_impl", _fake_build_impl)
+    with pytest.raises(RuntimeError, match="Failed to build broken/arm64"):
+        build_matrix_impl(
+            debian_versions=["13.6.0", "broken"], architectures=["amd64", "arm64"], output_directory=tmp_path
+        )
+
+
+def test_build_matrix_impl_rejects_unpaired_architectures(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="Got 3 debian versions but 2 architectures"):
+        build_matrix_impl(
+            debian_versions=["13.4.0", "13.5.0", "13.6.0"], architectures=["amd64", "arm64"], output_directory=tmp_path
+        )
+
+
+def test_patch_iso_in_place_maps_overlay_and_replays_boot_records(monkeypatch: MonkeyPatch, tmp_path: Path) -> None:
+    commands: list[list[str]] = []
+    monkeypatch.setattr(cli_build_methods, "execute_command", commands.append)
+    output_file_path = tmp_path / "output" / "image.iso"
+    output_file_path.parent.mkdir()
+    output_file_path.write_bytes(b"stale")
+
+    patch_iso_in_place(
+        debian_version="13.6.0",
+        architecture="amd64",
+        iso_path=tmp_path / "upstream.iso",
+        overlay_dir=tmp_path / "overlay",
+        output_file_path=output_file_path,
+    )
+
+    assert not output_file_path.exists()
+    assert len(commands) == 1
+    command = " ".join(commands[0])
+    assert command.startswith(f"xorriso -indev {tmp_path / 'upstream.iso'} -outdev {output_file_path} ")
+    assert "-boot_image any replay" in command
+    assert "-volid Debian 13.6.0 amd64" in command
+    assert command.endswith(f"-map {tmp_path / 'overlay'} /")
+
+
+@pytest.mark.parametrize(
+    ("mode", "expected_calls"),
+    [
+        (BuildMode.IN_PLACE, ["render", "patch_in_place"]),
+        (BuildMode.EXTRACT, ["render", "extract", "repack"]),
+    ],
+)
+def test_build_impl_produces_iso_according_to_mode(
+    monkeypatch: MonkeyPatch, tmp_path: Path, mode: BuildMode, expected_calls: list[str]
+) -> None:
+    calls: list[str] = []
+
+    def _fake_producer(name: str) -> Callable[..., None]:
+        def _write_iso(output_file_path: Path, **_: object) -> None:
+            calls.append(name)
+            output_file_path.parent.mkdir(parents=True, exist_ok=True)
+            output_file_path.write_bytes(b"iso")
+
+        return _write_iso
+
+    upstream_iso = tmp_path / "upstream.iso"
+    upstream_iso.write_bytes(b"upstream")
+    monkeypatch.setattr(cli_build_methods, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(cli_build_methods, "WORKSPACES_DIR", tmp_path / "workspaces")
+    monkeypatch.setattr(cli_build_methods, "get_version", lambda: "1.0.0")
+    monkeypatch.setattr(cli_build_methods, "_download_iso", lambda **_: upstream_iso)
+    monkeypatch.setattr(cli_build_methods, "_render_overlay", lambda **_: calls.append("render"))
+    monkeypatch.setattr(cli_build_methods, "_extract_iso", lambda **_: calls.append("extract"))
+    monkeypatch.setattr(cli_build_methods, "_patch_extracted_iso", lambda **_: None)
+    monkeypatch.setattr(cli_build_methods, "patch_iso_in_place", _fake_producer("patch_in_place"))
+    monkeypatch.setattr(cli_build_methods, "_repack_iso", _fake_producer("repack"))
+
+    output_file = build_impl(
+        debian_version="13.6.0",
+        architecture="amd64",
+        output_directory=tmp_path / "output",
+        mode=mode,
+        cache_dir=tmp_path / "build-cache",
+    )
+
+    assert calls == expected_calls
+    assert output_file.read_bytes() == b"iso"
+
+
+@pytest.mark.parametrize("offline_pool", [True, False])
+def test_render_preseed_uses_cdrom_instead_of_mirror_for_offline_pool(tmp_path: Path, offline_pool: bool) -> None:
+    render_preseed(overlay_dir=tmp_path, preseed_file=DATA_DIR / "preseed" / "preseed.cfg", offline_pool=offline_pool)
+
+    preseed = (tmp_path / "preseed.cfg").read_text()
+    active_lines = [line for line in preseed.splitlines() if line.startswith("d-i apt-setup/")]
+    assert ("d-i apt-setup/use_mirror boolean false" in active_lines) is offline_pool
+    assert ("d-i apt-setup/cdrom/set-first boolean true" in active_lines) is offline_pool
+    assert ("d-i apt-setup/use_mirror boolean true" in active_lines) is not offline_pool
+    checksum = hashlib.md5(preseed.encode()).hexdigest()
+    assert f"preseed/file/checksum={checksum}" in (tmp_path / "boot" / "grub" / "grub.cfg").read_text()
@@ -0,0 +1,33 @@
+"""Contains tests for the CLI export methods."""
+
+import shutil
+from pathlib import Path
+
+import pytest
+from pytest import MonkeyPatch
+
+from voraus_debian_iso.methods.cli import cli_export_methods
+from voraus_debian_iso.methods.cli.cli_export_methods import export_impl
+from voraus_debian_iso.methods.raw_images import BlockMap, get_block_map_file
+
+
+@pytest.mark.parametrize("trim", [True, False])
+def test_export_impl_trims_the_disk_before_converting(tmp_path: Path, monkeypatch: MonkeyPatch, trim: bool) -> None:
+    if shutil.which("zstd") is None:
+        pytest.skip("zstd is not installed")
+    calls: list[str] = []
+
+    def _convert(command: list[str]) -> str:
+        calls.append("convert")
+        Path(command[-1]).write_bytes(b"raw disk")
+        return ""
+
+    monkeypatch.setattr(cli_export_methods, "trim_guest", lambda **_: calls.append("trim"))
+    monkeypatch.setattr(cli_export_methods, "execute_command", _convert)
+    disk_file = tmp_path / "qemu_disk.img"
+    disk_file.write_bytes(b"qcow2")
+
+    output_file = export_impl(disk_file=disk_file, output_file=tmp_path / "disk.img.zst", trim=trim)
+
+    assert calls == (["trim", "convert"] if trim else ["convert"])
+    assert BlockMap.load(get_block_map_file(output_file)).image_size == len(b"raw disk")
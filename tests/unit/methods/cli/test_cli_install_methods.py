@@ -0,0 +1,97 @@
+"""Contains tests for the CLI install methods."""
+
+import shutil
+from pathlib import Path
+from typing import cast
+
+import pexpect
+import pytest
+from pytest import MonkeyPatch
+
+from voraus_debian_iso.constants import DATA_DIR
+from voraus_debian_iso.methods.cli import cli_install_methods
+from voraus_debian_iso.methods.cli.cli_build_methods import get_kernel_params, render_preseed
+from voraus_debian_iso.methods.cli.cli_install_methods import (
+    _follow_installer,
+    extract_installer_boot_files,
+    install_impl,
+)
+from voraus_debian_iso.methods.install_monitor import InstallMonitor
+from voraus_debian_iso.methods.shell import execute_command
+from voraus_debian_iso.methods.timing import PhaseRecorder
+
+
+@pytest.mark.skipif(shutil.which("bsdtar") is None, reason="Requires bsdtar")
+def test_extract_installer_boot_files_uses_kernel_params_of_iso(tmp_path: Path) -> None:
+    iso_root = tmp_path / "iso"
+    (iso_root / "install.amd").mkdir(parents=True)
+    (iso_root / "install.amd" / "vmlinuz").write_bytes(b"kernel")
+    (iso_root / "install.amd" / "initrd.gz").write_bytes(b"initrd")
+    render_preseed(overlay_dir=iso_root, preseed_file=DATA_DIR / "preseed" / "preseed.cfg")
+    iso_file = tmp_path / "debian.iso"
+    execute_command(["bsdtar", "-C", str(iso_root), "--format", "iso9660", "-cf", str(iso_file), "."])
+
+    kernel, initrd, kernel_params = extract_installer_boot_files(iso_file=iso_file, target_dir=tmp_path / "boot")
+
+    assert kernel.read_bytes() == b"kernel"
+    assert initrd.read_bytes() == b"initrd"
+    expected_params = get_kernel_params(preseed_file=DATA_DIR / "preseed" / "preseed.cfg")
+    assert kernel_params == f"{expected_params} console=ttyS0,115200n8 --- quiet"
+
+
+class _FinishingInstaller:
+    """Fake installer process that boots, partitions and powers down."""
+
+    def __init__(self) -> None:
+        self.output = ["Linux version 6.12\n", "Partitioning disks\n", "reboot: Power down\n"]
+
+    def read_nonblocking(self, size: int, timeout: float) -> str:  # pylint: disable=unused-argument
+        if not self.output:
+            raise pexpect.EOF("done")
+        return self.output.pop(0)
+
+
+class _LoopingInstaller:
+    """Fake installer process that prints the same retry message forever."""
+
+    def __init__(self) -> None:
+        self.reads = 0
+
+    def read_nonblocking(self, size: int, timeout: float) -> str:  # pylint: disable=unused-argument
+        self.reads += 1
+        return "Retrying to fetch the package list...\n"
+
+
+def test_follow_installer_detects_stall_of_printing_stage() -> None:
+    installer = _LoopingInstaller()
+    monitor = InstallMonitor(clock=lambda: installer.reads * 60.0)
+    with pytest.raises(RuntimeError, match="stage 'boot' stalled"):
+        _follow_installer(install_process=cast(pexpect.spawn, installer), monitor=monitor)
+    assert monitor.result.startswith("failed")
+
+
+def test_follow_installer_records_stage_durations() -> None:
+    installer = _FinishingInstaller()
+    monitor = InstallMonitor(clock=lambda: 10.0 * (3 - len(installer.output)))
+    with PhaseRecorder().activate() as recorder:
+        _follow_installer(install_process=cast(pexpect.spawn, installer), monitor=monitor)
+    assert monitor.result == "success"
+    assert recorder.phases == {"install:boot": 20.0, "install:partitioning": 10.0, "install:reboot": 0.0}
+
+
+@pytest.mark.parametrize(("golden", "expected_name"), [(True, "golden.img"), (False, "disk.img")])
+def test_install_impl_defaults_to_disk_file_of_golden_flag(
+    monkeypatch: MonkeyPatch, tmp_path: Path, golden: bool, expected_name: str
+) -> None:
+    commands: list[list[str]] = []
+
+    def _fail_after_create(command: list[str]) -> str:
+        commands.append(command)
+        raise RuntimeError("qemu-img failed")
+
+    monkeypatch.setattr(cli_install_methods, "DEFAULT_GOLDEN_DISK_FILE", tmp_path / "golden.img")
+    monkeypatch.setattr(cli_install_methods, "DEFAULT_QEMU_DISK_FILE", tmp_path / "disk.img")
+    monkeypatch.setattr(cli_install_methods, "execute_command", _fail_after_create)
+    with pytest.raises(RuntimeError, match="qemu-img failed"):
+        install_impl(iso_file=tmp_path / "debian.iso", golden=golden)
+    assert commands == [["qemu-img", "create", "-f", "qcow2", str(tmp_path / expected_name), "5G"]]
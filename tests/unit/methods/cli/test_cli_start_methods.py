@@ -0,0 +1,10 @@
+"""Contains tests for the CLI start methods."""
+
+import pytest
+
+from voraus_debian_iso.methods.cli.cli_start_methods import start_impl
+
+
+def test_start_impl_requires_disk_of_named_vm() -> None:
+    with pytest.raises(ValueError, match="QEMU VM 'worker-1' requires a disk file or a golden image"):
+        start_impl(name="worker-1")
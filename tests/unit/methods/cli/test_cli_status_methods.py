@@ -0,0 +1,35 @@
+"""Contains tests for the CLI status methods."""
+
+import pytest
+
+from tests.utils.qmp_server import FakeQEMU
+from voraus_debian_iso.methods.cli.cli_status_methods import status_impl
+from voraus_debian_iso.methods.vm_instances import VMInstance
+
+
+@pytest.mark.usefixtures("vms_dir")
+def test_status_impl_queries_running_vms() -> None:
+    VMInstance("stopped").save_state(ssh_port=2222)
+    with FakeQEMU(VMInstance("worker-1")):
+        statuses = status_impl()
+
+    assert [(vm_status.name, vm_status.status) for vm_status in statuses] == [
+        ("stopped", "stopped"),
+        ("worker-1", "running"),
+    ]
+    assert statuses[1].cpus[0]["thread-id"] == 4242
+    assert list(statuses[1].block_stats) == ["ide0-hd0"]
+
+
+@pytest.mark.usefixtures("vms_dir")
+def test_status_impl_prints_stopped_vms_without_querying_them(capsys: pytest.CaptureFixture) -> None:
+    VMInstance("worker-1").save_state(ssh_port=2222)
+    VMInstance("worker-10").save_state(ssh_port=2223)
+    statuses = status_impl()
+
+    assert [vm_status.status for vm_status in statuses] == ["stopped", "stopped"]
+    assert capsys.readouterr().out.splitlines() == [
+        "Name       Status   vCPU threads  Device  Read  Written",
+        "worker-1   stopped",
+        "worker-10  stopped",
+    ]
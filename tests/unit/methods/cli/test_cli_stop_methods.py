@@ -0,0 +1,33 @@
+"""Contains tests for the CLI stop methods."""
+
+import pytest
+
+from tests.utils.qmp_server import FakeQEMU
+from voraus_debian_iso.methods.cli.cli_stop_methods import stop_impl
+from voraus_debian_iso.methods.vm_instances import VMInstance
+
+pytestmark = pytest.mark.usefixtures("vms_dir")
+
+
+def test_stop_impl_powers_down_guest() -> None:
+    instance = VMInstance("worker-1")
+    with FakeQEMU(instance) as qemu:
+        stop_impl(name="worker-1")
+        assert qemu.commands == ["qmp_capabilities", "system_powerdown"]
+    assert not instance.pid_file.exists()
+
+
+def test_stop_impl_quits_qemu_if_guest_ignores_power_down() -> None:
+    instance = VMInstance("worker-1")
+    with FakeQEMU(instance, powers_down=False) as qemu:
+        stop_impl(name="worker-1", timeout=0.3)
+        assert qemu.commands == ["qmp_capabilities", "system_powerdown", "quit"]
+    assert not instance.is_running()
+
+
+def test_stop_impl_stops_all_instances_concurrently() -> None:
+    instances = [VMInstance(f"worker-{index}") for index in range(3)]
+    VMInstance("stopped").save_state(ssh_port=2222)
+    with FakeQEMU(instances[0], powers_down=False), FakeQEMU(instances[1]), FakeQEMU(instances[2]):
+        stop_impl(all_instances=True, timeout=0.5)
+        assert not any(instance.is_running() for instance in instances)
@@ -0,0 +1,57 @@
+"""Contains tests for the accelerator detection."""
+
+import os
+from pathlib import Path
+from typing import Generator
+
+import pytest
+from pytest import MonkeyPatch
+
+from voraus_debian_iso.methods import accelerator
+from voraus_debian_iso.methods.accelerator import detect_accelerator
+
+
+@pytest.fixture(name="kvm_device", autouse=True)
+def kvm_device_fixture(monkeypatch: MonkeyPatch, tmp_path: Path) -> Generator[Path, None, None]:
+    kvm_device = tmp_path / "kvm"
+    monkeypatch.setattr(accelerator, "_KVM_DEVICE", kvm_device)
+    monkeypatch.delenv("VORAUS_DEBIAN_ISO_ACCELERATOR", raising=False)
+    monkeypatch.setattr(accelerator.os, "sched_getaffinity", lambda _: set(range(4)))
+    monkeypatch.setattr(accelerator, "execute_command", lambda _: "Accelerators supported in QEMU binary:\ntcg\nkvm\n")
+    detect_accelerator.cache_clear()
+    yield kvm_device
+    detect_accelerator.cache_clear()
+
+
+def test_detect_accelerator_uses_accessible_kvm(kvm_device: Path) -> None:
+    kvm_device.touch()
+    assert detect_accelerator().args == ("-accel", "kvm", "-cpu", "host")
+    assert detect_accelerator().cpus is None
+
+
+def test_detect_accelerator_falls_back_to_multi_threaded_tcg(kvm_device: Path) -> None:
+    chosen = detect_accelerator()
+    assert chosen.args == ("-accel", "tcg,thread=multi", "-cpu", "max")
+    assert chosen.cpus == 4
+    assert chosen.reason == f"{kvm_device} doesn't exist"
+
+
+@pytest.mark.skipif(os.geteuid() == 0, reason="root can access any device")
+def test_detect_accelerator_checks_kvm_access(kvm_device: Path) -> None:
+    kvm_device.touch(mode=0o000)
+    assert detect_accelerator().reason == f"{kvm_device} is not accessible, add the user to its group"
+
+
+def test_detect_accelerator_checks_qemu_support(monkeypatch: MonkeyPatch, kvm_device: Path) -> None:
+    kvm_device.touch()
+    monkeypatch.setattr(accelerator, "execute_command", lambda _: "Accelerators supported in QEMU binary:\ntcg\n")
+    assert detect_accelerator().name == "tcg"
+
+
+def test_detect_accelerator_can_be_forced(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("VORAUS_DEBIAN_ISO_ACCELERATOR", "kvm")
+    assert detect_accelerator().name == "kvm"
+    detect_accelerator.cache_clear()
+    monkeypatch.setenv("VORAUS_DEBIAN_ISO_ACCELERATOR", "hvf")
+    with pytest.raises(ValueError, match="Unknown accelerator 'hvf'"):
+        detect_accelerator()
@@ -0,0 +1,103 @@
+"""Contains tests for the caching APT proxy."""
+
+import http.client
+import re
+from pathlib import Path
+from typing import BinaryIO
+
+from pytest import MonkeyPatch
+
+from tests.utils.http_server import LocalHTTPServer
+from voraus_debian_iso.methods import apt_proxy
+from voraus_debian_iso.methods.apt_proxy import AptCachingProxy
+
+
+def _get(connection: http.client.HTTPConnection, url: str) -> tuple[int, bytes]:
+    connection.request("GET", url)
+    response = connection.getresponse()
+    return response.status, response.read()
+
+
+def _create_mirror(tmp_path: Path) -> Path:
+    mirror_dir = tmp_path / "mirror"
+    (mirror_dir / "archive" / "pool").mkdir(parents=True)
+    (mirror_dir / "archive" / "pool" / "sudo.deb").write_bytes(b"sudo" * 1000)
+    (mirror_dir / "archive" / "pool" / "ssh.deb").write_bytes(b"ssh" * 1000)
+    (mirror_dir / "security").mkdir()
+    (mirror_dir / "security" / "InRelease").write_text("changes every day")
+    return mirror_dir
+
+
+def test_apt_proxy_caches_immutable_responses(tmp_path: Path) -> None:
+    with LocalHTTPServer(_create_mirror(tmp_path)) as mirror:
+        immutable_url_pattern = re.compile(rf"^{re.escape(mirror.url)}/archive/")
+        for _ in range(2):  # Second install with a new proxy on the same content store
+            with AptCachingProxy(
+                cache_dir=tmp_path / "cache", max_size=1024**2, immutable_url_pattern=immutable_url_pattern
+            ) as proxy:
+                connection = http.client.HTTPConnection(proxy.host, proxy.port)
+                assert _get(connection, f"{mirror.url}/archive/pool/sudo.deb") == (200, b"sudo" * 1000)
+                assert _get(connection, f"{mirror.url}/security/InRelease") == (200, b"changes every day")
+                assert _get(connection, f"{mirror.url}/archive/pool/missing.deb")[0] == 404
+                connection.close()
+
+        assert mirror.requests[("GET", "/archive/pool/sudo.deb", None)] == 1
+        assert mirror.requests[("GET", "/security/InRelease", None)] == 2
+        assert mirror.requests[("GET", "/archive/pool/missing.deb", None)] == 2
+        assert proxy.stats["hits"] == 1
+
+
+def test_apt_proxy_evicts_least_recently_used_responses(tmp_path: Path) -> None:
+    with LocalHTTPServer(_create_mirror(tmp_path)) as mirror:
+        with AptCachingProxy(
+            cache_dir=tmp_path / "cache", max_size=5000, immutable_url_pattern=re.compile(".*")
+        ) as proxy:
+            connection = http.client.HTTPConnection(proxy.host, proxy.port)
+            _get(connection, f"{mirror.url}/archive/pool/sudo.deb")
+            _get(connection, f"{mirror.url}/archive/pool/ssh.deb")
+            connection.close()
+
+            assert not proxy.get_cache_path(f"{mirror.url}/archive/pool/sudo.deb").exists()
+            assert proxy.get_cache_path(f"{mirror.url}/archive/pool/ssh.deb").read_bytes() == b"ssh" * 1000
+
+
+def test_apt_proxy_serves_cached_responses_evicted_while_sending(monkeypatch: MonkeyPatch, tmp_path: Path) -> None:
+    open_cached = apt_proxy._open_cached  # pylint: disable=protected-access
+
+    def _open_and_evict(cache_path: Path) -> BinaryIO | None:
+        cached_file = open_cached(cache_path)
+        cache_path.unlink(missing_ok=True)
+        return cached_file
+
+    with LocalHTTPServer(_create_mirror(tmp_path)) as mirror:
+        with AptCachingProxy(
+            cache_dir=tmp_path / "cache", max_size=1024**2, immutable_url_pattern=re.compile(".*")
+        ) as proxy:
+            connection = http.client.HTTPConnection(proxy.host, proxy.port)
+            _get(connection, f"{mirror.url}/archive/pool/sudo.deb")
+            monkeypatch.setattr(apt_proxy, "_open_cached", _open_and_evict)
+            assert _get(connection, f"{mirror.url}/archive/pool/sudo.deb") == (200, b"sudo" * 1000)
+            # Evicted before it was opened, so it is a miss on the same connection
+            assert _get(connection, f"{mirror.url}/archive/pool/sudo.deb") == (200, b"sudo" * 1000)
+            connection.close()
+
+        assert mirror.requests[("GET", "/archive/pool/sudo.deb", None)] == 2
+        assert proxy.stats["hits"] == 1
+
+
+def test_apt_proxy_forwards_head_requests_without_downloading(tmp_path: Path) -> None:
+    with LocalHTTPServer(_create_mirror(tmp_path)) as mirror:
+        with AptCachingProxy(
+            cache_dir=tmp_path / "cache", max_size=1024**2, immutable_url_pattern=re.compile(".*")
+        ) as proxy:
+            connection = http.client.HTTPConnection(proxy.host, proxy.port)
+            connection.request("HEAD", f"{mirror.url}/archive/pool/sudo.deb")
+            response = connection.getresponse()
+            response.read()
+            connection.close()
+
+            assert (response.status, response.getheader("Content-Length")) == (200, "4000")
+            assert not proxy.get_cache_path(f"{mirror.url}/archive/pool/sudo.deb").exists()
+
+        assert mirror.requests == {("HEAD", "/archive/pool/sudo.deb", None): 1}
+        assert (proxy.stats["misses"], proxy.stats["miss_bytes"]) == (1, 0)
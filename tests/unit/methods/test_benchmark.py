@@ -0,0 +1,68 @@
+"""Contains tests for the benchmark history and the detection of performance regressions."""
+
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from voraus_debian_iso.methods.benchmark import (
+    HostContext,
+    append_history,
+    check_regressions,
+    get_disk_type,
+    load_history,
+    summarize,
+)
+
+_HOST = HostContext(accelerator="kvm", cpu_count=8, cpu_model="Test CPU", disk_type="ssd", version="1.0.0")
+_TIMESTAMP = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def test_summarize() -> None:
+    records = summarize({"build:repack": [3.0, 1.0, 2.0], "boot": []}, host=_HOST, timestamp=_TIMESTAMP)
+    assert len(records) == 1
+    assert records[0].timestamp == "2026-01-01T00:00:00+00:00"
+    assert records[0].phase == "build:repack"
+    assert (records[0].iterations, records[0].median, records[0].minimum, records[0].maximum) == (3, 2.0, 1.0, 3.0)
+    assert records[0].accelerator == "kvm"
+
+
+@pytest.mark.parametrize("file_name", ["history.jsonl", "history.csv"])
+def test_history_round_trip(tmp_path: Path, file_name: str) -> None:
+    history_file = tmp_path / file_name
+    assert not load_history(history_file)
+    first = summarize({"build:repack": [1.5], "boot": [10.0, 12.0]}, host=_HOST, timestamp=_TIMESTAMP)
+    second = summarize({"build:repack": [1.25]}, host=_HOST, timestamp=_TIMESTAMP)
+    append_history(history_file, first)
+    append_history(history_file, second)
+    assert load_history(history_file) == first + second
+
+
+def test_check_regressions() -> None:
+    history = [
+        *summarize({"boot": [10.0], "build:patch": [0.1]}, host=_HOST),
+        *summarize({"boot": [11.0], "build:patch": [0.1]}, host=_HOST),
+        # Runs on other hosts are no baseline
+        *summarize({"boot": [1.0]}, host=HostContext(**{**_HOST.__dict__, "accelerator": "tcg"})),
+    ]
+    current = summarize({"boot": [13.0], "build:patch": [0.3], "install:partitioning": [100.0]}, host=_HOST)
+    regressions = check_regressions(current, history=history, threshold=0.2)
+    # build:patch tripled, but only by 0.2 seconds. install:partitioning has no baseline.
+    assert [(regression.phase, regression.baseline, regression.median) for regression in regressions] == [
+        ("boot", 10.5, 13.0)
+    ]
+    assert regressions[0].increase == pytest.approx(13.0 / 10.5 - 1)
+    assert not check_regressions(current, history=history, threshold=0.3)
+
+
+def test_check_regressions_uses_the_last_runs_as_baseline() -> None:
+    history = [
+        record for duration in [20.0, 20.0, 10.0, 10.0] for record in summarize({"boot": [duration]}, host=_HOST)
+    ]
+    current = summarize({"boot": [13.0]}, host=_HOST)
+    assert check_regressions(current, history=history, baseline_runs=2)
+    assert not check_regressions(current, history=history, baseline_runs=4)
+
+
+def test_get_disk_type_of_missing_directory(tmp_path: Path) -> None:
+    assert get_disk_type(tmp_path / "missing" / "directory") in ("ssd", "hdd", "unknown")
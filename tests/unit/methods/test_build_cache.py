@@ -0,0 +1,90 @@
+"""Contains tests for the build cache."""
+
+import logging
+import os
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from voraus_debian_iso.methods.build_cache import BuildCache, get_directory_digest, link_or_copy
+
+
+def _write_file(size: int) -> Callable[[Path], None]:
+    def _producer(entry_dir: Path) -> None:
+        (entry_dir / "result").write_bytes(b"x" * size)
+
+    return _producer
+
+
+def test_get_or_create_runs_phase_only_once(tmp_path: Path) -> None:
+    cache = BuildCache(root=tmp_path, max_size=1024)
+    calls = []
+
+    def _producer(entry_dir: Path) -> None:
+        calls.append(entry_dir)
+        (entry_dir / "result").write_text("done")
+
+    first = cache.get_or_create(phase="patch", scope="13-amd64", inputs={"data": "a"}, producer=_producer)
+    second = cache.get_or_create(phase="patch", scope="13-amd64", inputs={"data": "a"}, producer=_producer)
+    assert first == second
+    assert (first / "result").read_text() == "done"
+    assert len(calls) == 1
+
+
+def test_failing_phase_leaves_no_entry(tmp_path: Path) -> None:
+    cache = BuildCache(root=tmp_path, max_size=1024)
+
+    def _producer(entry_dir: Path) -> None:
+        (entry_dir / "result").write_text("partial")
+        raise RuntimeError("xorriso failed")
+
+    with pytest.raises(RuntimeError):
+        cache.store(phase="repack", scope="13-amd64", inputs={"data": "a"}, producer=_producer)
+    assert cache.lookup(phase="repack", scope="13-amd64", inputs={"data": "a"}) is None
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_lookup_explains_changed_inputs(tmp_path: Path, caplog: pytest.LogCaptureFixture) -> None:
+    cache = BuildCache(root=tmp_path, max_size=1024)
+    cache.store(phase="repack", scope="13-amd64", inputs={"iso": "aaa", "version": "1.0"}, producer=_write_file(1))
+    with caplog.at_level(logging.INFO):
+        cache.lookup(phase="repack", scope="13-amd64", inputs={"iso": "aaa", "version": "1.1"}, explain=True)
+        cache.lookup(phase="repack", scope="12-amd64", inputs={"iso": "aaa", "version": "1.1"}, explain=True)
+    assert "Phase 'repack' has to run: input 'version' changed (1.0 -> 1.1)" in caplog.messages
+    assert "Phase 'repack' has to run: no previous result" in caplog.messages
+
+
+def test_evict_removes_least_recently_used_entries(tmp_path: Path) -> None:
+    entries = [
+        BuildCache(root=tmp_path, max_size=250).store(
+            phase="extract", scope="13-amd64", inputs={"iso": str(index)}, producer=_write_file(100)
+        )
+        for index in range(3)
+    ]
+    for age, entry in enumerate(reversed(entries)):
+        os.utime(entry, (1000 - age, 1000 - age))
+    with BuildCache(root=tmp_path, max_size=250) as build_cache:
+        in_use = build_cache.get_or_create(
+            phase="extract", scope="13-amd64", inputs={"iso": "0"}, producer=_write_file(100)
+        )
+        BuildCache(root=tmp_path, max_size=250).evict()
+    assert in_use == entries[0]
+    assert [entry.is_dir() for entry in entries] == [True, False, True]
+
+
+def test_get_directory_digest_covers_names_and_contents(tmp_path: Path) -> None:
+    (tmp_path / "grub.cfg").write_text("timeout=20")
+    digest = get_directory_digest(tmp_path)
+    (tmp_path / "grub.cfg").write_text("timeout=0")
+    assert get_directory_digest(tmp_path) != digest
+
+
+def test_link_or_copy_replaces_destination(tmp_path: Path) -> None:
+    source = tmp_path / "image.iso"
+    source.write_text("new")
+    destination = tmp_path / "output" / "voraus.iso"
+    destination.parent.mkdir()
+    destination.write_text("old")
+    link_or_copy(source, destination)
+    assert destination.samefile(source)
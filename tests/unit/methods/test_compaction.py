@@ -0,0 +1,79 @@
+"""Contains tests for the post-install compaction."""
+
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+from pytest import MonkeyPatch
+
+from voraus_debian_iso.methods import compaction
+from voraus_debian_iso.methods.compaction import compact_disk, convert_compressed
+from voraus_debian_iso.methods.shell import execute_command
+
+requires_qemu_img = pytest.mark.skipif(shutil.which("qemu-img") is None, reason="Requires qemu-img")
+
+
+def _fake_qemu_img(differs: bool) -> object:
+    def _execute_command(command: list[str]) -> str:
+        if command[1] == "convert":
+            Path(command[-1]).write_bytes(b"compacted")
+        elif command[1] == "compare" and differs:
+            raise subprocess.CalledProcessError(1, command, output="Content mismatch at offset 0!\n")
+        return ""
+
+    return _execute_command
+
+
+@pytest.fixture(name="disk_file")
+def _disk_file(tmp_path: Path, monkeypatch: MonkeyPatch) -> Path:
+    disk_file = tmp_path / "qemu_disk.img"
+    disk_file.write_bytes(b"installed and trimmed")
+    monkeypatch.setattr(compaction, "trim_guest", lambda **_: None)
+    return disk_file
+
+
+def test_compact_disk_replaces_the_disk(disk_file: Path, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(compaction, "execute_command", _fake_qemu_img(differs=False))
+    compact_disk(disk_file)
+    assert disk_file.read_bytes() == b"compacted"
+    assert list(disk_file.parent.iterdir()) == [disk_file]
+
+
+def test_compact_disk_keeps_the_disk_if_the_copy_differs(disk_file: Path, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(compaction, "execute_command", _fake_qemu_img(differs=True))
+    with pytest.raises(RuntimeError, match="differs from disk file .*Content mismatch at offset 0!"):
+        compact_disk(disk_file)
+    assert disk_file.read_bytes() == b"installed and trimmed"
+    assert list(disk_file.parent.iterdir()) == [disk_file]
+
+
+def test_convert_compressed_does_not_write_out_of_order(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    commands: list[list[str]] = []
+
+    def _execute_command(command: list[str]) -> str:
+        commands.append(command)
+        return ""
+
+    monkeypatch.setattr(compaction, "execute_command", _execute_command)
+    convert_compressed(source_file=tmp_path / "disk.img", target_file=tmp_path / "compacted.img")
+    convert_arguments = commands[0][2:]
+    assert "-c" in convert_arguments
+    # qemu-img rejects out-of-order writes to compressed images
+    assert "-W" not in convert_arguments
+
+
+@requires_qemu_img
+def test_convert_compressed_writes_an_identical_smaller_copy(tmp_path: Path) -> None:
+    raw_file = tmp_path / "disk.raw"
+    with raw_file.open("wb") as file:
+        file.truncate(64 * 1024**2)
+        file.seek(16 * 1024**2)
+        file.write(b"installed" * 1024**2)
+    disk_file = tmp_path / "disk.img"
+    execute_command(["qemu-img", "convert", "-f", "raw", "-O", "qcow2", str(raw_file), str(disk_file)])
+
+    compacted_file = tmp_path / "compacted.img"
+    convert_compressed(source_file=disk_file, target_file=compacted_file)
+    execute_command(["qemu-img", "compare", "-f", "raw", "-F", "qcow2", str(raw_file), str(compacted_file)])
+    assert compacted_file.stat().st_size < disk_file.stat().st_size
@@ -0,0 +1,58 @@
+"""Contains tests for the golden image and overlay methods."""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+from voraus_debian_iso.methods.disk_images import (
+    create_overlay,
+    ensure_overlay,
+    get_backing_file,
+    is_golden_image,
+    seal_golden_image,
+)
+from voraus_debian_iso.methods.shell import execute_command
+
+requires_qemu_img = pytest.mark.skipif(shutil.which("qemu-img") is None, reason="Requires qemu-img")
+
+
+def test_seal_golden_image_makes_disk_read_only(tmp_path: Path) -> None:
+    disk_file = tmp_path / "golden.img"
+    disk_file.write_bytes(b"disk")
+    assert not is_golden_image(disk_file)
+    seal_golden_image(disk_file)
+    assert is_golden_image(disk_file)
+    assert not is_golden_image(tmp_path / "missing.img")
+
+
+def test_create_overlay_requires_golden_image(tmp_path: Path) -> None:
+    with pytest.raises(FileNotFoundError, match="install --golden"):
+        create_overlay(base_file=tmp_path / "golden.img", overlay_file=tmp_path / "overlay.img")
+
+
+def test_create_overlay_never_replaces_golden_image(tmp_path: Path) -> None:
+    base_file = tmp_path / "golden.img"
+    base_file.write_bytes(b"disk")
+    with pytest.raises(ValueError, match="can't replace its own golden image"):
+        create_overlay(base_file=base_file, overlay_file=base_file)
+    assert base_file.read_bytes() == b"disk"
+
+
+@requires_qemu_img
+def test_ensure_overlay_creates_and_reuses_thin_overlay(tmp_path: Path) -> None:
+    base_file = tmp_path / "golden.img"
+    execute_command(["qemu-img", "create", "-f", "qcow2", str(base_file), "1G"])
+    seal_golden_image(base_file)
+    overlay_file = tmp_path / "vm" / "disk.img"
+
+    ensure_overlay(base_file=base_file, overlay_file=overlay_file)
+    assert get_backing_file(overlay_file) == base_file.resolve()
+    inode = overlay_file.stat().st_ino
+
+    ensure_overlay(base_file=base_file, overlay_file=overlay_file)
+    assert overlay_file.stat().st_ino == inode
+
+    create_overlay(base_file=base_file, overlay_file=overlay_file)
+    assert get_backing_file(overlay_file) == base_file.resolve()
+    assert is_golden_image(base_file)
@@ -0,0 +1,110 @@
+"""Contains tests for the download engine."""
+
+import hashlib
+import json
+from http.client import IncompleteRead
+from pathlib import Path
+from typing import Any
+from urllib.request import urlopen
+
+import pytest
+from pytest import MonkeyPatch
+
+from tests.utils.http_server import LocalHTTPServer
+from voraus_debian_iso.methods import download
+from voraus_debian_iso.methods.download import download_file, race_mirrors
+
+_FILE_NAME = "debian-netinst.iso"
+_SEGMENT_SIZE = 1024
+
+
+@pytest.fixture(name="mirror_dir")
+def mirror_dir_fixture(tmp_path: Path) -> Path:
+    mirror_dir = tmp_path / "mirror" / "iso-cd"
+    mirror_dir.mkdir(parents=True)
+    data = bytes(range(256)) * 40 + b"tail"
+    (mirror_dir / _FILE_NAME).write_bytes(data)
+    (mirror_dir / "SHA256SUMS").write_text(f"{hashlib.sha256(data).hexdigest()}  {_FILE_NAME}\n")
+    return mirror_dir
+
+
+def test_download_file_races_mirrors_and_verifies(tmp_path: Path, mirror_dir: Path) -> None:
+    destination = tmp_path / "cache" / _FILE_NAME
+    with LocalHTTPServer(mirror_dir.parent) as server:
+        result = download_file(
+            mirror_urls=[f"{server.url}/missing", f"{server.url}/iso-cd"],
+            file_name=_FILE_NAME,
+            destination=destination,
+            connections=4,
+            segment_size=_SEGMENT_SIZE,
+        )
+    assert result == destination
+    assert destination.read_bytes() == (mirror_dir / _FILE_NAME).read_bytes()
+    assert not destination.with_name(_FILE_NAME + ".part.json").exists()
+    assert sum(count for (method, _, _), count in server.requests.items() if method == "GET") == 12
+
+
+def test_download_file_resumes_partial_download(tmp_path: Path, mirror_dir: Path) -> None:
+    destination = tmp_path / _FILE_NAME
+    data = (mirror_dir / _FILE_NAME).read_bytes()
+    part_file = tmp_path / (_FILE_NAME + ".part")
+    part_file.write_bytes(data[: 3 * _SEGMENT_SIZE] + bytes(len(data) - 3 * _SEGMENT_SIZE))
+    (tmp_path / (_FILE_NAME + ".part.json")).write_text(
+        json.dumps(
+            {
+                "sha256": hashlib.sha256(data).hexdigest(),
+                "size": len(data),
+                "segment_size": _SEGMENT_SIZE,
+                "completed": [0, 1, 2],
+            }
+        )
+    )
+    with LocalHTTPServer(mirror_dir) as server:
+        download_file([server.url], _FILE_NAME, destination, segment_size=_SEGMENT_SIZE)
+    assert destination.read_bytes() == data
+    ranges = {range_header for (method, _, range_header), _ in server.requests.items() if method == "GET"}
+    assert "bytes=0-1023" not in ranges
+    assert len(ranges - {None}) == 8
+
+
+def test_download_file_retries_truncated_segment(tmp_path: Path, mirror_dir: Path, monkeypatch: MonkeyPatch) -> None:
+    truncated: list[str] = []
+
+    def truncate_first_range(request: Any, **kwargs: Any) -> Any:
+        range_header = getattr(request, "get_header", lambda _: None)("Range")
+        if range_header == "bytes=1024-2047" and not truncated:
+            truncated.append(range_header)
+            raise IncompleteRead(b"partial", 1000)
+        return urlopen(request, **kwargs)
+
+    monkeypatch.setattr(download, "urlopen", truncate_first_range)
+    destination = tmp_path / _FILE_NAME
+    with LocalHTTPServer(mirror_dir) as server:
+        download_file([server.url], _FILE_NAME, destination, segment_size=_SEGMENT_SIZE)
+    assert truncated
+    assert destination.read_bytes() == (mirror_dir / _FILE_NAME).read_bytes()
+
+
+def test_download_file_replaces_corrupt_cached_file(tmp_path: Path, mirror_dir: Path) -> None:
+    destination = tmp_path / _FILE_NAME
+    destination.write_bytes(b"truncated")
+    with LocalHTTPServer(mirror_dir, accept_ranges=False) as server:
+        download_file([server.url], _FILE_NAME, destination)
+        assert destination.read_bytes() == (mirror_dir / _FILE_NAME).read_bytes()
+        server.requests.clear()
+        download_file([server.url], _FILE_NAME, destination)
+        assert not server.requests
+
+
+def test_download_file_rejects_checksum_mismatch(tmp_path: Path, mirror_dir: Path) -> None:
+    (mirror_dir / "SHA256SUMS").write_text(f"{'0' * 64}  {_FILE_NAME}\n")
+    destination = tmp_path / _FILE_NAME
+    with LocalHTTPServer(mirror_dir) as server, pytest.raises(RuntimeError, match="Checksum mismatch"):
+        download_file([server.url], _FILE_NAME, destination, segment_size=_SEGMENT_SIZE)
+    assert not destination.exists()
+    assert not (tmp_path / (_FILE_NAME + ".part")).exists()
+
+
+def test_race_mirrors_fails_if_no_mirror_serves_the_file(mirror_dir: Path) -> None:
+    with LocalHTTPServer(mirror_dir) as server, pytest.raises(RuntimeError, match="No mirror serves"):
+        race_mirrors([f"{server.url}/a/{_FILE_NAME}", f"{server.url}/b/{_FILE_NAME}"])
@@ -0,0 +1,108 @@
+"""Contains tests for the flash methods."""
+
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+from pytest import MonkeyPatch
+
+from voraus_debian_iso.methods import flash as flash_module
+from voraus_debian_iso.methods.flash import FlashSource, flash
+from voraus_debian_iso.methods.raw_images import write_compressed_image
+
+_BLOCK_SIZE = 64 * 1024
+
+
+@pytest.fixture(name="iso_file")
+def _iso_file(tmp_path: Path) -> Path:
+    iso_file = tmp_path / "debian.iso"
+    iso_file.write_bytes(os.urandom(5 * _BLOCK_SIZE + 1234))  # The unaligned tail is written without O_DIRECT
+    return iso_file
+
+
+@pytest.mark.parametrize("direct", [False, True])
+def test_flash_writes_all_targets(iso_file: Path, tmp_path: Path, direct: bool) -> None:
+    targets = [tmp_path / f"stick{index}.img" for index in range(4)]
+    try:
+        results = flash(source=FlashSource.open(iso_file), targets=targets, block_size=_BLOCK_SIZE, direct=direct)
+    except OSError as error:
+        pytest.skip(f"O_DIRECT is not supported: {error}")
+    for target, result in zip(targets, results):
+        assert result.error is None
+        assert result.written == iso_file.stat().st_size
+        assert result.verify_seconds is not None
+        assert target.read_bytes() == iso_file.read_bytes()
+
+
+@pytest.fixture(name="exported_image")
+def _exported_image(tmp_path: Path) -> tuple[Path, Path]:
+    if shutil.which("zstd") is None:
+        pytest.skip("zstd is not installed")
+    raw_file = tmp_path / "disk.raw"
+    with raw_file.open("wb") as file:
+        file.truncate(16 * _BLOCK_SIZE)
+        file.write(b"boot" * 1024)
+        file.seek(8 * _BLOCK_SIZE)
+        file.write(b"root" * 1024)
+    image_file = tmp_path / "disk.img.zst"
+    write_compressed_image(raw_file=raw_file, image_file=image_file)
+    return raw_file, image_file
+
+
+def test_flash_writes_exported_images(exported_image: tuple[Path, Path], tmp_path: Path) -> None:
+    raw_file, image_file = exported_image
+    source = FlashSource.open(image_file)
+    assert source.block_map is not None
+    results = flash(source=source, targets=[tmp_path / "target.img"], block_size=_BLOCK_SIZE)
+    assert results[0].error is None
+    assert (tmp_path / "target.img").read_bytes() == raw_file.read_bytes()
+
+
+@pytest.mark.parametrize("zeroed", [True, False])
+def test_flash_zeroes_and_verifies_unmapped_ranges_of_devices(
+    exported_image: tuple[Path, Path], tmp_path: Path, monkeypatch: MonkeyPatch, zeroed: bool
+) -> None:
+    raw_file, image_file = exported_image
+    device = tmp_path / "device"
+    device.write_bytes(b"\xff" * raw_file.stat().st_size)
+    monkeypatch.setattr(flash_module, "is_block_device", lambda path: path == device)
+    if not zeroed:
+        monkeypatch.setattr(flash_module, "zero_ranges", lambda **_: None)
+
+    results = flash(source=FlashSource.open(image_file), targets=[device], block_size=_BLOCK_SIZE)
+
+    if zeroed:
+        assert results[0].error is None
+        assert device.read_bytes() == raw_file.read_bytes()
+    else:
+        assert results[0].error == "Read-back data doesn't match the source"
+
+
+def test_flash_continues_without_failed_targets(iso_file: Path, tmp_path: Path) -> None:
+    targets = [tmp_path / "missing" / "stick0.img", tmp_path / "stick1.img"]
+    results = flash(source=FlashSource.open(iso_file), targets=targets, block_size=_BLOCK_SIZE)
+    assert results[0].error is not None
+    assert results[1].error is None
+    assert targets[1].read_bytes() == iso_file.read_bytes()
+
+
+def test_flash_detects_corrupted_targets(iso_file: Path, tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    def _get_digest(**_: object) -> str:
+        return "0" * 64
+
+    monkeypatch.setattr(flash_module, "_get_digest", _get_digest)
+    results = flash(source=FlashSource.open(iso_file), targets=[tmp_path / "stick.img"], block_size=_BLOCK_SIZE)
+    assert results[0].error == "Read-back data doesn't match the source"
+
+
+def test_flash_rejects_mounted_targets(iso_file: Path, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(flash_module, "_get_mounted_devices", lambda: {"/dev/sdx1"})
+    with pytest.raises(ValueError, match="/dev/sdx or one of its partitions is mounted"):
+        flash(source=FlashSource.open(iso_file), targets=[Path("/dev/sdx")])
+
+
+@pytest.mark.parametrize("block_size", [0, 1000])
+def test_flash_rejects_unaligned_block_sizes(iso_file: Path, tmp_path: Path, block_size: int) -> None:
+    with pytest.raises(ValueError, match="is not a multiple of 4096 bytes"):
+        flash(source=FlashSource.open(iso_file), targets=[tmp_path / "stick.img"], block_size=block_size)
@@ -0,0 +1,72 @@
+"""Contains tests for the install monitor."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from voraus_debian_iso.methods.install_monitor import InstallMonitor
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_monitor_records_stage_timeline(tmp_path: Path) -> None:
+    clock = _FakeClock()
+    monitor = InstallMonitor(clock=clock)
+    clock.now += 5
+    monitor.feed("[    0.000000] Linux version 6.12\r\n\x1b[1;1H\x1b[37mPartitioning")
+    monitor.feed(" disks\r\n")
+    clock.now += 60
+    monitor.feed("Installing the base system\n")
+    clock.now += 10
+    monitor.feed("Partitioning disks\n")  # Redrawn screens never move the timeline back
+    clock.now += 300
+    monitor.feed("Select and install software\nInstall the GRUB boot loader\n")
+    clock.now += 20
+    monitor.feed("[ 1234.5] reboot: Power down\n")
+    monitor.finish()
+
+    timeline_file = tmp_path / "timeline.json"
+    monitor.write_timeline(timeline_file)
+    timeline = json.loads(timeline_file.read_text())
+    assert timeline["result"] == "success"
+    assert timeline["total_seconds"] == 395
+    assert [(stage["name"], stage["duration_seconds"]) for stage in timeline["stages"]] == [
+        ("boot", 5),
+        ("partitioning", 60),
+        ("base-system", 310),
+        ("package-install", 0),
+        ("grub", 20),
+        ("reboot", 0),
+    ]
+
+
+def test_monitor_fails_on_fatal_output() -> None:
+    monitor = InstallMonitor(clock=_FakeClock())
+    with pytest.raises(RuntimeError, match="installer reported 'Bad archive mirror'"):
+        monitor.feed("Bad archive mirror\n")
+    assert monitor.result.startswith("failed")
+
+
+def test_monitor_fails_on_stalled_stage() -> None:
+    clock = _FakeClock()
+    monitor = InstallMonitor(clock=clock)
+    monitor.feed("Partitioning disks\n")
+    clock.now += 899
+    monitor.check_stall()
+    clock.now += 2
+    with pytest.raises(RuntimeError, match="stage 'partitioning' stalled for 901 seconds"):
+        monitor.check_stall()
+
+
+def test_monitor_ignores_stalls_if_disabled() -> None:
+    clock = _FakeClock()
+    monitor = InstallMonitor(clock=clock, detect_stalls=False)
+    clock.now += 100000
+    monitor.check_stall()
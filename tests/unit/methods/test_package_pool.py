@@ -0,0 +1,145 @@
+"""Contains tests for the package pool methods."""
+
+import gzip
+import hashlib
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from voraus_debian_iso.methods.package_pool import (
+    get_deb_files,
+    get_pool_path,
+    read_deb_control,
+    render_package_pool,
+    set_preseed_values,
+    update_release,
+)
+
+_RELEASE = """Origin: Debian
+Label: Debian
+Suite: stable
+Codename: trixie
+Architectures: amd64
+Components: main
+Description: Debian 13.6.0 trixie - Official Snapshot amd64 NETINST
+MD5Sum:
+ d41d8cd98f00b204e9800998ecf8427e                0 main/binary-amd64/Packages
+SHA256:
+ e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855                0 main/binary-amd64/Packages
+"""
+
+requires_dpkg_deb = pytest.mark.skipif(shutil.which("dpkg-deb") is None, reason="dpkg-deb is not installed")
+
+
+def _build_deb(directory: Path, package: str, architecture: str = "amd64", source: str | None = None) -> Path:
+    package_dir = directory / f"{package}-build"
+    (package_dir / "DEBIAN").mkdir(parents=True)
+    control = [f"Package: {package}", "Version: 1.0", f"Architecture: {architecture}", "Maintainer: Test <t@t>"]
+    if source:
+        control.append(f"Source: {source}")
+    control.append("Description: A test package\n with a long description")
+    (package_dir / "DEBIAN" / "control").write_text("\n".join(control) + "\n")
+    deb_file = directory / f"{package}_1.0_{architecture}.deb"
+    subprocess.run(["dpkg-deb", "--build", str(package_dir), str(deb_file)], check=True, capture_output=True)
+    shutil.rmtree(package_dir)
+    return deb_file
+
+
+def test_get_deb_files_expands_directories(tmp_path: Path) -> None:
+    (tmp_path / "pool").mkdir()
+    for name in ["b.deb", "a.deb", "readme.txt"]:
+        (tmp_path / "pool" / name).touch()
+    (tmp_path / "c.deb").touch()
+    assert get_deb_files([tmp_path / "c.deb", tmp_path / "pool"]) == [
+        tmp_path / "c.deb",
+        tmp_path / "pool" / "a.deb",
+        tmp_path / "pool" / "b.deb",
+    ]
+
+
+@pytest.mark.parametrize("name", ["missing.deb", "empty"])
+def test_get_deb_files_rejects_missing_packages(tmp_path: Path, name: str) -> None:
+    (tmp_path / "empty").mkdir()
+    with pytest.raises(FileNotFoundError):
+        get_deb_files([tmp_path / name])
+
+
+@pytest.mark.parametrize(
+    "package,expected", [("sudo", "pool/local/s/sudo/x.deb"), ("libssl3", "pool/local/libs/libssl3/x.deb")]
+)
+def test_get_pool_path(package: str, expected: str) -> None:
+    assert get_pool_path(package=package, file_name="x.deb") == expected
+
+
+@requires_dpkg_deb
+def test_read_deb_control(tmp_path: Path) -> None:
+    control = read_deb_control(_build_deb(tmp_path, "voraus-tools"))
+    assert control["Package"] == "voraus-tools"
+    assert control["Architecture"] == "amd64"
+    assert control["Description"] == "A test package\n with a long description"
+
+
+def test_read_deb_control_rejects_other_files(tmp_path: Path) -> None:
+    (tmp_path / "broken.deb").write_bytes(b"not a package")
+    with pytest.raises(ValueError, match="is not a debian package"):
+        read_deb_control(tmp_path / "broken.deb")
+
+
+def test_update_release_adds_component_and_hashes() -> None:
+    packages = b"Package: sudo\n"
+    index_files = {"local/binary-amd64/Packages": packages}
+    release = update_release(release=_RELEASE, component="local", index_files=index_files)
+    assert "Components: main local\n" in release
+    assert f" {hashlib.md5(packages).hexdigest()}               14 local/binary-amd64/Packages\n" in release
+    assert release.endswith(f" {hashlib.sha256(packages).hexdigest()}               14 local/binary-amd64/Packages\n")
+    # Updating twice replaces the entries instead of duplicating them
+    assert update_release(release=release, component="local", index_files=index_files) == release
+
+
+@requires_dpkg_deb
+@pytest.mark.skipif(shutil.which("bsdtar") is None, reason="bsdtar is not installed")
+def test_render_package_pool(tmp_path: Path) -> None:
+    iso_dir = tmp_path / "iso"
+    (iso_dir / "dists" / "trixie").mkdir(parents=True)
+    (iso_dir / "dists" / "trixie" / "Release").write_text(_RELEASE)
+    iso_path = tmp_path / "debian.iso"
+    subprocess.run(["bsdtar", "--format", "iso9660", "-cf", str(iso_path), "-C", str(iso_dir), "dists"], check=True)
+    deb_files = [_build_deb(tmp_path, "sudo"), _build_deb(tmp_path, "voraus-config", "all", source="voraus")]
+
+    overlay_dir = tmp_path / "overlay"
+    render_package_pool(overlay_dir=overlay_dir, iso_path=iso_path, architecture="amd64", deb_files=deb_files)
+
+    assert (overlay_dir / "pool/local/s/sudo/sudo_1.0_amd64.deb").read_bytes() == deb_files[0].read_bytes()
+    assert (overlay_dir / "pool/local/v/voraus/voraus-config_1.0_all.deb").is_file()
+    packages = (overlay_dir / "dists/trixie/local/binary-amd64/Packages").read_bytes()
+    assert gzip.decompress((overlay_dir / "dists/trixie/local/binary-amd64/Packages.gz").read_bytes()) == packages
+    assert b"Filename: pool/local/s/sudo/sudo_1.0_amd64.deb\n" in packages
+    assert f"SHA256: {hashlib.sha256(deb_files[1].read_bytes()).hexdigest()}".encode() in packages
+    release = (overlay_dir / "dists/trixie/Release").read_text()
+    assert f"{hashlib.sha256(packages).hexdigest()} {len(packages):>16} local/binary-amd64/Packages" in release
+
+
+@requires_dpkg_deb
+def test_render_package_pool_rejects_foreign_architectures(tmp_path: Path) -> None:
+    deb_file = _build_deb(tmp_path, "sudo", "arm64")
+    with pytest.raises(ValueError, match="built for architecture 'arm64', not 'amd64'"):
+        render_package_pool(
+            overlay_dir=tmp_path / "overlay",
+            iso_path=tmp_path / "debian.iso",
+            architecture="amd64",
+            deb_files=[deb_file],
+        )
+
+
+def test_set_preseed_values_replaces_active_and_appends_missing_questions() -> None:
+    preseed = "#d-i apt-setup/use_mirror boolean false\nd-i apt-setup/use_mirror boolean true\nd-i other string x\n"
+    assert set_preseed_values(
+        preseed, {"apt-setup/use_mirror": "boolean false", "apt-setup/cdrom/set-first": "boolean true"}
+    ) == (
+        "#d-i apt-setup/use_mirror boolean false\n"
+        "d-i apt-setup/use_mirror boolean false\n"
+        "d-i other string x\n"
+        "d-i apt-setup/cdrom/set-first boolean true\n"
+    )
@@ -0,0 +1,55 @@
+"""Contains tests for the QMP client."""
+
+import asyncio
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from voraus_debian_iso.methods.qmp import QMPClient, QMPError
+
+
+async def _serve_fake_qemu(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    writer.write(json.dumps({"QMP": {"version": {"qemu": {"major": 9}}, "capabilities": []}}).encode() + b"\n")
+    while line := await reader.readline():
+        message = json.loads(line)
+        response: dict[str, Any]
+        match message["execute"], message.get("arguments", {}).get("command-line"):
+            case "qmp_capabilities", _:
+                response = {"return": {}}
+            case "human-monitor-command", "savevm voraus-booted":
+                writer.write(json.dumps({"event": "STOP", "timestamp": {}}).encode() + b"\n")
+                response = {"return": ""}
+            case "human-monitor-command", _:
+                response = {"return": "Error: Device 'ide0-hd0' is writable but does not support snapshots\r\n"}
+            case _:
+                response = {
+                    "error": {
+                        "class": "CommandNotFound",
+                        "desc": f"The command {message['execute']} has not been found",
+                    }
+                }
+        writer.write(json.dumps(response).encode() + b"\n")
+        await writer.drain()
+    writer.close()
+
+
+async def _run_with_fake_qemu(tmp_path: Path, commands: list[str]) -> tuple[list[Any], list[dict[str, Any]]]:
+    socket_path = tmp_path / "qmp.sock"
+    server = await asyncio.start_unix_server(_serve_fake_qemu, path=str(socket_path))
+    async with server:
+        async with QMPClient(socket_path) as client:
+            results = [await client.human_monitor_command(command) for command in commands]
+            return results, client.events
+
+
+def test_qmp_client_executes_hmp_commands_and_collects_events(tmp_path: Path) -> None:
+    results, events = asyncio.run(_run_with_fake_qemu(tmp_path, ["savevm voraus-booted"]))
+    assert results == [""]
+    assert [event["event"] for event in events] == ["STOP"]
+
+
+def test_qmp_client_raises_hmp_errors(tmp_path: Path) -> None:
+    with pytest.raises(QMPError, match="does not support snapshots"):
+        asyncio.run(_run_with_fake_qemu(tmp_path, ["savevm other"]))
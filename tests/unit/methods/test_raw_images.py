@@ -0,0 +1,103 @@
+"""Contains tests for the raw image methods."""
+
+import shutil
+from pathlib import Path
+
+import pytest
+from pytest import MonkeyPatch
+
+from voraus_debian_iso.methods import raw_images
+from voraus_debian_iso.methods.raw_images import (
+    BlockMap,
+    Compression,
+    get_block_map_file,
+    get_data_ranges,
+    restore_image,
+    write_compressed_image,
+)
+
+_MIB = 1024 * 1024
+
+
+def _create_sparse_file(path: Path) -> None:
+    with path.open("wb") as file:
+        file.truncate(64 * _MIB)
+        file.write(b"\xeb\x63\x90" + bytes(4093))
+        file.seek(10 * _MIB)
+        file.write(b"data" * 1024 * 1024)
+        file.seek(63 * _MIB)
+        file.write(b"tail" * 1024)
+
+
+@pytest.fixture(name="raw_file")
+def _raw_file(tmp_path: Path) -> Path:
+    raw_file = tmp_path / "disk.raw"
+    _create_sparse_file(raw_file)
+    if sum(length for _, length in get_data_ranges(raw_file)) == raw_file.stat().st_size:
+        pytest.skip("The file system doesn't support sparse files")
+    return raw_file
+
+
+def test_get_data_ranges(raw_file: Path) -> None:
+    ranges = get_data_ranges(raw_file)
+    assert ranges[0][0] == 0
+    assert any(offset <= 10 * _MIB < offset + length for offset, length in ranges)
+    assert sum(length for _, length in ranges) < 8 * _MIB
+
+
+@pytest.mark.parametrize("compression", list(Compression))
+def test_write_and_restore_compressed_image(raw_file: Path, tmp_path: Path, compression: Compression) -> None:
+    if shutil.which(compression.value) is None:
+        pytest.skip(f"{compression.value} is not installed")
+    image_file = tmp_path / f"disk.img.{compression.extension}"
+    block_map = write_compressed_image(raw_file=raw_file, image_file=image_file, compression=compression)
+
+    assert BlockMap.load(get_block_map_file(image_file)) == block_map
+    assert image_file.stat().st_size < _MIB
+
+    target = tmp_path / "restored.raw"
+    target.write_bytes(b"previous content")
+    assert restore_image(image_file=image_file, target=target) == block_map.mapped_size
+    assert target.read_bytes() == raw_file.read_bytes()
+    assert get_data_ranges(target) == block_map.ranges
+
+
+def test_restore_image_zeroes_unmapped_ranges_of_devices(
+    raw_file: Path, tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    if shutil.which("zstd") is None:
+        pytest.skip("zstd is not installed")
+    image_file = tmp_path / "disk.img.zst"
+    write_compressed_image(raw_file=raw_file, image_file=image_file)
+    # A regular file doesn't support BLKZEROOUT, so the unmapped ranges are written with zeros
+    device = tmp_path / "device"
+    device.write_bytes(b"\xff" * (raw_file.stat().st_size + _MIB))
+    monkeypatch.setattr(raw_images, "is_block_device", lambda path: path == device)
+
+    restore_image(image_file=image_file, target=device)
+
+    restored = device.read_bytes()
+    assert restored[: raw_file.stat().st_size] == raw_file.read_bytes()
+    assert restored[raw_file.stat().st_size :] == b"\xff" * _MIB
+
+
+def test_block_map_unmapped_ranges() -> None:
+    block_map = BlockMap(image_size=100, compression=Compression.ZSTD, ranges=[(0, 10), (40, 20), (60, 5)])
+    assert block_map.unmapped_ranges == [(10, 30), (65, 35)]
+
+
+def test_restore_image_rejects_corrupted_images(raw_file: Path, tmp_path: Path) -> None:
+    if shutil.which("zstd") is None:
+        pytest.skip("zstd is not installed")
+    image_file = tmp_path / "disk.img.zst"
+    block_map = write_compressed_image(raw_file=raw_file, image_file=image_file)
+    block_map.sha256 = "0" * 64
+    block_map.save(get_block_map_file(image_file))
+    with pytest.raises(ValueError, match="doesn't match its block map"):
+        restore_image(image_file=image_file, target=tmp_path / "restored.raw")
+
+
+def test_block_map_rejects_unknown_versions(tmp_path: Path) -> None:
+    (tmp_path / "disk.img.zst.bmap.json").write_text('{"version": 2}')
+    with pytest.raises(ValueError, match="unsupported version 2"):
+        BlockMap.load(tmp_path / "disk.img.zst.bmap.json")
@@ -0,0 +1,52 @@
+"""Contains tests for the SSH readiness probe."""
+
+import socket
+import threading
+import time
+from typing import Generator
+
+import pytest
+
+from voraus_debian_iso.methods.readiness import read_ssh_banner, wait_for_ssh_banner
+
+
+@pytest.fixture(name="server_socket")
+def server_socket_fixture() -> Generator[socket.socket, None, None]:
+    with socket.create_server(("127.0.0.1", 0)) as server_socket:
+        yield server_socket
+
+
+def _serve(server_socket: socket.socket, responses: list[bytes]) -> None:
+    for response in responses:
+        connection, _ = server_socket.accept()
+        with connection:
+            connection.sendall(response)
+
+
+def test_read_ssh_banner_ignores_connections_closed_without_banner(server_socket: socket.socket) -> None:
+    port = server_socket.getsockname()[1]
+    thread = threading.Thread(target=_serve, args=(server_socket, [b"", b"SSH-2.0-OpenSSH_10.0p2 Debian-7\r\n"]))
+    thread.start()
+    assert read_ssh_banner(host="127.0.0.1", port=port) is None
+    assert read_ssh_banner(host="127.0.0.1", port=port) == "SSH-2.0-OpenSSH_10.0p2 Debian-7"
+    thread.join()
+
+
+def test_wait_for_ssh_banner_waits_until_server_is_ready(server_socket: socket.socket) -> None:
+    port = server_socket.getsockname()[1]
+
+    def _boot_guest() -> None:
+        time.sleep(0.2)
+        _serve(server_socket, [b"", b"", b"SSH-2.0-OpenSSH_10.0p2\r\n"])
+
+    thread = threading.Thread(target=_boot_guest)
+    thread.start()
+    assert 0.2 <= wait_for_ssh_banner(host="127.0.0.1", port=port, timeout=10, max_interval=0.1) < 10
+    thread.join()
+
+
+def test_wait_for_ssh_banner_times_out() -> None:
+    with socket.create_server(("127.0.0.1", 0)) as unused_socket:
+        port = unused_socket.getsockname()[1]
+    with pytest.raises(TimeoutError, match="is not ready after 0.3 seconds"):
+        wait_for_ssh_banner(host="127.0.0.1", port=port, timeout=0.3)
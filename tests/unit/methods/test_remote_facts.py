@@ -0,0 +1,67 @@
+"""Contains tests for the remote fact collection."""
+
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from voraus_debian_iso.methods.remote_facts import Fact, RemoteFacts
+
+
+class _LocalConnection:
+    """Runs the commands on the local host instead of a remote one."""
+
+    host = "localhost"
+
+    def __init__(self) -> None:
+        """Initializes the connection."""
+        self.commands: list[str] = []
+
+    def run(self, command: str, hide: bool) -> SimpleNamespace:  # pylint: disable=unused-argument
+        """Runs a command with the local python as python3.
+
+        Args:
+            command: The command.
+            hide: Whether to hide the output, which is ignored.
+
+        Returns:
+            The result with the standard output.
+        """
+        self.commands.append(command)
+        local_command = command.replace("python3", sys.executable, 1)
+        return SimpleNamespace(
+            stdout=subprocess.run(local_command, shell=True, capture_output=True, text=True, check=False).stdout
+        )
+
+
+@pytest.fixture(name="connection")
+def _connection() -> _LocalConnection:
+    return _LocalConnection()
+
+
+def test_collect_runs_all_commands_in_one_round_trip(connection: _LocalConnection) -> None:
+    facts = RemoteFacts(connection)
+    collected = facts.collect({"greeting": "echo '\"quoted\" output'", "failing": "echo broken >&2; exit 3"})
+    assert collected == {
+        "greeting": Fact(stdout='"quoted" output\n', stderr="", exit_code=0),
+        "failing": Fact(stdout="", stderr="broken\n", exit_code=3),
+    }
+    assert not collected["failing"].ok
+    assert facts.round_trips == 1
+
+
+def test_collect_caches_facts(connection: _LocalConnection) -> None:
+    facts = RemoteFacts(connection)
+    facts.collect({"first": "echo 1"})
+    assert facts.collect({"first": "echo 1", "second": "echo 2"})["second"].stdout == "2\n"
+    assert facts.collect({"first": "echo 1", "second": "echo 2"})["first"] is facts["first"]
+    assert facts.round_trips == 2
+    assert "echo 1" not in connection.commands[1]
+
+
+def test_collect_rejects_changed_commands(connection: _LocalConnection) -> None:
+    facts = RemoteFacts(connection)
+    facts.collect({"first": "echo 1"})
+    with pytest.raises(ValueError, match="Fact 'first' has already been collected with command 'echo 1'"):
+        facts.collect({"first": "echo 2"})
@@ -0,0 +1,115 @@
+"""Contains tests for the shell helper functions."""
+
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from subprocess import CalledProcessError, TimeoutExpired
+
+import pytest
+
+from voraus_debian_iso.methods.shell import ExtractProgress, execute_command, execute_commands, parse_xorriso_progress
+from voraus_debian_iso.methods.tracing import Tracer
+
+
+def test_execute_command_traces_the_resource_usage() -> None:
+    tracer = Tracer()
+    with tracer.activate():
+        assert execute_command(["sh", "-c", "printf 'out\\r\\n'; head -c 10000 /dev/zero | tr '\\0' x >&2"]) == "out\n"
+    assert len(tracer.events) == 1
+    event = tracer.events[0]
+    assert (event["name"], event["cat"]) == ("sh", "subprocess")
+    assert event["args"]["exit_code"] == 0
+    assert event["args"]["max_rss_kib"] > 0
+    assert event["args"]["user_cpu_seconds"] >= 0
+    assert event["args"]["stderr_tail"] == "x" * 4096
+
+
+def test_execute_command_raises_and_logs_the_stderr_tail(caplog: pytest.LogCaptureFixture) -> None:
+    with pytest.raises(CalledProcessError) as error_info, caplog.at_level(logging.ERROR):
+        execute_command(["sh", "-c", "echo partial; echo 'No space left on device' >&2; exit 3"])
+    assert error_info.value.returncode == 3
+    assert error_info.value.output == "partial\n"
+    assert error_info.value.stderr == "No space left on device\n"
+    assert caplog.messages == ["sh failed with exit code 3:\nNo space left on device"]
+
+
+def _is_running(pid: int) -> bool:
+    # Orphans are reaped by init, so they may briefly stay around as zombies after they have been killed
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            if Path(f"/proc/{pid}/stat").read_text(encoding="utf-8").split()[2] == "Z":
+                return False
+        except FileNotFoundError:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def test_execute_command_kills_the_process_group_on_timeout(tmp_path: Path) -> None:
+    pid_file = tmp_path / "child.pid"
+    start_time = time.monotonic()
+    with pytest.raises(TimeoutExpired):
+        execute_command(["sh", "-c", f"sleep 60 & echo $! > {pid_file}; echo started; wait"], timeout=0.5)
+    assert time.monotonic() - start_time < 10
+    assert not _is_running(int(pid_file.read_text(encoding="utf-8")))
+
+
+@pytest.mark.parametrize("signal_number", [signal.SIGTERM, signal.SIGHUP])
+@pytest.mark.parametrize("to_process_group", [False, True])
+def test_execute_command_terminates_the_process_group_with_this_process(
+    tmp_path: Path, signal_number: signal.Signals, to_process_group: bool
+) -> None:
+    pid_file = tmp_path / "sleep.pid"
+    script = (
+        "from voraus_debian_iso.methods.shell import execute_command; "
+        f"execute_command(['sh', '-c', 'echo $$ > {pid_file}; exec sleep 123'])"
+    )
+    with subprocess.Popen([sys.executable, "-c", script], start_new_session=True) as process:
+        deadline = time.monotonic() + 10
+        while not pid_file.is_file() or not pid_file.read_text(encoding="utf-8").strip():
+            assert time.monotonic() < deadline, "The command didn't start"
+            time.sleep(0.05)
+        if to_process_group:
+            os.killpg(process.pid, signal_number)
+        else:
+            process.send_signal(signal_number)
+        assert process.wait(timeout=10) == -signal_number
+    assert not _is_running(int(pid_file.read_text(encoding="utf-8")))
+
+
+def test_execute_commands_kills_the_others_on_failure(tmp_path: Path) -> None:
+    pid_file = tmp_path / "sleep.pid"
+    with pytest.raises(CalledProcessError):
+        execute_commands(
+            [
+                ["sh", "-c", f"echo $$ > {pid_file}; exec sleep 60"],
+                ["sh", "-c", "sleep 0.2; exit 1"],
+            ]
+        )
+    assert not _is_running(int(pid_file.read_text(encoding="utf-8")))
+
+
+def test_execute_commands_runs_concurrently() -> None:
+    start_time = time.monotonic()
+    assert execute_commands([["sh", "-c", "sleep 0.5; echo 1"], ["sh", "-c", "sleep 0.5; echo 2"]]) == ["1\n", "2\n"]
+    assert time.monotonic() - start_time < 0.9
+
+
+def test_execute_command_logs_the_progress(caplog: pytest.LogCaptureFixture) -> None:
+    progress = ExtractProgress()
+    with caplog.at_level(logging.INFO):
+        execute_command(["sh", "-c", "printf 'x ./\\nx ./install.amd/\\nwarning\\n' >&2"], progress=progress)
+    assert progress.files == 2
+    assert "warning" not in caplog.text
+
+
+def test_parse_xorriso_progress() -> None:
+    assert parse_xorriso_progress("xorriso : UPDATE :  45.00% done, estimate finish Mon Jan 1") == (
+        "45.00% done, estimate finish Mon Jan 1"
+    )
+    assert parse_xorriso_progress("xorriso : NOTE : Copying to System Area: 432 bytes") is None
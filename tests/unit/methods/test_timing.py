@@ -0,0 +1,25 @@
+"""Contains tests for the recording of phase timings."""
+
+from voraus_debian_iso.methods.timing import PhaseRecorder, phase, record_phase
+
+
+def test_phases_are_recorded_in_the_active_recorder() -> None:
+    recorder = PhaseRecorder()
+    with recorder.activate():
+        with phase("build:patch"):
+            pass
+        record_phase("install:partitioning", 2.0)
+        record_phase("install:partitioning", 3.0)
+    assert set(recorder.phases) == {"build:patch", "install:partitioning"}
+    assert recorder.phases["build:patch"] >= 0
+    assert recorder.phases["install:partitioning"] == 5.0
+
+
+def test_phases_are_ignored_without_active_recorder() -> None:
+    recorder = PhaseRecorder()
+    with recorder.activate():
+        pass
+    record_phase("install:partitioning", 2.0)
+    with phase("build:patch"):
+        pass
+    assert not recorder.phases
@@ -0,0 +1,47 @@
+"""Contains tests for the tracing of commands, phases and subprocesses."""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from voraus_debian_iso.methods.timing import phase
+from voraus_debian_iso.methods.tracing import Tracer, span
+
+
+def test_spans_are_traced_in_the_active_tracer(tmp_path: Path) -> None:
+    tracer = Tracer()
+    with tracer.activate():
+        with span("build", category="command"):
+            with phase("build:patch"):
+                pass
+            with pytest.raises(ValueError), span("build:repack", files=3) as attributes:
+                attributes["output"] = "image.iso"
+                raise ValueError("broken")
+    with span("untraced"):
+        pass
+
+    trace_file = tmp_path / "trace.json"
+    tracer.write(trace_file)
+    events = json.loads(trace_file.read_text(encoding="utf-8"))["traceEvents"]
+    assert [(event["name"], event["cat"], event["ph"]) for event in events] == [
+        ("build", "command", "X"),
+        ("build:patch", "phase", "X"),
+        ("build:repack", "phase", "X"),
+    ]
+    assert events[2]["args"] == {"files": 3, "output": "image.iso", "error": "ValueError('broken')"}
+    # The phases nest in the command
+    assert events[0]["ts"] <= events[1]["ts"]
+    assert events[2]["ts"] + events[2]["dur"] <= events[0]["ts"] + events[0]["dur"]
+
+
+def test_spans_of_worker_threads_are_traced() -> None:
+    def _work(index: int) -> None:
+        with span(f"unit-{index}", category="subprocess"):
+            pass
+
+    tracer = Tracer()
+    with tracer.activate(), ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(_work, range(4)))
+    assert sorted(event["name"] for event in tracer.events) == ["unit-0", "unit-1", "unit-2", "unit-3"]
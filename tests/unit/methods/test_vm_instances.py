@@ -0,0 +1,74 @@
+"""Contains tests for the named VM instances."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from pytest import MonkeyPatch
+
+from voraus_debian_iso.methods import vm_instances
+from voraus_debian_iso.methods.vm_instances import VMInstance, allocate_free_port, list_instances
+
+pytestmark = pytest.mark.usefixtures("vms_dir")
+
+
+@pytest.mark.parametrize("name", ["", "../escape", "a" * 33, "-leading-dash"])
+def test_vm_instance_rejects_invalid_names(name: str) -> None:
+    with pytest.raises(ValueError, match="Invalid VM name"):
+        VMInstance(name)
+
+
+def test_vm_instance_keeps_its_state_in_its_own_directory(vms_dir: Path) -> None:
+    instance = VMInstance("worker-1")
+    with pytest.raises(RuntimeError, match="has never been started"):
+        _ = instance.ssh_port
+
+    instance.save_state(ssh_port=40022, disk_file=Path("/disks/worker-1.qcow2"))
+
+    assert instance.ssh_port == 40022
+    assert instance.state["disk_file"] == "/disks/worker-1.qcow2"
+    assert instance.pid_file.parent == vms_dir / "worker-1"
+    assert list_instances() == [instance]
+
+
+def test_vm_instance_removes_stale_pid_file() -> None:
+    instance = VMInstance("worker-1")
+    instance.state_dir.mkdir(parents=True)
+    with subprocess.Popen([sys.executable, "-c", "pass"]) as process:
+        pass
+    instance.pid_file.write_text(f"{process.pid}\n")
+    assert not instance.is_running()
+    assert not instance.pid_file.exists()
+
+    instance.pid_file.write_text(f"{os.getpid()}\n")
+    assert instance.get_pid() == os.getpid()
+
+
+def test_allocate_free_port_skips_ports_of_running_instances(monkeypatch: MonkeyPatch) -> None:
+    running = VMInstance("running")
+    running.save_state(ssh_port=allocate_free_port())
+    running.pid_file.write_text(str(os.getpid()))
+    taken_port = running.ssh_port
+
+    ports = iter([taken_port, taken_port + 1])
+    monkeypatch.setattr(vm_instances.socket, "socket", lambda *_: _FakeSocket(next(ports)))
+    assert allocate_free_port() == taken_port + 1
+
+
+class _FakeSocket:
+    def __init__(self, port: int) -> None:
+        self.port = port
+
+    def __enter__(self) -> "_FakeSocket":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        pass
+
+    def bind(self, _: object) -> None:
+        pass
+
+    def getsockname(self) -> tuple[str, int]:
+        return "127.0.0.1", self.port
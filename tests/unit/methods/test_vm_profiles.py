@@ -0,0 +1,52 @@
+"""Contains tests for the VM performance profiles."""
+
+from pathlib import Path
+
+from pytest import MonkeyPatch
+
+from voraus_debian_iso.methods import vm_profiles
+from voraus_debian_iso.methods.vm_profiles import VMProfile, get_drive_args, get_machine_args, get_nic_args
+
+
+def test_default_profile_keeps_emulated_hardware() -> None:
+    assert get_drive_args(VMProfile.DEFAULT, Path("disk.qcow2")) == [
+        "-drive",
+        "file=disk.qcow2,format=qcow2,if=ide,cache=writeback,aio=threads",
+    ]
+    assert get_nic_args(VMProfile.DEFAULT, "") == ["-device", "e1000,netdev=eth0", "-netdev", "user,id=eth0"]
+
+
+def test_drive_args_can_override_discard() -> None:
+    assert get_drive_args(VMProfile.DEFAULT, Path("disk.qcow2"), discard=True)[1].endswith(
+        ",discard=unmap,detect-zeroes=unmap"
+    )
+    assert "discard" not in get_drive_args(VMProfile.REALISTIC, Path("disk.qcow2"), discard=False)[1]
+
+
+def test_fast_install_profile_only_skips_flushes_during_install() -> None:
+    install_args = get_drive_args(VMProfile.FAST_INSTALL, Path("disk.qcow2"), install=True)
+    assert (
+        install_args[1]
+        == "file=disk.qcow2,format=qcow2,if=virtio,cache=unsafe,aio=io_uring,discard=unmap,detect-zeroes=unmap"
+    )
+    assert "cache=writeback" in get_drive_args(VMProfile.FAST_INSTALL, Path("disk.qcow2"))[1]
+    assert get_nic_args(VMProfile.FAST_INSTALL, "hostfwd=tcp:127.0.0.1:2222-:22") == [
+        "-device",
+        "virtio-net-pci,netdev=eth0",
+        "-netdev",
+        "user,id=eth0,hostfwd=tcp:127.0.0.1:2222-:22",
+    ]
+
+
+def test_machine_args_match_vcpus_to_host_cores(monkeypatch: MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setattr(vm_profiles.os, "sched_getaffinity", lambda _: set(range(6)))
+    assert get_machine_args(VMProfile.DEFAULT)[:2] == ["-smp", "1"]
+    assert get_machine_args(VMProfile.FAST_INSTALL)[:2] == ["-smp", "6"]
+    assert get_machine_args(VMProfile.REALISTIC)[:2] == ["-smp", "4"]
+
+    monkeypatch.setattr(vm_profiles, "_HUGEPAGES_DIR", tmp_path)
+    assert get_machine_args(VMProfile.REALISTIC, hugepages=True)[-3:] == [
+        f"memory-backend-file,id=ram,size=2G,mem-path={tmp_path},prealloc=on,share=off",
+        "-machine",
+        "memory-backend=ram",
+    ]
@@ -0,0 +1,50 @@
+"""Contains the import time budget of the CLI."""
+
+import subprocess
+import sys
+
+import pytest
+
+_HEAVY_PACKAGES = {"fabric", "paramiko", "invoke", "pexpect", "tenacity", "setuptools_scm", "importlib_metadata"}
+
+# A name no VM is started with, so 'stop' and 'status' run their command without touching a VM
+_VM_NAME = "import-time-budget"
+
+# The budget in milliseconds for all imports including typer, measured with ``-X importtime``, which itself slows the
+# imports down
+_IMPORT_TIME_BUDGET_MS = 100
+
+
+def get_import_times(args: list[str]) -> dict[str, int]:
+    """Runs the CLI with ``-X importtime`` and returns the import times of all modules.
+
+    Args:
+        args: The CLI arguments.
+
+    Returns:
+        The time in microseconds each module took to import without its submodules, by module name.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "voraus_debian_iso.cli.main", *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_column, _, name = line.split("|")
+        import_times[name.strip()] = int(self_column.split(":")[1])
+    return import_times
+
+
+@pytest.mark.parametrize("args", [["--version"], ["stop", _VM_NAME], ["status", _VM_NAME]])
+def test_cli_import_time(args: list[str]) -> None:
+    # The fastest import of every module over several runs, so a busy host doesn't make the test fail
+    runs = [get_import_times(args) for _ in range(7)]
+    import_times = {name: min(run.get(name, self_time) for run in runs) for name, self_time in runs[0].items()}
+    heavy_modules = sorted(name for name in import_times if name.split(".")[0] in _HEAVY_PACKAGES)
+    assert not heavy_modules, f"'{' '.join(args)}' imports heavy modules"
+    slowest = sorted(import_times.items(), key=lambda item: item[1], reverse=True)[:10]
+    assert sum(import_times.values()) / 1000 < _IMPORT_TIME_BUDGET_MS, f"Slowest imports in microseconds: {slowest}"
@@ -0,0 +1,61 @@
+"""Contains the golden image the integration tests clone their VMs from."""
+
+from contextlib import contextmanager
+from logging import getLogger
+from pathlib import Path
+from typing import Callable, Iterator
+
+from voraus_debian_iso.constants import DATA_DIR
+from voraus_debian_iso.methods.build_cache import get_file_digest, get_text_digest
+from voraus_debian_iso.methods.cli.cli_install_methods import install_impl
+from voraus_debian_iso.methods.locking import FileLock
+
+_logger = getLogger(__name__)
+
+
+def get_inputs_digest(iso_file: Path) -> str:
+    """Returns a digest of the inputs of an installed image.
+
+    Args:
+        iso_file: The ISO the image is installed from.
+
+    Returns:
+        The SHA256 hex digest of the ISO and the preseed file.
+    """
+    preseed_file = DATA_DIR / "preseed" / "preseed.cfg"
+    return get_text_digest(f"{get_file_digest(iso_file)} {get_file_digest(preseed_file)}")
+
+
+@contextmanager
+def use_golden_image(build_iso: Callable[[], Path], golden_file: Path) -> Iterator[Path]:
+    """Provides a golden image of the current ISO, installing it only if its inputs changed.
+
+    The digest of the inputs is stored next to the golden image. All pytest-xdist workers and concurrent test sessions
+    share the image: the first one that finds it outdated installs it, the others wait for it. Every user holds a
+    shared lock on the image, so it is only replaced once no VM of another session runs on it anymore.
+
+    Args:
+        build_iso: Builds the ISO and returns its path.
+        golden_file: The golden image.
+
+    Yields:
+        The golden image, which is up to date.
+    """
+    inputs_file = golden_file.with_name(f"{golden_file.name}.inputs")
+    usage_lock = FileLock(golden_file.with_name(f"{golden_file.name}.usage.lock"))
+    try:
+        with FileLock(golden_file.with_name(f"{golden_file.name}.build.lock")):
+            iso_file = build_iso()
+            digest = get_inputs_digest(iso_file)
+            if golden_file.is_file() and inputs_file.is_file() and inputs_file.read_text() == digest:
+                _logger.info(f"Reusing golden image {golden_file} of ISO {iso_file}")
+            else:
+                usage_lock.acquire()
+                inputs_file.unlink(missing_ok=True)
+                _logger.info(f"Installing golden image {golden_file} of ISO {iso_file}, its inputs changed")
+                install_impl(iso_file=iso_file, disk_file=golden_file, golden=True)
+                inputs_file.write_text(digest)
+            usage_lock.acquire(shared=True)
+        yield golden_file
+    finally:
+        usage_lock.release()
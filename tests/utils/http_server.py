@@ -0,0 +1,110 @@
+"""Contains a local HTTP server that stands in for remote mirrors in tests."""
+
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+
+
+class _RangeRequestHandler(SimpleHTTPRequestHandler):
+    """Serves files from a directory and supports single HTTP Range requests."""
+
+    server: LocalHTTPServer._Server
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+        pass
+
+    def do_HEAD(self) -> None:  # pylint: disable=invalid-name
+        self._serve(send_body=False)
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        self._serve(send_body=True)
+
+    def _serve(self, send_body: bool) -> None:
+        self.server.requests[(self.command, self.path, self.headers.get("Range"))] += 1
+        file_path = Path(self.translate_path(self.path))
+        if not file_path.is_file():
+            self.send_error(404)
+            return
+        data = file_path.read_bytes()
+        range_header = self.headers.get("Range")
+        if range_header and self.server.accept_ranges:
+            start_text, end_text = range_header.removeprefix("bytes=").split("-")
+            start, end = int(start_text), min(int(end_text or len(data) - 1), len(data) - 1)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+            data = data[start : end + 1]
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        if self.server.accept_ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        if send_body:
+            self.wfile.write(data)
+
+
+class LocalHTTPServer:
+    """A threaded HTTP server serving a local directory, used as a stand-in for remote mirrors."""
+
+    class _Server(ThreadingHTTPServer):
+        daemon_threads = True
+        requests: Counter
+        accept_ranges: bool
+
+    def __init__(self, directory: Path, accept_ranges: bool = True) -> None:
+        """Initializes the server without starting it.
+
+        Args:
+            directory: The directory to serve.
+            accept_ranges: Whether the server supports HTTP Range requests.
+        """
+        self._server = self._Server(
+            ("127.0.0.1", 0),
+            lambda *args: _RangeRequestHandler(*args, directory=str(directory)),
+        )
+        self._server.requests = Counter()
+        self._server.accept_ranges = accept_ranges
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """Returns the base URL of the server.
+
+        Returns:
+            The base URL.
+        """
+        host, port = self._server.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    @property
+    def requests(self) -> Counter:
+        """Returns the number of requests per (method, path, range header).
+
+        Returns:
+            The request counter.
+        """
+        return self._server.requests
+
+    def __enter__(self) -> LocalHTTPServer:
+        """Starts serving in a background thread.
+
+        Returns:
+            The running server.
+        """
+        self._thread.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Stops the server."""
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,105 @@
+"""Contains a fake QEMU process with a QMP socket that stands in for a running VM in tests."""
+
+from __future__ import annotations
+
+import json
+import socketserver
+import subprocess
+import sys
+import threading
+from types import TracebackType
+from typing import Any
+
+from voraus_debian_iso.methods.vm_instances import VMInstance
+
+
+class FakeQEMU:
+    """A sleeping process registered as a running VM, with a QMP socket that answers like QEMU.
+
+    Attributes:
+        commands: The QMP commands that have been executed, in order.
+    """
+
+    def __init__(self, instance: VMInstance, powers_down: bool = True) -> None:
+        """Initializes the fake without starting it.
+
+        Args:
+            instance: The VM the fake stands in for.
+            powers_down: Whether the guest powers down on an ACPI power down request.
+        """
+        self.instance = instance
+        self.powers_down = powers_down
+        self.commands: list[str] = []
+        self.process: subprocess.Popen | None = None
+        self._server: socketserver.ThreadingUnixStreamServer | None = None
+
+    def __enter__(self) -> FakeQEMU:
+        """Starts the fake QEMU process and serves its QMP socket in a background thread.
+
+        Returns:
+            The running fake.
+        """
+        self.instance.state_dir.mkdir(parents=True, exist_ok=True)
+        self.process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        self.instance.pid_file.write_text(f"{self.process.pid}\n")
+        fake = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                self._send({"QMP": {"version": {"qemu": {"major": 9, "minor": 2, "micro": 0}}, "capabilities": []}})
+                for line in self.rfile:
+                    command = json.loads(line)["execute"]
+                    fake.commands.append(command)
+                    self._send({"return": fake.respond(command)})
+                    if command == "quit":
+                        return
+
+            def _send(self, message: dict[str, Any]) -> None:
+                self.wfile.write(json.dumps(message).encode() + b"\r\n")
+
+        self._server = socketserver.ThreadingUnixStreamServer(str(self.instance.qmp_socket), _Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Stops the QMP server and the fake QEMU process."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        self._exit()
+
+    def respond(self, command: str) -> Any:
+        """Returns the QMP result of a command and simulates its effect.
+
+        Args:
+            command: The QMP command.
+
+        Returns:
+            The result of the command.
+        """
+        if command == "query-status":
+            return {"running": True, "status": "running"}
+        if command == "query-cpus-fast":
+            return [{"cpu-index": 0, "thread-id": 4242, "target": "x86_64"}]
+        if command == "query-blockstats":
+            return [
+                {
+                    "device": "ide0-hd0",
+                    "stats": {"rd_bytes": 2 * 1024**2, "rd_operations": 64, "wr_bytes": 0, "wr_operations": 0},
+                },
+                {"device": "ide1-cd0", "stats": {"rd_bytes": 0, "rd_operations": 0, "wr_bytes": 0, "wr_operations": 0}},
+            ]
+        if (command == "system_powerdown" and self.powers_down) or command == "quit":
+            self._exit()
+        return {}
+
+    def _exit(self) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait()
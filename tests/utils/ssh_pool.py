@@ -0,0 +1,43 @@
+"""Contains a pool of SSH connections to the QEMU VM of the integration tests."""
+
+from typing import Generator
+
+from fabric import Connection
+
+from voraus_debian_iso.constants import DEFAULT_VM_NAME
+from voraus_debian_iso.methods.cli.cli_start_methods import get_ssh_connection
+
+
+class SSHConnectionPool:
+    """Keeps one open SSH connection per user, so every test reuses it instead of logging in again."""
+
+    def __init__(self, vm_name: str = DEFAULT_VM_NAME) -> None:
+        """Initializes the pool without connecting.
+
+        Args:
+            vm_name: The name of the VM.
+        """
+        self.vm_name = vm_name
+        self._connections: dict[str, Generator[Connection, None, None]] = {}
+        self._opened: dict[str, Connection] = {}
+
+    def get(self, username: str) -> Connection:
+        """Returns the connection of a user, connecting on first use.
+
+        Args:
+            username: The username.
+
+        Returns:
+            The open connection.
+        """
+        if username not in self._opened:
+            self._connections[username] = get_ssh_connection(username=username, vm_name=self.vm_name)
+            self._opened[username] = next(self._connections[username])
+        return self._opened[username]
+
+    def close(self) -> None:
+        """Closes all connections."""
+        for connection in self._connections.values():
+            connection.close()
+        self._connections.clear()
+        self._opened.clear()